@@ -2,17 +2,23 @@
 Analytics API Routes
 Advanced reporting and business intelligence endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_db, ORJSON_AVAILABLE
 from app.services.analytics_service import analytics_service
 from app.core.dependencies import get_current_user
 from app.models.agent import Agent
 
-router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
+# orjson serializes the nested analytics dicts much faster when installed
+router = APIRouter(
+    prefix="/api/analytics",
+    tags=["Analytics"],
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
 
 
 @router.get("/agent/performance")
@@ -45,6 +51,7 @@ async def get_agent_performance(
 
 @router.get("/dashboard/realtime")
 async def get_realtime_dashboard(
+    response: Response,
     agent_id: Optional[int] = Query(None, description="Filter by agent ID"),
     db: AsyncSession = Depends(get_db),
     current_user: Agent = Depends(get_current_user)
@@ -64,6 +71,10 @@ async def get_realtime_dashboard(
         agent_id=agent_id
     )
     
+    # Dashboard may be served from a short cache - tell clients how old it is
+    age = datetime.utcnow() - datetime.fromisoformat(dashboard['timestamp'])
+    response.headers["X-Cache-Age"] = str(max(int(age.total_seconds()), 0))
+    
     return dashboard
 
 
@@ -118,6 +129,21 @@ async def get_conversion_funnel(
     return funnel
 
 
+@router.post("/cache/invalidate")
+async def invalidate_analytics_cache(
+    current_user: Agent = Depends(get_current_user)
+):
+    """
+    Drop cached campaign/funnel analytics responses
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    await analytics_service.invalidate_cache()
+    
+    return {"status": "invalidated"}
+
+
 @router.get("/customer/{customer_id}/insights")
 async def get_customer_insights(
     customer_id: int,
@@ -3,9 +3,9 @@ Calls API
 Call initiation, management, history
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, desc
+from sqlalchemy import select, update, and_, desc, func
 from typing import List, Optional
 from datetime import datetime
 import uuid
@@ -23,7 +23,7 @@ from app.models.customer import Customer
 from app.core.dependencies import get_current_agent
 from app.core.exceptions import AgentAlreadyOnCallException, CustomerNotFoundException
 from app.services.dialer_service import get_dialer_service, DialerService
-from app.services.call_transfer import call_transfer_service
+from app.services.call_transfer import call_transfer_service, TRANSFER_REASONS_JSON
 from app.config import settings
 
 router = APIRouter()
@@ -312,15 +312,15 @@ async def get_calls(
     result = await db.execute(query)
     calls = result.scalars().all()
     
-    # Total count
-    count_query = select(Call).where(Call.agent_id == agent.id)
+    # Total count (counted in SQL, no Call objects loaded)
+    count_query = select(func.count()).select_from(Call).where(Call.agent_id == agent.id)
     if status:
         count_query = count_query.where(Call.status == status)
     if outcome:
         count_query = count_query.where(Call.outcome == outcome)
     
     total_result = await db.execute(count_query)
-    total = len(total_result.scalars().all())
+    total = total_result.scalar_one()
     
     return CallListResponse(
         total=total,
@@ -338,26 +338,33 @@ async def get_call_stats(
     """
     Agent ke call statistics
     """
+    # Read-only scan - plain Core row tuples instead of hydrating Call objects
+    calls_table = Call.__table__
     result = await db.execute(
-        select(Call).where(Call.agent_id == agent.id)
+        select(
+            calls_table.c.status,
+            calls_table.c.outcome,
+            func.coalesce(calls_table.c.duration_seconds, 0)
+        ).where(calls_table.c.agent_id == agent.id)
     )
-    calls = result.scalars().all()
     
-    total_calls = len(calls)
-    answered_calls = len([c for c in calls if c.status == "answered"])
-    missed_calls = len([c for c in calls if c.status in ["no_answer", "failed"]])
+    total_calls = answered_calls = missed_calls = wins = total_duration = 0
+    outcomes = {}
+    for call_status, outcome, duration in result.all():
+        total_calls += 1
+        if call_status == "answered":
+            answered_calls += 1
+        elif call_status in ("no_answer", "failed"):
+            missed_calls += 1
+        total_duration += duration
+        if outcome:
+            if outcome == "win":
+                wins += 1
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
     
-    total_duration = sum(c.duration_seconds for c in calls if c.duration_seconds)
     avg_duration = total_duration // total_calls if total_calls > 0 else 0
-    
-    wins = len([c for c in calls if c.outcome == "win"])
     win_rate = (wins / total_calls * 100) if total_calls > 0 else 0
     
-    outcomes = {}
-    for call in calls:
-        if call.outcome:
-            outcomes[call.outcome] = outcomes.get(call.outcome, 0) + 1
-    
     return CallStatsResponse(
         total_calls=total_calls,
         answered_calls=answered_calls,
@@ -446,7 +453,6 @@ async def cancel_transfer(
 async def get_transfer_reasons():
     """
     Get list of valid transfer reasons
+    (pre-encoded once - reasons are static)
     """
-    return {
-        "reasons": call_transfer_service.get_transfer_reasons()
-    }
+    return Response(content=TRANSFER_REASONS_JSON, media_type="application/json")
@@ -88,6 +88,7 @@ async def create_dialer_user(
         db.add(new_user)
         await db.commit()
         await db.refresh(new_user)
+        campaign_scheduler.wake()
         
         logger.info(f"Created dialer user {new_user.username} for agent {agent.agent_id}")
         return new_user
@@ -204,6 +205,7 @@ async def update_dialer_user(
         
         await db.commit()
         await db.refresh(user)
+        campaign_scheduler.wake()
         
         logger.info(f"Updated dialer user {user.username}")
         return user
@@ -491,6 +493,7 @@ async def schedule_quick_start(
         
         await db.commit()
         await db.refresh(user)
+        campaign_scheduler.wake()
         
         logger.info(f"📅 Scheduled {user.username} to start at {start_time.strftime('%H:%M')} ({minutes} minutes)")
         
@@ -7,12 +7,41 @@ import logging
 import asyncio
 import json
 import base64
+import struct
+import time
+from typing import Optional
 import websockets
 from app.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Binary frame protocol (CallTools bridge script): little-endian header
+# [uint8 type][uint64 timestamp ms] followed by the payload - raw Int16 PCM
+# for audio, the session id for init. Clients that open with a binary init
+# frame also get AI audio back as binary frames
+FRAME_HEADER = struct.Struct("<BQ")
+FRAME_AUDIO = 1
+FRAME_CALL_START = 2
+FRAME_CALL_END = 3
+FRAME_INIT = 4
+
+# Control frame type -> JSON message type handled by the same code path
+FRAME_MESSAGE_TYPES = {
+    FRAME_CALL_START: "call_start",
+    FRAME_CALL_END: "call_end",
+    FRAME_INIT: "init",
+}
+
+# Browser chunks (2048 samples / 4096 bytes) are merged into 512 ms batches
+# (8192 samples of 16 kHz Int16 PCM) before going to HumeAI - 4x fewer sends
+AUDIO_BATCH_BYTES = 16384
+# Batches waiting for HumeAI; a full queue backpressures the browser reader
+AUDIO_QUEUE_SIZE = 4
+# No browser audio for this long -> send the partial batch (end of an utterance,
+# browser silence gate) instead of holding up to 512 ms back from HumeAI
+AUDIO_FLUSH_SECONDS = 0.12
+
 
 class WebRTCBridgeSession:
     """Handles WebRTC audio bridge to HumeAI"""
@@ -24,6 +53,12 @@ class WebRTCBridgeSession:
         self.running = False
         self.call_active = False  # Track if actual call is in progress
         self.hume_connected = False  # Track HumeAI connection state
+        self.binary_audio = False  # Browser sends/receives audio as binary frames
+        self.audio_chunk_count = 0
+        self.audio_buffer = bytearray()  # PCM waiting for a full batch
+        self.audio_buffered_at = 0.0  # loop time of the last chunk added to audio_buffer
+        self.audio_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIO_QUEUE_SIZE)
+        self.audio_sender_task = None
         
     async def connect_humeai(self):
         """Connect to HumeAI"""
@@ -87,18 +122,105 @@ class WebRTCBridgeSession:
             
         return False
     
+    async def _buffer_audio(self, pcm: bytes):
+        """Collect browser PCM and queue it for HumeAI in AUDIO_BATCH_BYTES batches"""
+        # Only process audio if call is active
+        if not self.call_active:
+            return  # Ignore audio until call starts
+        
+        self.audio_buffer.extend(pcm)
+        self.audio_buffered_at = asyncio.get_running_loop().time()
+        if len(self.audio_buffer) >= AUDIO_BATCH_BYTES:
+            # Take the batch before waiting so the idle flush can't send it twice
+            batch = bytes(self.audio_buffer)
+            self.audio_buffer.clear()
+            # Waits here while HumeAI is behind - queue full
+            await self.audio_queue.put(batch)
+    
+    def _take_idle_audio(self) -> Optional[bytes]:
+        """Partial batch once the browser has gone quiet for AUDIO_FLUSH_SECONDS"""
+        if not self.audio_buffer or not self.call_active:
+            return None
+        idle = asyncio.get_running_loop().time() - self.audio_buffered_at
+        if idle < AUDIO_FLUSH_SECONDS:
+            return None
+        batch = bytes(self.audio_buffer)
+        self.audio_buffer.clear()
+        return batch
+    
+    async def _send_audio_loop(self):
+        """Drain batched audio from the queue to HumeAI, flushing partial batches when idle"""
+        while True:
+            try:
+                pcm = await asyncio.wait_for(self.audio_queue.get(), timeout=AUDIO_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pcm = self._take_idle_audio()
+                if pcm is None:
+                    continue
+            try:
+                # HumeAI still takes base64 JSON - encoded here in C
+                await self._forward_audio(base64.b64encode(pcm).decode("ascii"))
+            except Exception as e:
+                logger.error(f"Error sending audio to HumeAI: {e}")
+    
+    async def _forward_audio(self, audio_b64: str):
+        """Send one batch of browser audio (base64 PCM) to HumeAI"""
+        # Call may have ended while the batch was queued
+        if not self.call_active or not self.hume_ws:
+            return
+        
+        self.audio_chunk_count += 1
+        
+        # Log every 50 chunks
+        if self.audio_chunk_count % 50 == 0:
+            logger.info(f"📡 Audio streaming... chunk #{self.audio_chunk_count}")
+        
+        # Forward to HumeAI
+        await self.hume_ws.send(json.dumps({
+            "type": "audio_input",
+            "data": audio_b64
+        }))
+        
+        # First chunk special log
+        if self.audio_chunk_count == 1:
+            logger.info("=" * 60)
+            logger.info("🎤 FIRST AUDIO CHUNK RECEIVED!")
+            logger.info(f"   Size: {len(audio_b64)} bytes (base64)")
+            logger.info("   ✅ Forwarding to HumeAI...")
+            logger.info("=" * 60)
+    
     async def forward_to_humeai(self):
         """Forward audio from browser to HumeAI"""
-        audio_chunk_count = 0
-        
         try:
             logger.info("🎤 AUDIO FORWARDING STARTED - Listening for browser audio...")
             
             while self.running:
                 # Receive from browser
-                message = await self.client_ws.receive_text()
-                data = json.loads(message)
-                msg_type = data.get("type")
+                message = await self.client_ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                
+                # Binary frame: fixed header + payload - no JSON/base64 on the browser side
+                frame = message.get("bytes")
+                if frame is not None:
+                    if len(frame) < FRAME_HEADER.size:
+                        continue
+                    frame_type, _timestamp_ms = FRAME_HEADER.unpack_from(frame)
+                    
+                    if frame_type == FRAME_AUDIO:
+                        await self._buffer_audio(frame[FRAME_HEADER.size:])
+                        continue
+                    
+                    msg_type = FRAME_MESSAGE_TYPES.get(frame_type)
+                    if msg_type is None:
+                        continue
+                    data = {"type": msg_type}
+                    if frame_type == FRAME_INIT:
+                        self.binary_audio = True
+                        data["session_id"] = frame[FRAME_HEADER.size:].decode("utf-8", "replace")
+                else:
+                    data = json.loads(message["text"])
+                    msg_type = data.get("type")
                 
                 # Handle call end event
                 if msg_type == "call_end":
@@ -106,6 +228,7 @@ class WebRTCBridgeSession:
                     logger.info("📴 CALL ENDED - Closing HumeAI connection")
                     logger.info("="*60)
                     self.call_active = False
+                    self.audio_buffer.clear()
                     
                     # Close HumeAI WebSocket
                     if self.hume_ws:
@@ -121,39 +244,17 @@ class WebRTCBridgeSession:
                     }))
                     continue
                 
-                # Handle both 'audio' and 'audio_input' from browser
+                # Handle both 'audio' and 'audio_input' from browser (JSON clients)
                 if msg_type in ["audio", "audio_input"]:
                     audio_b64 = data.get("data")
                     
                     if audio_b64:
-                        # Only process audio if call is active
-                        if not self.call_active:
-                            continue  # Ignore audio until call starts
-                        
-                        audio_chunk_count += 1
-                        
-                        # Log every 50 chunks
-                        if audio_chunk_count % 50 == 0:
-                            logger.info(f"📡 Audio streaming... chunk #{audio_chunk_count}")
-                        
-                        # Forward to HumeAI
-                        await self.hume_ws.send(json.dumps({
-                            "type": "audio_input",
-                            "data": audio_b64
-                        }))
-                        
-                        # First chunk special log
-                        if audio_chunk_count == 1:
-                            logger.info("=" * 60)
-                            logger.info("🎤 FIRST AUDIO CHUNK RECEIVED!")
-                            logger.info(f"   Size: {len(audio_b64)} bytes (base64)")
-                            logger.info("   ✅ Forwarding to HumeAI...")
-                            logger.info("=" * 60)
+                        await self._buffer_audio(base64.b64decode(audio_b64))
                         
                 elif msg_type == "init":
                     # Browser initialization
                     session_id = data.get("session_id", "unknown")
-                    logger.info(f"📱 Browser initialized: {session_id}")
+                    logger.info(f"📱 Browser initialized: {session_id} (binary audio: {self.binary_audio})")
                     logger.info("   ⏸️ Waiting for call to start...")
                     
                 elif msg_type == "call_start":
@@ -217,7 +318,8 @@ class WebRTCBridgeSession:
                             "type": "call_end_ack",
                             "message": "Call ended, resources cleaned up"
                         }))
-                    except:
+                    except (WebSocketDisconnect, RuntimeError):
+                        # Browser already gone / socket closed
                         pass
                     
         except WebSocketDisconnect:
@@ -264,10 +366,14 @@ class WebRTCBridgeSession:
                     logger.info("=" * 60)
                     
                     # Forward AI audio to browser
-                    await self.client_ws.send_text(json.dumps({
-                        "type": "audio_response",
-                        "data": audio_data
-                    }))
+                    if self.binary_audio and audio_data:
+                        header = FRAME_HEADER.pack(FRAME_AUDIO, int(time.time() * 1000))
+                        await self.client_ws.send_bytes(header + base64.b64decode(audio_data))
+                    else:
+                        await self.client_ws.send_text(json.dumps({
+                            "type": "audio_response",
+                            "data": audio_data
+                        }))
                     
                 elif msg_type == "user_message":
                     message_data = data.get("message", {})
@@ -356,6 +462,8 @@ class WebRTCBridgeSession:
         logger.info("⏸️ WebRTC Bridge ready - waiting for call_start event...")
         logger.info("   HumeAI will connect only when call starts")
         
+        self.audio_sender_task = asyncio.create_task(self._send_audio_loop())
+        
         # Start listening for messages (will handle call_start event)
         await self.forward_to_humeai()
     
@@ -363,6 +471,9 @@ class WebRTCBridgeSession:
         """Cleanup connections"""
         self.running = False
         
+        if self.audio_sender_task:
+            self.audio_sender_task.cancel()
+        
         if self.hume_ws:
             await self.hume_ws.close()
         
@@ -55,6 +55,14 @@ class Settings(BaseSettings):
     CALLTOOLS_USERNAME: str = ""
     CALLTOOLS_PASSWORD: str = ""
     CALLTOOLS_AUTO_MONITOR: bool = True  # Auto-start call monitoring
+    VISIBLE_BROWSER: bool = False  # Show the CallTools Chrome window (debugging); headless otherwise
+    CHROMEDRIVER_PATH: str = ""  # Pre-installed chromedriver; empty = download via webdriver-manager
+    # Warm start: keep Chrome running on this debugger address (e.g. 127.0.0.1:9222)
+    # and attach to it on the next start instead of launching + logging in again
+    CHROME_DEBUGGER_ADDRESS: str = ""
+    CHROME_USER_DATA_DIR: str = "chrome-profile"  # Persistent profile (cookies) for warm start
+    # Dialer automation: launch the shared headless Chrome at startup instead of on the first login
+    DIALER_PREWARM_BROWSER: bool = True
     
     # Twilio
     TWILIO_ACCOUNT_SID: str = ""
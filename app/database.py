@@ -6,8 +6,16 @@ SQLAlchemy async engine ke saath
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import settings
+import json
 import logging
 
+# orjson optional (3-10x faster JSON column encoding/decoding)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Database URL ko async format me convert karo
@@ -19,6 +27,12 @@ if database_url.startswith("postgresql://"):
 elif database_url.startswith("sqlite://"):
     database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
 
+
+def _json_serializer(value) -> str:
+    """JSON columns ke liye serializer (orjson agar installed ho)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 # Async engine banao
 engine = create_async_engine(
     database_url,
@@ -27,6 +41,9 @@ engine = create_async_engine(
     max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,  # Connection health check
     pool_recycle=3600,   # 1 hour me connections recycle karo
+    query_cache_size=1200,  # compiled SQL cache (default 500) - lambda_stmt/select variants
+    json_serializer=_json_serializer if ORJSON_AVAILABLE else json.dumps,
+    json_deserializer=orjson.loads if ORJSON_AVAILABLE else json.loads,
 )
 
 # Alias for backward compatibility
@@ -17,6 +17,7 @@ from app.redis_client import redis_client
 from app.api import auth, agents, calls, customers, websocket, dialer_users, webhooks, training, analytics, audio_bridge, webrtc_bridge, agent_management
 from app.services.dialer_automation import dialer_automation
 from app.services.campaign_scheduler import campaign_scheduler
+from app.services.call_stats_views import call_stats_views
 from app.services.calltools_monitor import initialize_calltools_monitor, shutdown_calltools_monitor
 
 # Logging setup
@@ -72,6 +73,12 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Campaign scheduler failed to start (continuing without it): {e}")
         
+        # Start periodic refresh of analytics materialized views
+        try:
+            await call_stats_views.start()
+        except Exception as e:
+            logger.warning(f"Call stats views refresher failed to start (continuing without it): {e}")
+        
         # CallTools monitor will be started manually via API endpoint
         # Not auto-starting on startup to avoid unnecessary connections
         if settings.DIALER_PROVIDER == "calltools":
@@ -103,6 +110,12 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.debug(f"Campaign scheduler stop: {e}")
         
+        # Stop analytics views refresher
+        try:
+            await call_stats_views.stop()
+        except Exception as e:
+            logger.debug(f"Call stats views refresher stop: {e}")
+        
         # Shutdown browser automation
         await dialer_automation.shutdown()
         logger.info("Browser automation shut down")
@@ -213,8 +226,20 @@ logger.info(f"""
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     
+    # uvloop (shipped with uvicorn[standard] on Linux/macOS) has cheaper loop
+    # wakeups for the monitor/scheduler sleeps and socket reads; Windows and
+    # installs without it stay on the default asyncio loop
+    loop = "asyncio"
+    if sys.platform != "win32":
+        try:
+            import uvloop  # noqa: F401
+            loop = "uvloop"
+        except ImportError:
+            pass
+    
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
@@ -222,4 +247,5 @@ if __name__ == "__main__":
         reload=settings.DEBUG,
         workers=1 if settings.DEBUG else settings.WORKERS,
         log_level=settings.LOG_LEVEL.lower(),
+        loop=loop,
     )
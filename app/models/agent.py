@@ -3,7 +3,7 @@ Agent Model
 Call center agent ka account aur profile
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -31,6 +31,9 @@ class Agent(Base):
     # Status
     is_active = Column(Boolean, default=True)
     is_online = Column(Boolean, default=False)  # Real-time presence
+    status = Column(String(20), default="available")  # available, on_call, break
+    current_call_id = Column(Integer, nullable=True)  # Call jo abhi chal rahi hai
+    active_call_count = Column(Integer, default=0)  # Transfers load balancing ke liye
     
     # Role & Permissions
     role = Column(String(20), default="agent")  # agent, supervisor, admin
@@ -62,6 +65,14 @@ class Agent(Base):
     last_login = Column(DateTime(timezone=True), nullable=True)
     last_call_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Transfer agent selection index (see migrations/005_add_agent_call_load.py)
+    __table_args__ = (
+        Index(
+            "ix_agents_available_role_calls", "is_active", "status", "role", "active_call_count",
+            postgresql_where=text("status = 'available' AND role = 'agent'")
+        ),
+    )
+    
     @property
     def name(self):
         """Alias for full_name for API compatibility"""
@@ -3,7 +3,7 @@ Call Model
 Har call ka record aur call events
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, ForeignKey, Float, Index, text
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -35,13 +35,16 @@ class Call(Base):
     outcome = Column(String(20), nullable=True)
     # win, loss, follow_up, no_answer, wrong_number, callback, not_interested
     
+    # Transfer queue name while status is transfer_queued (sales, support, default)
+    transfer_queue = Column(String(64), nullable=True)
+    
     # Auto-Disposition Fields
     disposition = Column(String(50), nullable=True)  # Auto-determined disposition
     disposition_confidence = Column(Float, nullable=True)  # 0.0 to 1.0
     disposition_details = Column(Text, nullable=True)  # JSON details of analysis
     
     # Duration
-    duration_seconds = Column(Integer, default=0)
+    duration_seconds = Column(Integer, default=0, server_default=text("0"), nullable=False)  # 0 jab pata na ho
     talk_time_seconds = Column(Integer, default=0)  # Actual conversation time
     
     # Timestamps
@@ -83,6 +86,28 @@ class Call(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Analytics indexes (see migrations/003_add_call_analytics_indexes.py
+    # and migrations/004_add_call_transfer_queue.py)
+    __table_args__ = (
+        Index(
+            "ix_calls_agent_created", "agent_id", "created_at",
+            postgresql_include=["duration_seconds", "disposition", "quality_score", "status"]
+        ),
+        Index(
+            "ix_calls_customer_created", "customer_id", created_at.desc(),
+            postgresql_include=["duration_seconds", "disposition", "agent_id"]
+        ),
+        Index(
+            "ix_calls_status_transfer_queued", "initiated_at",
+            postgresql_where=text("status = 'transfer_queued'")
+        ),
+        Index(
+            "ix_calls_transfer_queue", "transfer_queue",
+            postgresql_where=text("status = 'transfer_queued'")
+        ),
+        Index("ix_calls_created_at_brin", "created_at", postgresql_using="brin"),
+    )
+    
     def __repr__(self):
         return f"<Call {self.call_id} - {self.status}>"
     
@@ -121,7 +146,9 @@ class CallEvent(Base):
     __tablename__ = "call_events"
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    call_id = Column(String(100), ForeignKey("calls.call_id"), index=True, nullable=False)
+    # calls.call_id - no foreign key: calls is partitioned (migration 006) and
+    # call_id is only unique per (call_id, created_at) there
+    call_id = Column(String(100), index=True, nullable=False)
     
     # Event Type
     event_type = Column(String(50), nullable=False)
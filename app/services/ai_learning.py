@@ -2,20 +2,90 @@
 AI Learning Service
 Enables HumeAI to learn from live calls and improve over time
 """
+import asyncio
+import heapq
+import itertools
 import re
 import json
+from collections import Counter
+from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 import logging
 
 from app.models.call import Call
 from app.models.training_content import TrainingContent
 from app.services.hume_service import get_hume_session_manager
 
+# orjson optional (faster decoding of stored JSON blobs)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 logger = logging.getLogger(__name__)
 
+# Speaker prefix of a transcript line, e.g. "AI: ..." or "Customer: ..."
+_SPEAKER_RE = re.compile(r"^\s*(ai|agent|customer|user)\s*:\s*(.*)$", re.IGNORECASE)
+
+# Common words ignored by keyword extraction
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+
+# Phrase categories in priority order; each keyword list is compiled into one
+# alternation so a category check is a single C-level scan (substring match)
+_PHRASE_CATEGORIES = (
+    ("greeting", ('hello', 'hi', 'good morning', 'good afternoon')),
+    ("offer", ('offer', 'deal', 'special', 'discount', 'save')),
+    ("question", ('question', 'wondering', 'curious', 'how', 'what', 'why')),
+    ("acknowledgment", ('understand', 'appreciate', 'i see', 'makes sense')),
+    ("explanation", ('because', 'reason', 'explain', 'due to')),
+    ("gratitude", ('thank', 'appreciate', 'grateful')),
+)
+_PHRASE_CATEGORY_PATTERNS = tuple(
+    (category, re.compile("|".join(map(re.escape, words))))
+    for category, words in _PHRASE_CATEGORIES
+)
+
+# Sentiment lexicon tagged +1/-1, scanned in one whole-word pass
+_SENTIMENT_POLARITY = {
+    **dict.fromkeys(('good', 'great', 'excellent', 'perfect', 'yes', 'sure', 'love', 'like', 'interested'), 1),
+    **dict.fromkeys(('no', 'not', 'never', 'bad', 'terrible', 'hate', 'dislike', 'expensive', 'worried'), -1),
+}
+_SENTIMENT_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, _SENTIMENT_POLARITY)) + r")\b")
+
+
+@dataclass(slots=True)
+class Turn:
+    """Single speaker turn of a transcript"""
+    speaker: str
+    text: str
+    text_lower: str
+
+
+@dataclass(slots=True)
+class Objection:
+    """Objection keyword match inside a transcript"""
+    type: str
+    text: str
+    context: str
+    position: int
+
+
+@dataclass(slots=True)
+class FlowItem:
+    """Per-turn conversation flow entry"""
+    turn_number: int
+    speaker: str
+    category: str
+    word_count: int
+    sentiment: str
+
 
 class AILearningService:
     """
@@ -26,12 +96,16 @@ class AILearningService:
     def __init__(self):
         self.min_confidence_for_learning = 0.75
         self.min_calls_for_pattern = 5
+        self.max_top_phrases = 20
+        self.min_transcript_length = 50
+        self.min_turns_for_learning = 4
     
     async def learn_from_call(
         self,
         db: AsyncSession,
         call: Call,
-        auto_update_training: bool = True
+        auto_update_training: bool = True,
+        detailed_flow: bool = False
     ) -> Dict:
         """
         Extract and store learnings from a completed call
@@ -40,6 +114,7 @@ class AILearningService:
             db: Database session
             call: Completed Call object
             auto_update_training: Automatically update training content
+            detailed_flow: Store the per-turn conversation flow instead of a summary
             
         Returns:
             Dict with learning summary
@@ -48,6 +123,10 @@ class AILearningService:
             logger.warning(f"No transcript for call {call.id}, skipping learning")
             return {"status": "skipped", "reason": "no_transcript"}
         
+        if len(call.transcript) < self.min_transcript_length:
+            logger.info(f"Transcript too short for call {call.id}, skipping learning")
+            return {"status": "skipped", "reason": "too_short"}
+        
         learnings = {
             "call_id": call.id,
             "timestamp": datetime.utcnow().isoformat(),
@@ -57,29 +136,22 @@ class AILearningService:
             "emotions": self._extract_emotions(call),
             "successful_phrases": [],
             "objection_handling": [],
-            "conversation_flow": [],
             "learning_score": 0.0
         }
         
         try:
-            # Extract successful phrases (if call was successful)
-            if call.disposition in ["Connected", "Callback"] and call.disposition_confidence > self.min_confidence_for_learning:
-                learnings["successful_phrases"] = self._extract_successful_phrases(call.transcript)
-                learnings["learning_score"] += 0.3
-            
-            # Extract objection handling patterns
-            objections = self._detect_objections(call.transcript)
-            if objections:
-                learnings["objection_handling"] = self._analyze_objection_responses(
-                    call.transcript,
-                    objections,
-                    success=call.disposition == "Connected"
-                )
-                learnings["learning_score"] += 0.2
-            
-            # Analyze conversation flow
-            learnings["conversation_flow"] = self._analyze_conversation_flow(call.transcript)
-            learnings["learning_score"] += 0.1
+            # Run the CPU-bound transcript analysis off the event loop
+            analysis = await asyncio.to_thread(
+                self._analyze_transcript_sync,
+                call.transcript,
+                call.disposition,
+                call.disposition in ["Connected", "Callback"] and call.disposition_confidence > self.min_confidence_for_learning,
+                detailed_flow
+            )
+            if analysis is None:
+                logger.info(f"Too few turns in call {call.id}, skipping learning")
+                return {"status": "skipped", "reason": "too_short"}
+            learnings.update(analysis)
             
             # Store learnings in database (for future analysis)
             await self._store_learnings(db, call.id, learnings)
@@ -88,6 +160,9 @@ class AILearningService:
             if auto_update_training and learnings["learning_score"] > 0.4:
                 await self._auto_update_training_content(db, call.agent_id, learnings)
             
+            # Commit learnings and training content updates as one transaction
+            await db.commit()
+            
             logger.info(
                 f"Learned from call {call.id}: "
                 f"score={learnings['learning_score']:.2f}, "
@@ -99,45 +174,103 @@ class AILearningService:
             
         except Exception as e:
             logger.error(f"Error learning from call {call.id}: {e}")
+            await db.rollback()
             return {"status": "error", "error": str(e)}
     
+    def _analyze_transcript_sync(
+        self,
+        transcript: str,
+        disposition: Optional[str],
+        success_threshold_met: bool,
+        detailed_flow: bool = False
+    ) -> Optional[Dict]:
+        """
+        Pure transcript analysis (regex/tokenization), safe to run in a worker thread
+        
+        Returns:
+            Dict with successful_phrases, objection_handling, learning_score and either
+            conversation_flow (detailed_flow) or conversation_flow_summary;
+            None if the transcript has too few turns to learn from
+        """
+        # Split transcript into turns (AI and Customer) once for all analyzers
+        turns = self._split_transcript_into_turns(transcript)
+        if len(turns) < self.min_turns_for_learning:
+            return None
+        
+        analysis = {
+            "successful_phrases": [],
+            "objection_handling": [],
+            "learning_score": 0.0
+        }
+        
+        # Extract successful phrases (if call was successful)
+        if success_threshold_met:
+            analysis["successful_phrases"] = self._extract_successful_phrases(turns)
+            analysis["learning_score"] += 0.3
+        
+        # Extract objection handling patterns
+        objections = self._detect_objections(transcript)
+        if objections:
+            analysis["objection_handling"] = self._analyze_objection_responses(
+                turns,
+                objections,
+                success=disposition == "Connected"
+            )
+            analysis["learning_score"] += 0.2
+        
+        # Analyze conversation flow (serialized to dicts only at the JSON boundary)
+        if detailed_flow:
+            analysis["conversation_flow"] = [asdict(item) for item in self._analyze_conversation_flow(turns)]
+        else:
+            analysis["conversation_flow_summary"] = self._summarize_conversation_flow(turns)
+        analysis["learning_score"] += 0.1
+        
+        return analysis
+    
     def _extract_emotions(self, call: Call) -> Dict:
         """Extract emotion data from call"""
         if not call.disposition_details:
             return {}
         
         try:
-            details = json.loads(call.disposition_details) if isinstance(call.disposition_details, str) else call.disposition_details
-            return details.get("emotions", {})
+            return self._get_disposition_details(call).get("emotions", {})
         except:
             return {}
     
-    def _extract_successful_phrases(self, transcript: str) -> List[Dict]:
+    def _get_disposition_details(self, call: Call) -> Dict:
+        """
+        Parse disposition_details once and memoize it on the call instance
+        """
+        raw = call.disposition_details
+        cached = getattr(call, "_parsed_disposition_details", None)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        
+        details = _json_loads(raw) if isinstance(raw, str) else raw
+        call._parsed_disposition_details = (raw, details)
+        return details
+    
+    def _extract_successful_phrases(self, turns: List[Turn]) -> List[Dict]:
         """
         Extract phrases that led to successful outcome
         """
         phrases = []
         
-        # Split transcript into turns (AI and Customer)
-        turns = self._split_transcript_into_turns(transcript)
-        
         # Look for positive responses after AI statements
-        for i, turn in enumerate(turns):
-            if turn["speaker"] == "ai" and i + 1 < len(turns):
-                next_turn = turns[i + 1]
-                
+        for turn, next_turn in zip(turns, turns[1:]):
+            if turn.speaker == "ai":
                 # Check if customer response is positive
-                if self._is_positive_response(next_turn["text"]):
+                if self._is_positive_response(next_turn.text_lower):
                     phrases.append({
-                        "ai_statement": turn["text"],
-                        "customer_response": next_turn["text"],
+                        "ai_statement": turn.text,
+                        "customer_response": next_turn.text,
                         "effectiveness": "high",
-                        "category": self._categorize_phrase(turn["text"])
+                        "category": self._categorize_phrase(turn.text_lower)
                     })
         
         return phrases
     
-    def _detect_objections(self, transcript: str) -> List[Dict]:
+    def _detect_objections(self, transcript: str) -> List[Objection]:
         """
         Detect objection keywords and phrases
         """
@@ -152,115 +285,119 @@ class AILearningService:
         ]
         
         objections = []
+        transcript_lower = transcript.lower()
         for pattern, objection_type in objection_patterns:
-            matches = re.finditer(pattern, transcript.lower())
+            matches = re.finditer(pattern, transcript_lower)
             for match in matches:
                 # Get surrounding context (50 chars before and after)
                 start = max(0, match.start() - 50)
                 end = min(len(transcript), match.end() + 50)
                 context = transcript[start:end]
                 
-                objections.append({
-                    "type": objection_type,
-                    "text": match.group(),
-                    "context": context,
-                    "position": match.start()
-                })
+                objections.append(Objection(
+                    type=objection_type,
+                    text=match.group(),
+                    context=context,
+                    position=match.start()
+                ))
         
         return objections
     
     def _analyze_objection_responses(
         self,
-        transcript: str,
-        objections: List[Dict],
+        turns: List[Turn],
+        objections: List[Objection],
         success: bool
     ) -> List[Dict]:
         """
         Analyze how AI responded to objections
         """
-        turns = self._split_transcript_into_turns(transcript)
         responses = []
         
         for objection in objections:
             # Find the turn containing the objection
             objection_turn = None
             ai_response_turn = None
+            objection_text = objection.text.lower()
             
             for i, turn in enumerate(turns):
-                if objection["text"].lower() in turn["text"].lower():
+                if objection_text in turn.text_lower:
                     objection_turn = turn
                     # Get AI's response (next AI turn)
                     for j in range(i + 1, len(turns)):
-                        if turns[j]["speaker"] == "ai":
+                        if turns[j].speaker == "ai":
                             ai_response_turn = turns[j]
                             break
                     break
             
             if objection_turn and ai_response_turn:
                 responses.append({
-                    "objection_type": objection["type"],
-                    "objection_text": objection_turn["text"],
-                    "ai_response": ai_response_turn["text"],
+                    "objection_type": objection.type,
+                    "objection_text": objection_turn.text,
+                    "ai_response": ai_response_turn.text,
                     "success": success,
                     "effectiveness": "high" if success else "low"
                 })
         
         return responses
     
-    def _analyze_conversation_flow(self, transcript: str) -> List[Dict]:
+    def _analyze_conversation_flow(self, turns: List[Turn]) -> List[FlowItem]:
         """
         Analyze the flow and structure of the conversation
         """
-        turns = self._split_transcript_into_turns(transcript)
-        
-        flow = []
-        for i, turn in enumerate(turns):
-            flow_item = {
-                "turn_number": i + 1,
-                "speaker": turn["speaker"],
-                "category": self._categorize_phrase(turn["text"]),
-                "word_count": len(turn["text"].split()),
-                "sentiment": self._quick_sentiment(turn["text"])
-            }
-            flow.append(flow_item)
-        
-        return flow
+        return [
+            FlowItem(
+                turn_number=i + 1,
+                speaker=turn.speaker,
+                category=self._categorize_phrase(turn.text_lower),
+                word_count=len(turn.text.split()),
+                sentiment=self._quick_sentiment(turn.text_lower)
+            )
+            for i, turn in enumerate(turns)
+        ]
+    
+    def _summarize_conversation_flow(self, turns: List[Turn]) -> Dict:
+        """
+        Compact flow summary: turn counts per speaker/category and average word count
+        """
+        word_counts = [len(turn.text.split()) for turn in turns]
+        return {
+            "turns": len(turns),
+            "by_speaker": dict(Counter(turn.speaker for turn in turns)),
+            "by_category": dict(Counter(self._categorize_phrase(turn.text_lower) for turn in turns)),
+            "avg_word_count": sum(word_counts) / len(word_counts) if word_counts else 0
+        }
     
-    def _split_transcript_into_turns(self, transcript: str) -> List[Dict]:
+    def _split_transcript_into_turns(self, transcript: str) -> List[Turn]:
         """
         Split transcript into conversation turns
         Expected format: "AI: text\nCustomer: text\n..."
         """
         turns = []
-        lines = transcript.split('\n')
         
-        for line in lines:
+        for line in transcript.split('\n'):
             line = line.strip()
             if not line:
                 continue
             
             # Try to detect speaker
-            if line.lower().startswith('ai:') or line.lower().startswith('agent:'):
-                speaker = "ai"
-                text = line.split(':', 1)[1].strip()
-            elif line.lower().startswith('customer:') or line.lower().startswith('user:'):
-                speaker = "customer"
-                text = line.split(':', 1)[1].strip()
+            match = _SPEAKER_RE.match(line)
+            if match:
+                speaker = "ai" if match.group(1).lower() in ("ai", "agent") else "customer"
+                text = match.group(2)
             else:
                 # Default to alternating (start with AI)
                 speaker = "ai" if len(turns) % 2 == 0 else "customer"
                 text = line
             
-            turns.append({
-                "speaker": speaker,
-                "text": text
-            })
+            turns.append(Turn(speaker=speaker, text=text, text_lower=text.lower()))
         
         return turns
     
-    def _is_positive_response(self, text: str) -> bool:
+    def _is_positive_response(self, text_lower: str) -> bool:
         """
         Check if response indicates positive engagement
+        Expects already-lowercased text
         """
         positive_indicators = [
             r"\byes\b", r"\bokay\b", r"\bsure\b", r"\bsounds\s+good\b",
@@ -268,44 +405,28 @@ class AILearningService:
             r"\bi\s+like\b", r"\bthat's\s+great\b", r"\bperfect\b"
         ]
         
-        text_lower = text.lower()
         return any(re.search(pattern, text_lower) for pattern in positive_indicators)
     
-    def _categorize_phrase(self, text: str) -> str:
+    def _categorize_phrase(self, text_lower: str) -> str:
         """
         Categorize phrase by type
+        Expects already-lowercased text
         """
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['hello', 'hi', 'good morning', 'good afternoon']):
-            return "greeting"
-        elif any(word in text_lower for word in ['offer', 'deal', 'special', 'discount', 'save']):
-            return "offer"
-        elif any(word in text_lower for word in ['question', 'wondering', 'curious', 'how', 'what', 'why']):
-            return "question"
-        elif any(word in text_lower for word in ['understand', 'appreciate', 'i see', 'makes sense']):
-            return "acknowledgment"
-        elif any(word in text_lower for word in ['because', 'reason', 'explain', 'due to']):
-            return "explanation"
-        elif any(word in text_lower for word in ['thank', 'appreciate', 'grateful']):
-            return "gratitude"
-        else:
-            return "general"
+        for category, pattern in _PHRASE_CATEGORY_PATTERNS:
+            if pattern.search(text_lower):
+                return category
+        return "general"
     
-    def _quick_sentiment(self, text: str) -> str:
+    def _quick_sentiment(self, text_lower: str) -> str:
         """
         Quick sentiment analysis (positive/negative/neutral)
+        Expects already-lowercased text
         """
-        positive_words = ['good', 'great', 'excellent', 'perfect', 'yes', 'sure', 'love', 'like', 'interested']
-        negative_words = ['no', 'not', 'never', 'bad', 'terrible', 'hate', 'dislike', 'expensive', 'worried']
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        score = sum(_SENTIMENT_POLARITY[word] for word in _SENTIMENT_RE.findall(text_lower))
         
-        if positive_count > negative_count:
+        if score > 0:
             return "positive"
-        elif negative_count > positive_count:
+        elif score < 0:
             return "negative"
         else:
             return "neutral"
@@ -335,12 +456,8 @@ class AILearningService:
             else:
                 call.notes = learning_summary
             
-            # Store full learnings in custom_data
-            if not call.custom_data:
-                call.custom_data = {}
-            call.custom_data["ai_learnings"] = learnings
-            
-            await db.commit()
+            # Store full learnings in custom_data (reassigned so the JSON column is flagged dirty)
+            call.custom_data = {**(call.custom_data or {}), "ai_learnings": learnings}
     
     async def _auto_update_training_content(
         self,
@@ -351,24 +468,44 @@ class AILearningService:
         """
         Automatically create/update training content based on learnings
         """
-        # Add successful phrases as training content
-        for phrase in learnings["successful_phrases"][:5]:  # Top 5 only
-            # Check if similar content already exists
-            result = await db.execute(
-                select(TrainingContent)
-                .where(TrainingContent.agent_id == agent_id)
-                .where(TrainingContent.content_type == "successful_phrase")
-                .where(TrainingContent.content.contains(phrase["ai_statement"][:30]))
+        phrases = learnings["successful_phrases"][:5]  # Top 5 only
+        objections = [
+            objection for objection in learnings["objection_handling"]
+            if objection["effectiveness"] == "high"
+        ]
+        if not phrases and not objections:
+            return
+        
+        # Build a duplicate index from one lightweight query:
+        # successful phrases keyed by content prefix, rebuttals keyed by category
+        result = await db.execute(
+            select(
+                TrainingContent.id,
+                TrainingContent.content_type,
+                TrainingContent.category,
+                func.substr(TrainingContent.content, 1, 30)
             )
-            existing = result.scalar_one_or_none()
-            
-            if existing:
-                # Increment usage count
-                existing.usage_count += 1
-                existing.success_rate = 100  # It was successful
+            .where(TrainingContent.agent_id == agent_id)
+            .where(TrainingContent.content_type.in_(["successful_phrase", "rebuttal"]))
+        )
+        existing = {}
+        for content_id, content_type, category, prefix in result.all():
+            key = (content_type, prefix if content_type == "successful_phrase" else category)
+            existing.setdefault(key, content_id)
+        
+        bumps = Counter()  # existing id -> usage increments
+        to_insert = {}     # key -> new TrainingContent
+        
+        # Add successful phrases as training content
+        for phrase in phrases:
+            key = ("successful_phrase", phrase["ai_statement"][:30])
+            if key in existing:
+                bumps[existing[key]] += 1
+            elif key in to_insert:
+                to_insert[key].usage_count += 1
             else:
                 # Create new training content
-                training = TrainingContent(
+                to_insert[key] = TrainingContent(
                     agent_id=agent_id,
                     content_type="successful_phrase",
                     title=f"Auto-learned: {phrase['category']}",
@@ -381,60 +518,53 @@ class AILearningService:
                     tags=["auto_learned", "successful", learnings["disposition"]],
                     trigger_keywords=self._extract_keywords(phrase["ai_statement"])
                 )
-                db.add(training)
         
         # Add effective objection responses
-        for objection in learnings["objection_handling"]:
-            if objection["effectiveness"] == "high":
-                result = await db.execute(
-                    select(TrainingContent)
-                    .where(TrainingContent.agent_id == agent_id)
-                    .where(TrainingContent.content_type == "rebuttal")
-                    .where(TrainingContent.category == objection["objection_type"])
+        for objection in objections:
+            key = ("rebuttal", objection["objection_type"])
+            if key in existing:
+                bumps[existing[key]] += 1
+            elif key in to_insert:
+                to_insert[key].usage_count += 1
+            else:
+                to_insert[key] = TrainingContent(
+                    agent_id=agent_id,
+                    content_type="rebuttal",
+                    title=f"Auto-learned: {objection['objection_type']} objection",
+                    content=objection["ai_response"],
+                    category=objection["objection_type"],
+                    priority=85,
+                    is_active=True,
+                    usage_count=1,
+                    success_rate=100,
+                    tags=["auto_learned", "objection", objection["objection_type"]],
+                    trigger_keywords=[objection["objection_type"]]
                 )
-                existing = result.scalar_one_or_none()
-                
-                if existing:
-                    existing.usage_count += 1
-                    existing.success_rate = 100
-                else:
-                    training = TrainingContent(
-                        agent_id=agent_id,
-                        content_type="rebuttal",
-                        title=f"Auto-learned: {objection['objection_type']} objection",
-                        content=objection["ai_response"],
-                        category=objection["objection_type"],
-                        priority=85,
-                        is_active=True,
-                        usage_count=1,
-                        success_rate=100,
-                        tags=["auto_learned", "objection", objection["objection_type"]],
-                        trigger_keywords=[objection["objection_type"]]
-                    )
-                    db.add(training)
         
-        await db.commit()
+        # Increment usage counts (one UPDATE per distinct increment, usually just one)
+        ids_by_increment = {}
+        for content_id, increment in bumps.items():
+            ids_by_increment.setdefault(increment, []).append(content_id)
+        for increment, ids in ids_by_increment.items():
+            await db.execute(
+                update(TrainingContent)
+                .where(TrainingContent.id.in_(ids))
+                .values(usage_count=TrainingContent.usage_count + increment, success_rate=100)
+            )
+        
+        db.add_all(to_insert.values())
+        
         logger.info(f"Auto-updated training content for agent {agent_id}")
     
     def _extract_keywords(self, text: str, max_keywords: int = 5) -> List[str]:
         """
         Extract key words from text
         """
-        # Remove common words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        
-        words = re.findall(r'\b\w+\b', text.lower())
-        keywords = [w for w in words if w not in stop_words and len(w) > 3]
+        words = _NON_WORD_RE.sub(" ", text.lower()).split()
+        keywords = [w for w in words if len(w) > 3 and w not in _STOP_WORDS]
         
         # Return unique keywords (first occurrence)
-        unique_keywords = []
-        for kw in keywords:
-            if kw not in unique_keywords:
-                unique_keywords.append(kw)
-            if len(unique_keywords) >= max_keywords:
-                break
-        
-        return unique_keywords
+        return list(dict.fromkeys(keywords))[:max_keywords]
     
     async def get_learning_insights(
         self,
@@ -445,21 +575,25 @@ class AILearningService:
         """
         Get aggregate learning insights across multiple calls
         """
-        # Build query
-        query = select(Call).where(
-            Call.created_at >= datetime.utcnow() - timedelta(days=days)
-        )
-        
+        filters = [Call.created_at >= datetime.utcnow() - timedelta(days=days)]
         if agent_id:
-            query = query.where(Call.agent_id == agent_id)
+            filters.append(Call.agent_id == agent_id)
         
-        result = await db.execute(query)
-        calls = result.scalars().all()
+        # Count calls per disposition in the database instead of loading every row
+        result = await db.execute(
+            select(Call.disposition, func.count())
+            .where(*filters)
+            .group_by(Call.disposition)
+        )
+        disposition_counts = result.all()
         
         insights = {
             "period_days": days,
-            "total_calls": len(calls),
-            "successful_calls": 0,
+            "total_calls": sum(count for _, count in disposition_counts),
+            "successful_calls": sum(
+                count for disposition, count in disposition_counts
+                if disposition in ["Connected", "Callback"]
+            ),
             "top_successful_phrases": [],
             "top_objections": {},
             "best_rebuttals": [],
@@ -467,27 +601,52 @@ class AILearningService:
             "improvement_trend": []
         }
         
-        # Analyze each call
-        for call in calls:
-            if call.disposition in ["Connected", "Callback"]:
-                insights["successful_calls"] += 1
-            
-            # Extract learnings from custom_data
-            if call.custom_data and "ai_learnings" in call.custom_data:
-                learnings = call.custom_data["ai_learnings"]
-                
-                # Collect successful phrases
+        # Stream only the ai_learnings element of custom_data, skipping calls without it,
+        # so learnings are aggregated without materializing full rows
+        ai_learnings = Call.custom_data["ai_learnings"]
+        stream = await db.stream(
+            select(ai_learnings)
+            .where(*filters)
+            .where(ai_learnings.isnot(None))
+            .execution_options(stream_results=True, yield_per=500)
+        )
+        
+        phrase_heap = []
+        sequence = itertools.count()
+        objection_counter = Counter()
+        successful_counter = Counter()
+        
+        async for learnings in stream.scalars():
+            if isinstance(learnings, (str, bytes)):
+                learnings = _json_loads(learnings)
+            if learnings:
+                # Keep only the top phrases in a bounded min-heap
                 for phrase in learnings.get("successful_phrases", []):
-                    insights["top_successful_phrases"].append(phrase)
+                    entry = (
+                        phrase.get("effectiveness") == "high",
+                        -len(phrase.get("ai_statement", "")),
+                        -next(sequence),
+                        phrase
+                    )
+                    if len(phrase_heap) < self.max_top_phrases:
+                        heapq.heappush(phrase_heap, entry)
+                    elif entry > phrase_heap[0]:
+                        heapq.heapreplace(phrase_heap, entry)
                 
                 # Count objections
-                for obj in learnings.get("objection_handling", []):
-                    obj_type = obj["objection_type"]
-                    if obj_type not in insights["top_objections"]:
-                        insights["top_objections"][obj_type] = {"count": 0, "successful": 0}
-                    insights["top_objections"][obj_type]["count"] += 1
-                    if obj["success"]:
-                        insights["top_objections"][obj_type]["successful"] += 1
+                objection_handling = learnings.get("objection_handling", [])
+                objection_counter.update(obj["objection_type"] for obj in objection_handling)
+                successful_counter.update(
+                    obj["objection_type"] for obj in objection_handling if obj["success"]
+                )
+        
+        insights["top_successful_phrases"] = [
+            entry[-1] for entry in sorted(phrase_heap, reverse=True)
+        ]
+        insights["top_objections"] = {
+            obj_type: {"count": count, "successful": successful_counter[obj_type]}
+            for obj_type, count in objection_counter.most_common()
+        }
         
         # Calculate success rates
         insights["success_rate"] = (
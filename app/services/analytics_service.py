@@ -2,25 +2,91 @@
 Advanced Analytics Service
 Real-time metrics, reporting, and business intelligence
 """
+import asyncio
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, case
-from collections import defaultdict
+from sqlalchemy import select, func, and_, or_, case, extract, lambda_stmt
+from collections import defaultdict, Counter
+from cachetools import TTLCache
 import logging
 
 from app.models.call import Call, CallEvent
 from app.models.agent import Agent
 from app.models.customer import Customer
+from app.database import async_session_maker
+from app.services.call_stats_views import call_stats_views, mv_hourly_call_stats, as_utc_naive, floor_hour
+from app.redis_client import redis_client
 
 logger = logging.getLogger(__name__)
 
+# Dispositions counted as a successful call
+SUCCESS_DISPOSITIONS: frozenset = frozenset({'Connected', 'Sale Made', 'Interested'})
+# Same set in a stable order for SQL IN lists
+_SUCCESS_DISPOSITION_LIST: tuple = tuple(sorted(SUCCESS_DISPOSITIONS))
+
+# Redis key prefix for cached analytics responses
+CACHE_PREFIX = "analytics:"
+# TTL for ranges entirely before today (closed), and for ranges that still
+# include now - new calls land there every few seconds, keep those short
+CACHE_PAST_RANGE_TTL = 7 * 24 * 3600
+CACHE_OPEN_RANGE_TTL = 30
+
+# Realtime dashboard is polled every few seconds by many clients - keep
+# each agent's result in process briefly so concurrent polls share one scan
+DASHBOARD_CACHE_SECONDS = 3
+_dashboard_cache: TTLCache = TTLCache(maxsize=1024, ttl=DASHBOARD_CACHE_SECONDS)
+_dashboard_locks: Dict[Optional[int], asyncio.Lock] = defaultdict(asyncio.Lock)
+
 
 class AnalyticsService:
     """
     Comprehensive analytics and reporting service
     """
     
+    async def _get_cached(self, key: str) -> Optional[Dict]:
+        """Cached analytics response from Redis (None on miss or if Redis is unavailable)"""
+        if not redis_client.redis:
+            return None
+        try:
+            return await redis_client.get(CACHE_PREFIX + key, as_json=True)
+        except Exception as e:
+            logger.warning(f"Analytics cache read failed for {key}: {e}")
+            return None
+    
+    async def _set_cached(self, key: str, value: Dict, ttl: int):
+        """Store an analytics response in Redis with a TTL"""
+        if not redis_client.redis:
+            return
+        try:
+            await redis_client.set(CACHE_PREFIX + key, value, expire=ttl)
+        except Exception as e:
+            logger.warning(f"Analytics cache write failed for {key}: {e}")
+    
+    async def invalidate_cache(self):
+        """
+        Drop all cached analytics responses
+        Called when call dispositions change (e.g. transfers)
+        """
+        if not redis_client.redis:
+            return
+        try:
+            keys = [key async for key in redis_client.redis.scan_iter(match=CACHE_PREFIX + "*")]
+            if keys:
+                await redis_client.redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Analytics cache invalidation failed: {e}")
+    
+    def _range_cache_ttl(self, end_date: datetime) -> int:
+        """
+        TTL for a cached date-range response: a week if the range ended
+        before today (closed), otherwise CACHE_OPEN_RANGE_TTL
+        """
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        if as_utc_naive(end_date) < today_start:
+            return CACHE_PAST_RANGE_TTL
+        return CACHE_OPEN_RANGE_TTL
+    
     async def get_agent_performance(
         self,
         db: AsyncSession,
@@ -36,33 +102,35 @@ class AnalyticsService:
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Query calls
-        query = select(Call).where(
+        # Aggregate per disposition in the database (a handful of rows instead of every call).
+        # lambda_stmt: statement built and compiled once, later calls only rebind parameters
+        query = lambda_stmt(lambda: select(
+            Call.disposition,
+            func.count().label('calls'),
+            func.coalesce(func.sum(Call.duration_seconds), 0).label('duration'),
+            func.count().filter(Call.disposition.in_(_SUCCESS_DISPOSITION_LIST)).label('successful'),
+            func.sum(Call.quality_score).label('quality_sum'),
+            func.count(func.nullif(Call.quality_score, 0)).label('quality_count')
+        ).where(
             and_(
                 Call.agent_id == agent_id,
                 Call.created_at >= start_date,
                 Call.created_at <= end_date
             )
-        )
+        ).group_by(Call.disposition))
         result = await db.execute(query)
-        calls = result.scalars().all()
+        rows = result.all()
         
         # Calculate metrics
-        total_calls = len(calls)
-        total_duration = sum(c.duration for c in calls if c.duration)
+        total_calls = sum(row.calls for row in rows)
+        total_duration = sum(row.duration for row in rows)
         avg_duration = total_duration / total_calls if total_calls > 0 else 0
         
         # Disposition breakdown
-        dispositions = defaultdict(int)
-        for call in calls:
-            if call.disposition:
-                dispositions[call.disposition] += 1
-        
-        # Success rate (Connected, Sale Made, etc.)
-        success_dispositions = ['Connected', 'Sale Made', 'Interested']
-        successful_calls = sum(
-            dispositions[d] for d in success_dispositions if d in dispositions
-        )
+        dispositions = Counter({row.disposition: row.calls for row in rows if row.disposition})
+        
+        # Success rate (Connected, Sale Made, etc.) - counted in SQL
+        successful_calls = sum(row.successful for row in rows)
         success_rate = (successful_calls / total_calls * 100) if total_calls > 0 else 0
         
         # Call outcome analysis
@@ -76,11 +144,12 @@ class AnalyticsService:
         }
         
         # Call quality metrics
-        quality_scores = [c.ai_quality_score for c in calls if c.ai_quality_score]
-        avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+        quality_sum = sum(row.quality_sum or 0 for row in rows)
+        quality_count = sum(row.quality_count for row in rows)
+        avg_quality = quality_sum / quality_count if quality_count else 0
         
         outcomes['average_quality_score'] = round(avg_quality, 2)
-        outcomes['calls_with_quality_score'] = len(quality_scores)
+        outcomes['calls_with_quality_score'] = quality_count
         
         return outcomes
     
@@ -91,43 +160,103 @@ class AnalyticsService:
     ) -> Dict:
         """
         Real-time dashboard metrics for monitoring
+        Served from a short in-process cache; only one coroutine per agent
+        computes a fresh result while the others wait for it
         """
+        dashboard = _dashboard_cache.get(agent_id)
+        if dashboard is not None:
+            return dashboard
+        
+        async with _dashboard_locks[agent_id]:
+            dashboard = _dashboard_cache.get(agent_id)
+            if dashboard is None:
+                dashboard = await self._build_realtime_dashboard(db, agent_id)
+                _dashboard_cache[agent_id] = dashboard
+            return dashboard
+    
+    async def _build_realtime_dashboard(
+        self,
+        db: AsyncSession,
+        agent_id: Optional[int] = None
+    ) -> Dict:
+        """Compute the real-time dashboard metrics"""
         now = datetime.utcnow()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Base query
-        base_query = select(Call).where(Call.created_at >= today_start)
+        hourly_stats = Counter()
+        total_calls = 0
+        total_duration = 0
+        
+        # Kick off a background refresh if the views are stale; this request
+        # still reads the current views plus the live rows after them
+        await call_stats_views.maybe_refresh()
+        
+        # Whole hours already rolled up in mv_hourly_call_stats
+        live_start = today_start
+        covered = call_stats_views.covered_range(today_start, now)
+        if covered:
+            covered_start, live_start = covered
+            mv = mv_hourly_call_stats
+            mv_hour = extract('hour', mv.c.bucket)
+            mv_query = select(
+                mv_hour.label('hour'),
+                func.sum(mv.c.n).label('calls'),
+                func.coalesce(func.sum(mv.c.dur), 0).label('duration')
+            ).where(
+                mv.c.bucket >= covered_start,
+                mv.c.bucket < live_start
+            )
+            if agent_id:
+                mv_query = mv_query.where(mv.c.agent_id == agent_id)
+            
+            result = await db.execute(mv_query.group_by(mv_hour))
+            for row in result.all():
+                hourly_stats[int(row.hour)] += row.calls
+                total_calls += row.calls
+                total_duration += row.duration
+        
+        # Live rows: everything after the roll-up plus the last hour for recent activity.
+        # Streamed as plain tuples in batches instead of hydrating Call objects
+        base_query = select(
+            Call.created_at,
+            Call.status,
+            func.coalesce(Call.duration_seconds, 0)
+        ).where(
+            Call.created_at >= min(live_start, now - timedelta(hours=1))
+        ).execution_options(yield_per=1000)
         if agent_id:
             base_query = base_query.where(Call.agent_id == agent_id)
         
-        result = await db.execute(base_query)
-        today_calls = result.scalars().all()
-        
-        # Active calls (in last 5 minutes)
+        last_hour_start = now - timedelta(hours=1)
         active_threshold = now - timedelta(minutes=5)
-        active_calls = [
-            c for c in today_calls 
-            if c.created_at >= active_threshold and c.status in ['active', 'ringing']
-        ]
+        active_calls = 0
+        calls_last_hour = 0
         
-        # Calls per hour (last 24 hours)
-        hourly_stats = defaultdict(int)
-        for call in today_calls:
-            hour = call.created_at.hour
-            hourly_stats[hour] += 1
+        stream = await db.stream(base_query)
+        async for created_at, status, duration in stream:
+            created_at_utc = as_utc_naive(created_at)
+            
+            # Calls per hour (today)
+            if created_at_utc >= live_start:
+                hourly_stats[created_at.hour] += 1
+                total_calls += 1
+                total_duration += duration
+            
+            if created_at_utc >= last_hour_start:
+                calls_last_hour += 1
+            
+            # Active calls (in last 5 minutes)
+            if created_at_utc >= active_threshold and status in ['active', 'ringing']:
+                active_calls += 1
         
         return {
             'timestamp': now.isoformat(),
-            'today_total_calls': len(today_calls),
-            'active_calls': len(active_calls),
-            'calls_last_hour': sum(
-                1 for c in today_calls 
-                if c.created_at >= now - timedelta(hours=1)
-            ),
+            'today_total_calls': total_calls,
+            'active_calls': active_calls,
+            'calls_last_hour': calls_last_hour,
             'hourly_breakdown': dict(hourly_stats),
             'average_call_duration_today': round(
-                sum(c.duration for c in today_calls if c.duration) / len(today_calls)
-                if today_calls else 0,
+                total_duration / total_calls if total_calls else 0,
                 2
             )
         }
@@ -140,72 +269,121 @@ class AnalyticsService:
     ) -> Dict:
         """
         Campaign-wide analytics and insights
+        Cached in Redis keyed by the date range
         """
-        # Get all calls in date range
-        query = select(Call).where(
+        cache_key = f"campaign:{start_date.isoformat()}:{end_date.isoformat()}"
+        cached = await self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Aggregate per (agent, hour, disposition) in the database
+        hour = extract('hour', Call.created_at)
+        query = select(
+            Call.agent_id,
+            hour.label('hour'),
+            Call.disposition,
+            func.count().label('calls'),
+            func.coalesce(func.sum(Call.duration_seconds), 0).label('duration')
+        ).where(
             and_(
                 Call.created_at >= start_date,
                 Call.created_at <= end_date
             )
         )
-        result = await db.execute(query)
-        calls = result.scalars().all()
+        rows = []
+        
+        # Whole hours already rolled up in mv_hourly_call_stats; only the
+        # partial hours at the edges and rows after the last refresh hit calls
+        covered = call_stats_views.covered_range(start_date, end_date)
+        if covered:
+            covered_start, covered_end = covered
+            mv = mv_hourly_call_stats
+            mv_hour = extract('hour', mv.c.bucket)
+            mv_disposition = func.nullif(mv.c.disposition, '')
+            mv_query = select(
+                mv.c.agent_id,
+                mv_hour.label('hour'),
+                mv_disposition.label('disposition'),
+                func.sum(mv.c.n).label('calls'),
+                func.coalesce(func.sum(mv.c.dur), 0).label('duration')
+            ).where(
+                mv.c.bucket >= covered_start,
+                mv.c.bucket < covered_end
+            ).group_by(mv.c.agent_id, mv_hour, mv_disposition)
+            
+            result = await db.execute(mv_query)
+            rows.extend(result.all())
+            
+            query = query.where(
+                or_(Call.created_at < covered_start, Call.created_at >= covered_end)
+            )
+        
+        result = await db.execute(query.group_by(Call.agent_id, hour, Call.disposition))
+        rows.extend(result.all())
         
-        if not calls:
-            return {
+        if not rows:
+            analytics = {
                 'total_calls': 0,
                 'message': 'No calls found in this date range'
             }
+            await self._set_cached(cache_key, analytics, self._range_cache_ttl(end_date))
+            return analytics
         
-        # Agent performance comparison
+        total_calls = 0
+        total_duration = 0
         agent_stats = defaultdict(lambda: {'calls': 0, 'duration': 0, 'success': 0})
-        for call in calls:
-            agent_id = call.agent_id or 0
-            agent_stats[agent_id]['calls'] += 1
-            agent_stats[agent_id]['duration'] += call.duration or 0
-            if call.disposition in ['Connected', 'Sale Made', 'Interested']:
-                agent_stats[agent_id]['success'] += 1
-        
-        # Best performing agent
-        best_agent = max(
-            agent_stats.items(),
-            key=lambda x: x[1]['success'] / x[1]['calls'] if x[1]['calls'] > 0 else 0
-        ) if agent_stats else (None, None)
-        
-        # Time-based insights
-        peak_hours = defaultdict(int)
-        for call in calls:
-            peak_hours[call.created_at.hour] += 1
-        
-        best_hour = max(peak_hours.items(), key=lambda x: x[1])[0] if peak_hours else None
-        
-        # Disposition analysis
-        disposition_counts = defaultdict(int)
-        for call in calls:
-            if call.disposition:
-                disposition_counts[call.disposition] += 1
+        peak_hours = Counter()
+        best_hour = None
+        disposition_counts = Counter()
         
-        return {
+        # Rows are (agent_id, hour, disposition, calls, duration) tuples
+        for agent_id, hour_of_day, disposition, calls, duration in rows:
+            total_calls += calls
+            total_duration += duration
+            
+            # Agent performance comparison
+            agent_id = agent_id or 0
+            agent_stats[agent_id]['calls'] += calls
+            agent_stats[agent_id]['duration'] += duration
+            if disposition in SUCCESS_DISPOSITIONS:
+                agent_stats[agent_id]['success'] += calls
+            
+            # Time-based insights
+            hour_of_day = int(hour_of_day)
+            peak_hours[hour_of_day] += calls
+            if best_hour is None or peak_hours[hour_of_day] > peak_hours[best_hour]:
+                best_hour = hour_of_day
+            
+            # Disposition analysis
+            if disposition:
+                disposition_counts[disposition] += calls
+        
+        # Best performing agent (rates are final only after the fold above,
+        # so pick the best-so-far in one pass over the per-agent totals)
+        best_agent_id = None
+        best_rate = -1.0
+        for agent_id, stats in agent_stats.items():
+            rate = stats['success'] / stats['calls'] if stats['calls'] else 0
+            if rate > best_rate:
+                best_agent_id, best_rate = agent_id, rate
+        
+        analytics = {
             'date_range': {
                 'start': start_date.isoformat(),
                 'end': end_date.isoformat()
             },
-            'total_calls': len(calls),
+            'total_calls': total_calls,
             'total_agents': len(agent_stats),
-            'best_performing_agent_id': best_agent[0] if best_agent[0] else None,
-            'best_performing_agent_success_rate': round(
-                best_agent[1]['success'] / best_agent[1]['calls'] * 100
-                if best_agent[1] and best_agent[1]['calls'] > 0 else 0,
-                2
-            ),
+            'best_performing_agent_id': best_agent_id if best_agent_id else None,
+            'best_performing_agent_success_rate': round(max(best_rate, 0) * 100, 2),
             'peak_calling_hour': best_hour,
             'disposition_summary': dict(disposition_counts),
-            'total_duration_minutes': round(sum(c.duration for c in calls if c.duration) / 60, 2),
-            'average_call_duration': round(
-                sum(c.duration for c in calls if c.duration) / len(calls),
-                2
-            )
+            'total_duration_minutes': round(total_duration / 60, 2),
+            'average_call_duration': round(total_duration / total_calls, 2)
         }
+        await self._set_cached(cache_key, analytics, self._range_cache_ttl(end_date))
+        
+        return analytics
     
     async def get_conversion_funnel(
         self,
@@ -215,22 +393,31 @@ class AnalyticsService:
     ) -> Dict:
         """
         Analyze conversion funnel: Total Calls → Connected → Interested → Sale
+        Cached in Redis per (days, agent_id); the window start is snapped to
+        the hour so polls within the same hour share one cache entry
         """
-        start_date = datetime.utcnow() - timedelta(days=days)
+        now = datetime.utcnow()
+        start_date = floor_hour(now - timedelta(days=days))
         
-        base_query = select(Call).where(Call.created_at >= start_date)
-        if agent_id:
-            base_query = base_query.where(Call.agent_id == agent_id)
+        cache_key = f"funnel:{start_date.isoformat()}:{agent_id}"
+        cached = await self._get_cached(cache_key)
+        if cached is not None:
+            return cached
         
-        result = await db.execute(base_query)
-        calls = result.scalars().all()
+        # All four funnel stages in one aggregate row
+        query = lambda_stmt(lambda: select(
+            func.count().label('total'),
+            func.count().filter(Call.disposition == 'Connected').label('connected'),
+            func.count().filter(Call.disposition.in_(['Interested', 'Callback'])).label('interested'),
+            func.count().filter(Call.disposition == 'Sale Made').label('sales')
+        ).where(Call.created_at >= start_date))
+        if agent_id:
+            query += lambda s: s.where(Call.agent_id == agent_id)
         
-        total = len(calls)
-        connected = sum(1 for c in calls if c.disposition == 'Connected')
-        interested = sum(1 for c in calls if c.disposition in ['Interested', 'Callback'])
-        sales = sum(1 for c in calls if c.disposition == 'Sale Made')
+        result = await db.execute(query)
+        total, connected, interested, sales = result.one()
         
-        return {
+        funnel = {
             'funnel': {
                 'total_calls': total,
                 'connected': connected,
@@ -245,6 +432,17 @@ class AnalyticsService:
             },
             'period_days': days
         }
+        
+        # Window runs up to now - new calls change it, so only cache briefly
+        await self._set_cached(cache_key, funnel, CACHE_OPEN_RANGE_TTL)
+        
+        return funnel
+    
+    async def _fetch_one(self, query):
+        """Run a single-row query on its own session so it can run alongside other queries"""
+        async with async_session_maker() as own_db:
+            result = await own_db.execute(query)
+            return result.one_or_none()
     
     async def get_customer_insights(
         self,
@@ -254,55 +452,73 @@ class AnalyticsService:
         """
         Get detailed customer interaction history and insights
         """
-        # Get all calls for this customer
-        query = select(Call).where(Call.customer_id == customer_id).order_by(Call.created_at.desc())
-        result = await db.execute(query)
-        calls = result.scalars().all()
+        # Last 10 calls, engagement aggregates and customer details run
+        # concurrently (an AsyncSession runs one query at a time, so the
+        # single-row lookups use their own short-lived sessions)
+        history_query = lambda_stmt(lambda: select(
+            Call.call_id,
+            Call.created_at,
+            Call.duration_seconds,
+            Call.disposition,
+            Call.agent_id,
+            Call.summary
+        ).where(Call.customer_id == customer_id).order_by(Call.created_at.desc()).limit(10))
+        
+        totals_query = lambda_stmt(lambda: select(
+            func.count(),
+            func.coalesce(func.sum(Call.duration_seconds), 0),
+            func.min(Call.created_at),
+            func.max(Call.created_at)
+        ).where(Call.customer_id == customer_id))
+        
+        customer_query = lambda_stmt(
+            lambda: select(Customer.full_name, Customer.phone).where(Customer.id == customer_id)
+        )
+        
+        history_result, totals, customer = await asyncio.gather(
+            db.execute(history_query),
+            self._fetch_one(totals_query),
+            self._fetch_one(customer_query)
+        )
+        history_rows = history_result.all()
+        total_calls, total_duration, first_call, last_call = totals
         
-        if not calls:
+        if not total_calls:
             return {'customer_id': customer_id, 'total_calls': 0}
         
-        # Get customer details
-        customer_query = select(Customer).where(Customer.id == customer_id)
-        customer_result = await db.execute(customer_query)
-        customer = customer_result.scalar_one_or_none()
-        
-        # Analyze call history
-        call_history = []
-        for call in calls:
-            call_history.append({
-                'call_id': call.call_id,
-                'date': call.created_at.isoformat(),
-                'duration': call.duration,
-                'disposition': call.disposition,
-                'agent_id': call.agent_id,
-                'summary': call.call_summary
-            })
-        
-        # Engagement metrics
-        total_duration = sum(c.duration for c in calls if c.duration)
-        avg_duration = total_duration / len(calls) if calls else 0
+        call_history = [
+            {
+                'call_id': row.call_id,
+                'date': row.created_at.isoformat(),
+                'duration': row.duration_seconds,
+                'disposition': row.disposition,
+                'agent_id': row.agent_id,
+                'summary': row.summary
+            }
+            for row in history_rows
+        ]
+        
+        avg_duration = total_duration / total_calls
         
         # Last disposition
-        last_disposition = calls[0].disposition if calls else None
+        last_disposition = history_rows[0].disposition if history_rows else None
         
         # Call frequency
-        first_call = calls[-1].created_at if calls else None
-        days_since_first = (datetime.utcnow() - first_call).days if first_call else 0
-        call_frequency = len(calls) / days_since_first if days_since_first > 0 else 0
+        days_since_first = (datetime.utcnow() - as_utc_naive(first_call)).days if first_call else 0
+        call_frequency = total_calls / days_since_first if days_since_first > 0 else 0
         
         return {
             'customer_id': customer_id,
-            'customer_name': customer.name if customer else None,
+            'customer_name': customer.full_name if customer else None,
             'customer_phone': customer.phone if customer else None,
-            'total_calls': len(calls),
+            'total_calls': total_calls,
             'first_contact': first_call.isoformat() if first_call else None,
-            'last_contact': calls[0].created_at.isoformat() if calls else None,
+            'last_contact': last_call.isoformat() if last_call else None,
             'last_disposition': last_disposition,
             'total_engagement_time': total_duration,
             'average_call_duration': round(avg_duration, 2),
             'call_frequency_per_day': round(call_frequency, 2),
-            'call_history': call_history[:10]  # Last 10 calls
+            'call_history': call_history
         }
 
 
@@ -0,0 +1,341 @@
+"""
+Call Stats Views Service
+Refreshes the call statistics materialized views used by analytics
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from itertools import chain
+from typing import Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import event, text, table, column, Integer, String, DateTime, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import async_session_maker, engine
+from app.models.call import Call
+from app.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# Materialized views created by migrations/002_add_call_stats_views.py
+CALL_STATS_VIEWS = ("mv_hourly_call_stats", "mv_daily_call_stats")
+
+# Redis keys shared by all workers: call writes since the last refresh,
+# last refresh time, and a lock so only one worker refreshes at a time
+WRITES_KEY = "call_stats_views:writes"
+LAST_REFRESH_KEY = "call_stats_views:last_refresh"
+REFRESH_LOCK_KEY = "call_stats_views:refresh_lock"
+
+# Monthly calls partitions kept ahead of the current month once calls is
+# partitioned (migrations/006_partition_calls_by_month.py)
+PARTITION_MONTHS_AHEAD = 3
+
+# Lightweight table construct for querying the hourly roll-up
+# (disposition is '' where the call had no disposition)
+mv_hourly_call_stats = table(
+    "mv_hourly_call_stats",
+    column("agent_id", Integer),
+    column("bucket", DateTime(timezone=True)),
+    column("disposition", String),
+    column("n", Integer),
+    column("dur", Integer),
+    column("q_sum", Float),
+    column("q_n", Integer),
+)
+
+
+def as_utc_naive(value: datetime) -> datetime:
+    """Normalize aware datetimes to naive UTC (naive values are assumed UTC)"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_hour(value: datetime) -> datetime:
+    """Truncate a datetime to the start of its hour"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class CallStatsViews:
+    """
+    Usage-driven refresher for the call statistics materialized views
+    Views are refreshed when they are read and either enough calls were
+    written or the last refresh is too old - idle tables are not refreshed.
+    Tracks when the views were last refreshed so readers know which
+    time range the roll-ups cover
+    """
+    
+    def __init__(
+        self,
+        max_age_seconds: int = 60,
+        max_writes: int = 500,
+        fallback_interval_minutes: int = 2
+    ):
+        self.scheduler = AsyncIOScheduler()
+        self.max_age_seconds = max_age_seconds
+        self.max_writes = max_writes
+        self.fallback_interval_minutes = fallback_interval_minutes
+        self.running = False
+        self.last_refresh_at: Optional[datetime] = None
+        
+        # Call writes flushed by this process not yet pushed to Redis
+        # (and the total when Redis is unavailable)
+        self.pending_writes = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Refresh once and schedule a fallback check for views nobody reads"""
+        if engine.dialect.name != "postgresql":
+            logger.info("Call stats views need PostgreSQL - analytics will query calls directly")
+            return
+        
+        if not self.running:
+            await self.ensure_partitions()
+            await self.refresh()
+            
+            self.scheduler.add_job(
+                self.maybe_refresh,
+                'interval',
+                minutes=self.fallback_interval_minutes,
+                id='refresh_call_stats_views'
+            )
+            self.scheduler.add_job(
+                self.ensure_partitions,
+                'interval',
+                hours=24,
+                id='ensure_calls_partitions'
+            )
+            
+            self.scheduler.start()
+            self.running = True
+            logger.info(
+                f"Call stats views refresher started - refresh after {self.max_writes} writes "
+                f"or {self.max_age_seconds}s staleness"
+            )
+    
+    async def stop(self):
+        """Stop periodic refreshes"""
+        if self.running:
+            self.scheduler.shutdown()
+            self.running = False
+            logger.info("Call stats views refresher stopped")
+    
+    def record_writes(self, count: int):
+        """Count call rows written since the last refresh (called on flush)"""
+        self.pending_writes += count
+    
+    async def _sync_state(self) -> int:
+        """
+        Push pending writes to Redis and pick up refreshes done by other workers
+        Returns the number of call writes since the last refresh
+        """
+        if not redis_client.redis:
+            return self.pending_writes
+        
+        pending, self.pending_writes = self.pending_writes, 0
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                pipe.incrby(WRITES_KEY, pending)
+                pipe.get(LAST_REFRESH_KEY)
+                writes, last_refresh = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Call stats views state sync failed: {e}")
+            self.pending_writes += pending
+            return self.pending_writes
+        
+        if last_refresh:
+            shared_refresh_at = datetime.fromisoformat(last_refresh)
+            if self.last_refresh_at is None or shared_refresh_at > self.last_refresh_at:
+                self.last_refresh_at = shared_refresh_at
+        return int(writes)
+    
+    async def maybe_refresh(self):
+        """
+        Start a background refresh if the views are stale enough
+        Never blocks the caller - readers keep using the current views and
+        query calls directly for the range after the last refresh
+        """
+        if not self.running or (self._refresh_task and not self._refresh_task.done()):
+            return
+        
+        writes = await self._sync_state()
+        if not writes:
+            return
+        
+        age = (
+            (datetime.utcnow() - self.last_refresh_at).total_seconds()
+            if self.last_refresh_at else None
+        )
+        if writes > self.max_writes or age is None or age > self.max_age_seconds:
+            self._refresh_task = asyncio.create_task(self.refresh())
+    
+    async def refresh(self) -> bool:
+        """
+        REFRESH MATERIALIZED VIEW CONCURRENTLY for all call stats views
+        Readers are not blocked while a refresh runs
+        """
+        started_at = datetime.utcnow()
+        
+        # Writes counted so far are covered by this refresh
+        writes = await self._sync_state()
+        
+        locked = False
+        if redis_client.redis:
+            try:
+                locked = await redis_client.redis.set(REFRESH_LOCK_KEY, "1", nx=True, ex=300)
+                if not locked:
+                    logger.debug("Call stats views refresh already running in another worker")
+                    return False
+            except Exception as e:
+                logger.warning(f"Call stats views refresh lock failed: {e}")
+        
+        try:
+            async with async_session_maker() as db:
+                for view in CALL_STATS_VIEWS:
+                    await db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+                await db.commit()
+            
+            # Rows created after the refresh started may be missing from the views
+            self.last_refresh_at = started_at
+            if redis_client.redis:
+                async with redis_client.redis.pipeline(transaction=False) as pipe:
+                    pipe.decrby(WRITES_KEY, writes)
+                    pipe.set(LAST_REFRESH_KEY, started_at.isoformat())
+                    await pipe.execute()
+            else:
+                self.pending_writes = max(self.pending_writes - writes, 0)
+            
+            logger.debug(f"Call stats views refreshed at {started_at.isoformat()}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error refreshing call stats views: {e}")
+            return False
+        
+        finally:
+            if locked:
+                try:
+                    await redis_client.redis.delete(REFRESH_LOCK_KEY)
+                except Exception as e:
+                    logger.warning(f"Call stats views refresh unlock failed: {e}")
+    
+    async def ensure_partitions(self) -> int:
+        """
+        Create the next monthly calls partitions ahead of time
+        No-op while calls is a plain table. Returns partitions created
+        
+        Rows already in calls_default for a missing month (e.g. the job did
+        not run for a while) are moved into the new partition - the default
+        partition is detached meanwhile, PostgreSQL refuses to create a
+        partition whose range the default still holds rows for
+        """
+        created = 0
+        try:
+            async with async_session_maker() as db:
+                result = await db.execute(text(
+                    "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'calls'::regclass"
+                ))
+                if not result.first():
+                    return 0
+                
+                today = datetime.utcnow().date()
+                month = date(today.year, today.month, 1)
+                for _ in range(PARTITION_MONTHS_AHEAD + 1):
+                    next_month = add_months(month, 1)
+                    name = f"calls_{month:%Y_%m}"
+                    result = await db.execute(text("SELECT to_regclass(:name)"), {"name": name})
+                    if result.scalar() is None:
+                        # One transaction per month - a failure leaves the others alone
+                        try:
+                            await self._create_partition(db, name, month, next_month)
+                            await db.commit()
+                            created += 1
+                        except Exception as e:
+                            await db.rollback()
+                            logger.error(
+                                f"Could not create calls partition {name} "
+                                f"({month.isoformat()} - {next_month.isoformat()}), "
+                                f"its calls stay in calls_default: {e}"
+                            )
+                    month = next_month
+            
+            if created:
+                logger.info(f"Created {created} calls partitions")
+            return created
+        
+        except Exception as e:
+            logger.error(f"Error creating calls partitions: {e}")
+            return created
+    
+    async def _create_partition(self, db: AsyncSession, name: str, month: date, next_month: date):
+        """Create one monthly partition, moving its rows out of calls_default first"""
+        bounds = {"start": month, "end": next_month}
+        create = f"""
+            CREATE TABLE {name} PARTITION OF calls
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')
+        """
+        
+        result = await db.execute(text("""
+            SELECT count(*) FROM calls_default
+            WHERE created_at >= :start AND created_at < :end
+        """), bounds)
+        stranded = result.scalar()
+        if not stranded:
+            await db.execute(text(create))
+            return
+        
+        logger.warning(f"calls_default holds {stranded} calls for {name} - moving them into the new partition")
+        await db.execute(text("ALTER TABLE calls DETACH PARTITION calls_default"))
+        await db.execute(text(create))
+        await db.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM calls_default
+                WHERE created_at >= :start AND created_at < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), bounds)
+        await db.execute(text("ALTER TABLE calls ATTACH PARTITION calls_default DEFAULT"))
+        logger.info(f"Moved {stranded} calls from calls_default into {name}")
+    
+    def covered_range(self, start: datetime, end: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Whole-hour range [covered_start, covered_end) inside [start, end] that
+        mv_hourly_call_stats fully covers, or None if the views cannot be used
+        """
+        if self.last_refresh_at is None:
+            return None
+        
+        start, end = as_utc_naive(start), as_utc_naive(end)
+        covered_start = floor_hour(start)
+        if covered_start < start:
+            covered_start += timedelta(hours=1)
+        covered_end = min(floor_hour(end), floor_hour(self.last_refresh_at))
+        
+        if covered_end <= covered_start:
+            return None
+        return covered_start, covered_end
+
+
+# Global instance
+call_stats_views = CallStatsViews()
+
+
+@event.listens_for(Session, "after_flush")
+def _count_call_writes(session, flush_context):
+    """Count inserted/updated/deleted calls towards the next views refresh"""
+    count = sum(
+        1 for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Call)
+    )
+    if count:
+        call_stats_views.record_writes(count)
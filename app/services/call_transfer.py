@@ -4,32 +4,47 @@ Handles transferring calls to human agents or supervisors
 """
 from typing import Dict, Optional, List
 from datetime import datetime
+import json
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, lambda_stmt
 import logging
 
-from app.models.call import Call
+from app.models.call import Call, CallEvent
 from app.models.agent import Agent
+from app.services.analytics_service import analytics_service
+from app.database import ORJSON_AVAILABLE
+
+if ORJSON_AVAILABLE:
+    import orjson
 
 logger = logging.getLogger(__name__)
 
 
+TRANSFER_REASONS: Dict[str, str] = {
+    "customer_request": "Customer requested human agent",
+    "complex_query": "Query too complex for AI",
+    "escalation": "Customer escalation",
+    "technical_issue": "Technical issue with AI",
+    "sales_closure": "Final sales closure required",
+    "supervisor_request": "Supervisor requested",
+    "language_barrier": "Language not supported",
+    "compliance": "Compliance requirement"
+}
+
+# GET /api/calls/transfer/reasons body - static, so encoded once at import
+TRANSFER_REASONS_JSON: bytes = (
+    orjson.dumps({"reasons": TRANSFER_REASONS}) if ORJSON_AVAILABLE
+    else json.dumps({"reasons": TRANSFER_REASONS}).encode()
+)
+
+
 class CallTransferService:
     """
     Manages call transfers from AI agents to human agents
     """
     
     def __init__(self):
-        self.transfer_reasons = {
-            "customer_request": "Customer requested human agent",
-            "complex_query": "Query too complex for AI",
-            "escalation": "Customer escalation",
-            "technical_issue": "Technical issue with AI",
-            "sales_closure": "Final sales closure required",
-            "supervisor_request": "Supervisor requested",
-            "language_barrier": "Language not supported",
-            "compliance": "Compliance requirement"
-        }
+        self.transfer_reasons = TRANSFER_REASONS
     
     async def initiate_transfer(
         self,
@@ -56,8 +71,7 @@ class CallTransferService:
         """
         try:
             # Get call details
-            result = await db.execute(select(Call).where(Call.id == call_id))
-            call = result.scalar_one_or_none()
+            call = await self._get_call(db, call_id)
             
             if not call:
                 return {"status": "error", "error": "Call not found"}
@@ -88,6 +102,31 @@ class CallTransferService:
             logger.error(f"Transfer initiation failed for call {call_id}: {e}")
             return {"status": "error", "error": str(e)}
     
+    async def _get_call(self, db: AsyncSession, call_id: int) -> Optional[Call]:
+        """
+        Load a call by primary key
+        (lambda_stmt - statement built and compiled once, later calls only rebind call_id)
+        """
+        result = await db.execute(lambda_stmt(lambda: select(Call).where(Call.id == call_id)))
+        return result.scalar_one_or_none()
+    
+    def _transfer_event(
+        self,
+        call: Call,
+        event_type: str,
+        timestamp: datetime,
+        **event_data
+    ) -> CallEvent:
+        """
+        Append-only transfer history row for the call
+        """
+        return CallEvent(
+            call_id=call.call_id,
+            event_type=event_type,
+            event_data=event_data,
+            timestamp=timestamp
+        )
+    
     async def _find_available_agent(
         self,
         db: AsyncSession,
@@ -101,25 +140,36 @@ class CallTransferService:
         2. Least busy agent (lowest active call count)
         """
         try:
-            query = select(Agent).where(
+            # Least busy agent first; rows locked by a concurrent transfer are
+            # skipped so two transfers never pick the same agent
+            query = lambda_stmt(lambda: select(Agent.id).where(
                 Agent.is_active == True,
                 Agent.status == "available",
                 Agent.role == "agent"  # Human agents only, not AI
-            )
+            ))
             
             # Filter by queue/skill if specified
             if queue:
-                query = query.where(Agent.tags.contains([queue]))
+                skill_filter = Agent.tags.contains([queue])
+                query += lambda s: s.where(skill_filter)
+            
+            query += lambda s: s.order_by(
+                Agent.active_call_count.asc().nullsfirst(),
+                Agent.id
+            ).limit(1).with_for_update(skip_locked=True)
             
             result = await db.execute(query)
-            agents = result.scalars().all()
+            agent_id = result.scalar_one_or_none()
             
-            if not agents:
+            if agent_id is None:
                 return None
             
-            # Return first available agent
-            # TODO: Implement load balancing logic
-            return agents[0].id
+            # Reserve the agent in the same transaction as the lock
+            await db.execute(
+                update(Agent).where(Agent.id == agent_id).values(status="on_call")
+            )
+            
+            return agent_id
         
         except Exception as e:
             logger.error(f"Error finding available agent: {e}")
@@ -138,34 +188,39 @@ class CallTransferService:
         """
         try:
             # Get target agent
-            result = await db.execute(select(Agent).where(Agent.id == target_agent_id))
+            result = await db.execute(lambda_stmt(lambda: select(Agent).where(Agent.id == target_agent_id)))
             target_agent = result.scalar_one_or_none()
             
             if not target_agent:
                 return {"status": "error", "error": "Target agent not found"}
             
+            now = datetime.utcnow()
+            
             # Update call record
             call.status = "transferred"
             call.outcome = f"Transferred to {target_agent.full_name}"
             call.disposition = "Transfer"
             
-            # Add transfer notes
-            transfer_note = f"\n[{datetime.utcnow().isoformat()}] TRANSFER: {self.transfer_reasons.get(transfer_reason)}"
-            if notes:
-                transfer_note += f"\nNotes: {notes}"
-            transfer_note += f"\nTransferred to: Agent {target_agent.agent_id} ({target_agent.full_name})"
-            
-            if call.notes:
-                call.notes += transfer_note
-            else:
-                call.notes = transfer_note
+            # Transfer history goes to call_events instead of rewriting call.notes
+            db.add(self._transfer_event(
+                call, "transfer", now,
+                reason=transfer_reason,
+                reason_text=self.transfer_reasons.get(transfer_reason),
+                notes=notes,
+                target_agent_id=target_agent.id,
+                target_agent_name=target_agent.full_name
+            ))
             
             # Update target agent status
             target_agent.status = "on_call"
             target_agent.current_call_id = call.id
+            target_agent.active_call_count = (target_agent.active_call_count or 0) + 1
             
             await db.commit()
             
+            # Disposition changed - cached analytics are stale
+            await analytics_service.invalidate_cache()
+            
             logger.info(
                 f"Call {call.id} transferred from AI agent {call.agent_id} "
                 f"to human agent {target_agent_id} - Reason: {transfer_reason}"
@@ -177,7 +232,7 @@ class CallTransferService:
                 "target_agent_id": target_agent_id,
                 "target_agent_name": target_agent.full_name,
                 "transfer_reason": transfer_reason,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now.isoformat()
             }
         
         except Exception as e:
@@ -197,19 +252,19 @@ class CallTransferService:
         Queue transfer when no agents available
         """
         try:
+            now = datetime.utcnow()
+            
             call.status = "transfer_queued"
             call.outcome = f"Queued for transfer - {queue or 'default'}"
+            call.transfer_queue = queue or "default"
             
-            queue_note = f"\n[{datetime.utcnow().isoformat()}] QUEUED FOR TRANSFER"
-            queue_note += f"\nReason: {self.transfer_reasons.get(transfer_reason)}"
-            queue_note += f"\nQueue: {queue or 'default'}"
-            if notes:
-                queue_note += f"\nNotes: {notes}"
-            
-            if call.notes:
-                call.notes += queue_note
-            else:
-                call.notes = queue_note
+            db.add(self._transfer_event(
+                call, "transfer_queued", now,
+                reason=transfer_reason,
+                reason_text=self.transfer_reasons.get(transfer_reason),
+                queue=call.transfer_queue,
+                notes=notes
+            ))
             
             await db.commit()
             
@@ -221,7 +276,7 @@ class CallTransferService:
                 "queue": queue or "default",
                 "transfer_reason": transfer_reason,
                 "message": "No agents available. Call queued for transfer.",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now.isoformat()
             }
         
         except Exception as e:
@@ -239,8 +294,7 @@ class CallTransferService:
         Cancel a pending transfer request
         """
         try:
-            result = await db.execute(select(Call).where(Call.id == call_id))
-            call = result.scalar_one_or_none()
+            call = await self._get_call(db, call_id)
             
             if not call:
                 return {"status": "error", "error": "Call not found"}
@@ -248,15 +302,18 @@ class CallTransferService:
             if call.status != "transfer_queued":
                 return {"status": "error", "error": "Call not in transfer queue"}
             
+            now = datetime.utcnow()
+            
+            db.add(self._transfer_event(
+                call, "transfer_cancelled", now,
+                reason=reason,
+                queue=call.transfer_queue
+            ))
+            
             # Restore call to active
             call.status = "answered"
             call.outcome = None
-            
-            cancel_note = f"\n[{datetime.utcnow().isoformat()}] TRANSFER CANCELLED: {reason}"
-            if call.notes:
-                call.notes += cancel_note
-            else:
-                call.notes = cancel_note
+            call.transfer_queue = None
             
             await db.commit()
             
@@ -266,7 +323,7 @@ class CallTransferService:
                 "status": "cancelled",
                 "call_id": call_id,
                 "reason": reason,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now.isoformat()
             }
         
         except Exception as e:
@@ -282,25 +339,31 @@ class CallTransferService:
         Get list of calls waiting for transfer
         """
         try:
-            query = select(Call).where(Call.status == "transfer_queued")
+            # Read-only listing - plain row tuples instead of Call objects
+            query = lambda_stmt(lambda: select(
+                Call.id,
+                Call.to_number,
+                Call.initiated_at,
+                Call.notes
+            ).where(Call.status == "transfer_queued"))
             
             if queue:
-                query = query.where(Call.notes.contains(f"Queue: {queue}"))
+                query += lambda s: s.where(Call.transfer_queue == queue)
             
-            query = query.order_by(Call.initiated_at)
+            query += lambda s: s.order_by(Call.initiated_at)
             
             result = await db.execute(query)
-            calls = result.scalars().all()
+            now = datetime.utcnow()
             
             return [
                 {
-                    "call_id": c.id,
-                    "customer_phone": c.customer_phone,
-                    "wait_time": (datetime.utcnow() - c.initiated_at).total_seconds(),
-                    "initiated_at": c.initiated_at.isoformat(),
-                    "notes": c.notes
+                    "call_id": call_id,
+                    "customer_phone": customer_phone,
+                    "wait_time": (now - initiated_at).total_seconds(),
+                    "initiated_at": initiated_at.isoformat(),
+                    "notes": notes
                 }
-                for c in calls
+                for call_id, customer_phone, initiated_at, notes in result.all()
             ]
         
         except Exception as e:
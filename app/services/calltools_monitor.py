@@ -4,20 +4,118 @@ Production-ready service for automatic call detection and HumeAI integration
 Runs as background service without human interaction
 """
 import asyncio
+import os
 import json
-import time
 import uuid
 import logging
+import itertools
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import aiohttp
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# CDP binding the bridge script calls on call transitions
+CALL_EVENT_BINDING = "__agentNotify"
+
+# CallTools page selectors - alternatives combined into one XPath union so
+# chromedriver resolves them in a single find instead of one per selector
+_USERNAME_XPATH = (
+    "//input[@name='username']"
+    "|//input[@id='username']"
+    "|//input[@type='text' or @type='email']"
+)
+_LOGIN_BUTTON_XPATH = "//button[contains(text(), 'Login')]"
+_JOIN_XPATH = (
+    "//button[contains(text(), 'Join Campaign')]"
+    "|//a[contains(text(), 'Join Campaign')]"
+    "|//button[contains(., 'Join')]"
+)
+
+# Clicks the first visible, enabled match of an XPath (union) inside the page -
+# one Runtime.evaluate instead of find + displayed/enabled checks + click RPCs
+_CLICK_FIRST_VISIBLE_JS = """
+    const nodes = document.evaluate(%s, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < nodes.snapshotLength; i++) {
+        const el = nodes.snapshotItem(i);
+        if (el.offsetParent !== null && !el.disabled) {
+            el.click();
+            return true;
+        }
+    }
+    return false;
+"""
+
+# Page scripts below are constant source text - V8 reuses the compiled code
+# on every evaluate instead of parsing a freshly built string each call.
+# Values go in as JSON literals (%s), never spliced into the code
+
+# Clicks the first button whose text contains the disposition name (%s = JSON string)
+_SELECT_DISPOSITION_JS = """
+    const name = %s;
+    const targetButton = Array.from(document.querySelectorAll('button')).find(btn =>
+        btn.textContent.includes(name)
+    );
+    if (targetButton) {
+        targetButton.click();
+        return true;
+    }
+    return false;
+"""
+
+# Sets the agent status to Available - 'dropdown', 'button' or null if not rendered yet
+_SET_STATUS_AVAILABLE_JS = """
+    // Look for status dropdown (only <select> elements are handled,
+    // so don't match every node with "status" in its class/id)
+    const statusElements = document.querySelectorAll('select[class*="status"], select[id*="status"]');
+    
+    for (let elem of statusElements) {
+        const options = Array.from(elem.options);
+        const availOption = options.find(opt => 
+            opt.text.includes('Available') || opt.value.includes('available')
+        );
+        if (availOption) {
+            elem.value = availOption.value;
+            elem.dispatchEvent(new Event('change'));
+            return 'dropdown';
+        }
+    }
+    
+    // Look for Available button
+    const buttons = Array.from(document.querySelectorAll('button'));
+    const availButton = buttons.find(btn => 
+        btn.textContent.includes('Available') || 
+        btn.textContent.includes('Post Call')
+    );
+    if (availButton) {
+        availButton.click();
+        return 'button';
+    }
+    
+    return null;
+"""
+
+# Tells the backend the call ended over the bridge WebSocket (timestamp taken in the page)
+_CALL_END_JS = """
+    if (window.__callState && window.__callState.ws && 
+        window.__callState.ws.readyState === WebSocket.OPEN) {
+        window.__callState.ws.send(JSON.stringify({
+            type: 'call_end',
+            timestamp: Date.now()
+        }));
+        console.log('📴 Call end event sent to backend');
+    }
+"""
+
 
 class CallToolsMonitorService:
     """
@@ -29,25 +127,104 @@ class CallToolsMonitorService:
     - No human interaction required
     """
     
+    # Resolved chromedriver binary, shared by every browser this process starts
+    _DRIVER_PATH: Optional[str] = None
+    
     def __init__(self, calltools_url: str, username: str, password: str):
         self.calltools_url = calltools_url
         self.username = username
         self.password = password
         self.driver: Optional[webdriver.Chrome] = None
+        self.attached = False  # driver attached to an already running Chrome (warm start)
         self.session_id = str(uuid.uuid4())
-        self.running = False
         self.monitor_task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()  # set by stop() / browser closed
+        # Call transitions from the CDP reader, handled by _process_call_events
+        self._call_events: asyncio.Queue = asyncio.Queue()
         
+        # Own DevTools connection for call events pushed by the bridge script
+        self._cdp_session: Optional[aiohttp.ClientSession] = None
+        self._cdp_ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._cdp_ids = itertools.count(1)
+        
+        # Selenium calls are blocking HTTP round-trips to chromedriver and the
+        # WebDriver session is not thread-safe - run them all on one thread
+        self._driver_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calltools-driver")
+        
+    async def _run(self, fn, *args):
+        """Run a blocking Selenium call on the driver thread without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._driver_executor, fn, *args)
+    
+    def _evaluate(self, script: str):
+        """
+        Run a JS function body through CDP Runtime.evaluate and return its value
+        (one round-trip, skips the W3C execute_script argument/element serialization)
+        """
+        response = self.driver.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": f"(() => {{{script}}})()",
+            "returnByValue": True
+        })
+        return response.get("result", {}).get("value")
+    
+    def _click_first_visible(self, xpath: str) -> bool:
+        """Click the first visible element matching xpath, False if none is rendered yet"""
+        return bool(self._evaluate(_CLICK_FIRST_VISIBLE_JS % json.dumps(xpath)))
+    
+    def _driver_service(self) -> Service:
+        """chromedriver service for a new WebDriver session"""
+        # ChromeDriverManager().install() hits the network to check the latest
+        # version - resolve once per process, or skip it with CHROMEDRIVER_PATH
+        if CallToolsMonitorService._DRIVER_PATH is None:
+            CallToolsMonitorService._DRIVER_PATH = settings.CHROMEDRIVER_PATH or ChromeDriverManager().install()
+        
+        return Service(executable_path=CallToolsMonitorService._DRIVER_PATH)
+    
+    @staticmethod
+    def _chrome_listening(debugger_address: str) -> bool:
+        """True if a Chrome DevTools endpoint answers on debugger_address"""
+        try:
+            with urllib.request.urlopen(f"http://{debugger_address}/json/version", timeout=0.3):
+                return True
+        except OSError:
+            return False
+    
     def setup_browser(self):
-        """Setup visible Chrome with WebRTC permissions"""
+        """Setup Chrome (headless unless VISIBLE_BROWSER) with WebRTC permissions"""
+        debugger_address = settings.CHROME_DEBUGGER_ADDRESS
+        if debugger_address and self._chrome_listening(debugger_address):
+            # Warm start - attach to the Chrome a previous start left running
+            options = webdriver.ChromeOptions()
+            options.add_experimental_option("debuggerAddress", debugger_address)
+            self.driver = webdriver.Chrome(service=self._driver_service(), options=options)
+            self.attached = True
+            logger.info(f"✅ Attached to running Chrome at {debugger_address}")
+            return
+        
         options = webdriver.ChromeOptions()
         
-        # VISIBLE MODE - Browser window will be visible for testing
-        # options.add_argument('--headless=new')  # COMMENTED OUT for visible browser
-        options.add_argument('--disable-gpu')
+        if debugger_address:
+            # Cold start that the next start can attach to: fixed debugging
+            # port, persistent profile, and Chrome outlives chromedriver
+            options.add_argument(f'--remote-debugging-port={debugger_address.rsplit(":", 1)[-1]}')
+            options.add_argument(f'--user-data-dir={os.path.abspath(settings.CHROME_USER_DATA_DIR)}')
+            options.add_experimental_option("detach", True)
+        
+        if settings.VISIBLE_BROWSER:
+            # VISIBLE MODE - Browser window will be visible for testing
+            options.add_argument('--start-maximized')  # Start browser maximized
+        else:
+            # New headless keeps WebRTC/getUserMedia without a window,
+            # compositor or local audio output
+            options.add_argument('--headless=new')
+            options.add_argument('--mute-audio')
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--start-maximized')  # Start browser maximized
+        options.add_argument('--disk-cache-size=0')
+        options.add_argument('--disable-features=Translate,BackForwardCache,MediaRouter,OptimizationHints')
+        
+        # Monitor page runs unattended - don't throttle its timers/audio
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-renderer-backgrounding')
         
         # WebRTC permissions
         options.add_argument('--use-fake-ui-for-media-stream')
@@ -62,10 +239,10 @@ class CallToolsMonitorService:
         }
         options.add_experimental_option("prefs", prefs)
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        self.driver = webdriver.Chrome(service=self._driver_service(), options=options)
         
-        logger.info("✅ Browser setup complete (VISIBLE mode - window will be shown)")
+        mode = "VISIBLE mode - window will be shown" if settings.VISIBLE_BROWSER else "headless mode"
+        logger.info(f"✅ Browser setup complete ({mode})")
     
     def login(self) -> bool:
         """Auto-login to CallTools"""
@@ -74,47 +251,35 @@ class CallToolsMonitorService:
             self.driver.get(self.calltools_url)
             
             wait = WebDriverWait(self.driver, 20)
-            time.sleep(3)
             
             # Find username field
-            username_selectors = [
-                (By.NAME, "username"),
-                (By.ID, "username"),
-                (By.XPATH, "//input[@type='text' or @type='email']")
-            ]
-            
-            username_field = None
-            for by, selector in username_selectors:
-                try:
-                    username_field = wait.until(EC.presence_of_element_located((by, selector)))
-                    break
-                except:
-                    continue
-            
-            if not username_field:
+            try:
+                username_field = wait.until(EC.presence_of_element_located((By.XPATH, _USERNAME_XPATH)))
+            except TimeoutException:
                 raise Exception("Username field not found")
             
             username_field.clear()
             username_field.send_keys(self.username)
-            time.sleep(0.5)
             
             # Find password field
             password_field = self.driver.find_element(By.NAME, "password")
             password_field.clear()
             password_field.send_keys(self.password)
-            time.sleep(0.5)
             
-            # Click login button
-            login_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Login')]")
-            login_button.click()
-            time.sleep(2)
+            # Click login button as soon as it is rendered
+            login_url = self.driver.current_url
+            wait.until(lambda driver: self._click_first_visible(_LOGIN_BUTTON_XPATH))
+            
+            # Logged in once the page navigates away from the login form
+            try:
+                wait.until(EC.url_changes(login_url))
+            except TimeoutException:
+                logger.warning("⚠️ Page did not navigate after login - continuing")
             
             logger.info("✅ LOGIN SUCCESSFUL")
             
-            # Auto-join campaign and set status
-            time.sleep(3)
+            # Auto-join campaign and set status (both wait for their own elements)
             self.join_campaign()
-            time.sleep(2)
             self.set_status_available()
             
             return True
@@ -126,79 +291,27 @@ class CallToolsMonitorService:
     def join_campaign(self) -> bool:
         """Auto-join campaign"""
         try:
-            time.sleep(2)
-            join_selectors = [
-                "//button[contains(text(), 'Join Campaign')]",
-                "//a[contains(text(), 'Join Campaign')]",
-                "//button[contains(., 'Join')]"
-            ]
-            
-            for selector in join_selectors:
-                try:
-                    join_btn = self.driver.find_element(By.XPATH, selector)
-                    if join_btn.is_displayed():
-                        join_btn.click()
-                        logger.info("✅ Campaign joined automatically")
-                        time.sleep(2)
-                        return True
-                except:
-                    continue
-                    
-            logger.warning("⚠️ Campaign join button not found")
-            return False
+            # Retry until a join button is rendered - each poll is one page-side call
+            try:
+                WebDriverWait(self.driver, 10).until(
+                    lambda driver: self._click_first_visible(_JOIN_XPATH)
+                )
+            except TimeoutException:
+                logger.warning("⚠️ Campaign join button not found")
+                return False
             
-        except Exception as e:
-            logger.warning(f"⚠️ Could not join campaign: {e}")
-            return False
-    
-    def set_status_available(self) -> bool:
-        """Auto-set status to Available"""
-        try:
-            status_selectors = [
-                "//button[contains(@class, 'status')]",
-                "//div[contains(text(), 'Status')]",
-                "//select[contains(@name, 'status')]",
-                "//*[contains(text(), 'Status')]"
-            ]
-            
-            for selector in status_selectors:
-                try:
-                    status_elem = self.driver.find_element(By.XPATH, selector)
-                    if status_elem.is_displayed():
-                        status_elem.click()
-                        time.sleep(1)
-                        
-                        # Select "Available"
-                        available_selectors = [
-                            "//option[contains(text(), 'Available')]",
-                            "//li[contains(text(), 'Available')]",
-                            "//button[contains(text(), 'Available')]",
-                            "//*[text()='Available']"
-                        ]
-                        
-                        for avail_sel in available_selectors:
-                            try:
-                                avail_elem = self.driver.find_element(By.XPATH, avail_sel)
-                                avail_elem.click()
-                                logger.info("✅ Status set to Available")
-                                return True
-                            except:
-                                continue
-                        break
-                except:
-                    continue
-                    
-            logger.warning("⚠️ Could not set status to Available")
-            return False
+            logger.info("✅ Campaign joined automatically")
+            return True
             
         except Exception as e:
-            logger.warning(f"⚠️ Could not set status: {e}")
+            logger.warning(f"⚠️ Could not join campaign: {e}")
             return False
     
     def inject_audio_bridge_script(self):
         """Inject JavaScript for WebRTC monitoring and audio streaming"""
         
-        # First, add a warning banner at the top of the page
+        # First, add a warning banner at the top of the page - a fixed overlay
+        # that ignores clicks, so the CallTools layout is never recalculated
         banner_script = """
         (function() {
             const banner = document.createElement('div');
@@ -216,6 +329,7 @@ class CallToolsMonitorService:
                 z-index: 999999;
                 box-shadow: 0 2px 10px rgba(0,0,0,0.3);
                 border-bottom: 3px solid #c92a2a;
+                pointer-events: none;
             `;
             banner.innerHTML = `
                 🤖 AI AGENT MONITORING ACTIVE - DO NOT CLOSE THIS WINDOW! 🤖
@@ -224,25 +338,77 @@ class CallToolsMonitorService:
                 </div>
             `;
             
-            // Insert banner at the very top
+            // Overlay the top of the page (no body padding - avoids a full restyle)
             if (document.body) {
-                document.body.insertBefore(banner, document.body.firstChild);
-                
-                // Add margin to avoid content overlap
-                const style = document.createElement('style');
-                style.textContent = 'body { padding-top: 80px !important; }';
-                document.head.appendChild(style);
+                document.body.appendChild(banner);
             }
         })();
         """
         
-        self.driver.execute_script(banner_script)
-        logger.info("✅ Warning banner added to browser")
+        # Nobody sees the banner in headless mode
+        if settings.VISIBLE_BROWSER:
+            self.driver.execute_script(banner_script)
+            logger.info("✅ Warning banner added to browser")
         
         # Now inject the main audio bridge script
         js_code = """
         (function() {
-            console.log('🔧 CallTools Audio Bridge Script Loading...');
+            // Console logging is synchronous over DevTools - only when DEBUG is on
+            window.__CT_DEBUG = %DEBUG%;
+            const DEBUG = window.__CT_DEBUG === true;
+            const log = DEBUG ? console.log.bind(console) : () => {};
+            
+            log('🔧 CallTools Audio Bridge Script Loading...');
+            
+            // Binary frames (see app/api/webrtc_bridge.py): little-endian
+            // [uint8 type][uint64 timestamp ms] header followed by the payload
+            const FRAME = { AUDIO: 1, CALL_START: 2, CALL_END: 3, INIT: 4 };
+            const FRAME_HEADER_BYTES = 9;
+            
+            function sendFrame(ws, type, payload) {
+                const length = payload ? payload.byteLength : 0;
+                const view = new DataView(new ArrayBuffer(FRAME_HEADER_BYTES + length));
+                view.setUint8(0, type);
+                view.setBigUint64(1, BigInt(Date.now()), true);
+                if (payload) {
+                    new Uint8Array(view.buffer, FRAME_HEADER_BYTES).set(payload);
+                }
+                ws.send(view.buffer);
+            }
+            
+            // Runs on the audio rendering thread: converts each 128-sample render
+            // quantum to Int16 and posts 2048-sample chunks (zero-copy transfer)
+            // with their energy (sum of squares) for the silence gate
+            const PCM_ENCODER_WORKLET = `
+                registerProcessor('pcm-encoder', class extends AudioWorkletProcessor {
+                    constructor() {
+                        super();
+                        this.pcm = new Int16Array(2048);
+                        this.offset = 0;
+                        this.energy = 0;
+                    }
+                    process(inputs) {
+                        const input = inputs[0][0];
+                        if (!input) return true;
+                        for (let i = 0; i < input.length; i++) {
+                            // Branchless clamp -> scale -> truncate (JIT-friendly); the
+                            // 0x8000/0x7FFF asymmetry is not worth a branch per sample
+                            const v = input[i];
+                            const c = v < -1 ? -1 : v > 1 ? 1 : v;
+                            this.pcm[this.offset++] = (c * 32767) | 0;
+                            this.energy += c * c;
+                            if (this.offset === this.pcm.length) {
+                                const buffer = this.pcm.buffer;
+                                this.port.postMessage({ buffer, energy: this.energy }, [buffer]);
+                                this.pcm = new Int16Array(2048);
+                                this.offset = 0;
+                                this.energy = 0;
+                            }
+                        }
+                        return true;
+                    }
+                });
+            `;
             
             window.__callState = {
                 active: false,
@@ -250,6 +416,10 @@ class CallToolsMonitorService:
                 audioTracks: [],
                 audioContext: null,
                 audioProcessor: null,
+                aiDestination: null,  // persistent sink for AI audio, sent as the call's mic track
+                aiSender: null,
+                originalTrack: null,
+                aiPlayhead: 0,
                 ws: null,
                 wsConnected: false,
                 frameCount: 0
@@ -257,17 +427,14 @@ class CallToolsMonitorService:
             
             function connectWebSocket() {
                 const ws = new WebSocket('ws://localhost:8000/ws/webrtc-audio');
+                ws.binaryType = 'arraybuffer';
                 
                 ws.onopen = () => {
-                    console.log('✅ WebSocket connected to backend');
+                    log('✅ WebSocket connected to backend');
                     window.__callState.ws = ws;
                     window.__callState.wsConnected = true;
                     
-                    ws.send(JSON.stringify({
-                        type: 'init',
-                        session_id: '%SESSION_ID%',
-                        timestamp: Date.now()
-                    }));
+                    sendFrame(ws, FRAME.INIT, new TextEncoder().encode('%SESSION_ID%'));
                 };
                 
                 ws.onerror = (err) => {
@@ -283,17 +450,23 @@ class CallToolsMonitorService:
                 
                 ws.onmessage = (event) => {
                     try {
+                        // Binary frame: header + raw Int16 PCM AI audio
+                        if (event.data instanceof ArrayBuffer) {
+                            if (new Uint8Array(event.data, 0, 1)[0] === FRAME.AUDIO) {
+                                window.playAIAudio(event.data.slice(FRAME_HEADER_BYTES));
+                            }
+                            return;
+                        }
+                        
                         const data = JSON.parse(event.data);
                         
                         if (data.type === 'ready') {
-                            console.log('✅ Bridge ready:', data.message);
-                        } else if (data.type === 'audio_response') {
-                            window.playAIAudio(data.data);
+                            log('✅ Bridge ready:', data.message);
                         } else if (data.type === 'transcript') {
                             if (data.speaker === 'user') {
-                                console.log('👤 Customer:', data.text);
+                                log('👤 Customer:', data.text);
                             } else if (data.speaker === 'assistant') {
-                                console.log('🤖 Agent:', data.text);
+                                log('🤖 Agent:', data.text);
                             }
                         }
                     } catch (error) {
@@ -306,6 +479,32 @@ class CallToolsMonitorService:
             
             connectWebSocket();
             
+            // Push call transitions to the Python monitor (CDP binding added by
+            // the monitor - nothing polls window.__callState)
+            function notifyMonitor(type) {
+                if (typeof window.%BINDING% === 'function') {
+                    window.%BINDING%(JSON.stringify({
+                        type: type,
+                        peerConnections: window.__callState.peerConnections.length,
+                        audioTracks: window.__callState.audioTracks.length,
+                        frameCount: window.__callState.frameCount,
+                        timestamp: Date.now()
+                    }));
+                }
+            }
+            
+            function onCallStart(message) {
+                window.__callState.active = true;
+                log(message);
+                
+                if (window.__callState.ws && window.__callState.wsConnected) {
+                    sendFrame(window.__callState.ws, FRAME.CALL_START);
+                }
+                
+                notifyMonitor('call_start');
+                setTimeout(() => window.startAudioCapture(), 1000);
+            }
+            
             // Intercept RTCPeerConnection
             const OriginalRTCPeerConnection = window.RTCPeerConnection || window.webkitRTCPeerConnection;
             
@@ -318,17 +517,7 @@ class CallToolsMonitorService:
                         window.__callState.audioTracks.push(event.track);
                         
                         if (!window.__callState.active) {
-                            window.__callState.active = true;
-                            console.log('📞 CALL STARTED - Auto-triggering HumeAI');
-                            
-                            if (window.__callState.ws && window.__callState.wsConnected) {
-                                window.__callState.ws.send(JSON.stringify({
-                                    type: 'call_start',
-                                    timestamp: Date.now()
-                                }));
-                            }
-                            
-                            setTimeout(() => window.startAudioCapture(), 1000);
+                            onCallStart('📞 CALL STARTED - Auto-triggering HumeAI');
                         }
                     }
                 });
@@ -343,17 +532,7 @@ class CallToolsMonitorService:
                         });
                         
                         if (window.__callState.audioTracks.length > 0) {
-                            window.__callState.active = true;
-                            console.log('📞 CALL STARTED (manual detection)');
-                            
-                            if (window.__callState.ws && window.__callState.wsConnected) {
-                                window.__callState.ws.send(JSON.stringify({
-                                    type: 'call_start',
-                                    timestamp: Date.now()
-                                }));
-                            }
-                            
-                            setTimeout(() => window.startAudioCapture(), 1000);
+                            onCallStart('📞 CALL STARTED (manual detection)');
                         }
                     }
                     
@@ -364,15 +543,13 @@ class CallToolsMonitorService:
                         
                         if (!anyActive && window.__callState.active) {
                             window.__callState.active = false;
-                            console.log('📴 CALL ENDED');
+                            log('📴 CALL ENDED');
                             
                             if (window.__callState.ws && window.__callState.wsConnected) {
-                                window.__callState.ws.send(JSON.stringify({
-                                    type: 'call_end',
-                                    timestamp: Date.now()
-                                }));
+                                sendFrame(window.__callState.ws, FRAME.CALL_END);
                             }
                             
+                            notifyMonitor('call_end');
                             window.stopAudioCapture();
                         }
                     }
@@ -400,63 +577,57 @@ class CallToolsMonitorService:
                         sampleRate: 16000
                     });
                     
-                    const source = window.__callState.audioContext.createMediaStreamSource(stream);
-                    const analyser = window.__callState.audioContext.createAnalyser();
-                    analyser.fftSize = 2048;
-                    source.connect(analyser);
+                    const audioContext = window.__callState.audioContext;
+                    const workletUrl = URL.createObjectURL(
+                        new Blob([PCM_ENCODER_WORKLET], { type: 'text/javascript' })
+                    );
+                    await audioContext.audioWorklet.addModule(workletUrl);
+                    URL.revokeObjectURL(workletUrl);
+                    
+                    const source = audioContext.createMediaStreamSource(stream);
+                    // No outputs - the node only encodes, nothing is played locally
+                    const encoder = new AudioWorkletNode(audioContext, 'pcm-encoder', {
+                        numberOfOutputs: 0
+                    });
+                    source.connect(encoder);
+                    window.__callState.audioProcessor = encoder;
                     
-                    const bufferLength = analyser.fftSize;
-                    const dataArray = new Float32Array(bufferLength);
+                    window.attachAIOutput();
                     
-                    console.log('✅ Audio capture started - using AnalyserNode polling');
-                    console.log(`📊 Buffer size: ${bufferLength}, Sample rate: ${window.__callState.audioContext.sampleRate}`);
+                    log('✅ Audio capture started - using AudioWorklet');
+                    log(`📊 Chunk size: 2048, Sample rate: ${audioContext.sampleRate}`);
                     
-                    // Poll audio data every 128ms (8 chunks per second)
+                    // Worklet pushes one Int16 chunk per 2048 samples (~128ms at 16kHz)
                     let chunkCount = 0;
-                    window.__callState.audioInterval = setInterval(() => {
+                    encoder.port.onmessage = (event) => {
                         if (!window.__callState.wsConnected || !window.__callState.active) return;
                         
-                        analyser.getFloatTimeDomainData(dataArray);
-                        
-                        // Convert Float32 to Int16 PCM
-                        const int16Data = new Int16Array(dataArray.length);
-                        let maxAmplitude = 0;
-                        for (let i = 0; i < dataArray.length; i++) {
-                            const s = Math.max(-1, Math.min(1, dataArray[i]));
-                            int16Data[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
-                            const amplitude = Math.abs(s);
-                            if (amplitude > maxAmplitude) maxAmplitude = amplitude;
-                        }
+                        const energy = event.data.energy;
                         
                         // Log first few chunks for debugging
                         if (chunkCount < 5 || chunkCount % 20 === 0) {
-                            console.log(`🎤 Chunk ${chunkCount}: amplitude = ${maxAmplitude.toFixed(4)}`);
+                            log(`🎤 Chunk ${chunkCount}: rms = ${Math.sqrt(energy / 2048).toFixed(4)}`);
                         }
                         
-                        // Skip absolute silence
-                        if (maxAmplitude < 0.0001) {
+                        // Skip absolute silence (mean square below 1e-8 over 2048 samples)
+                        if (energy < 2.048e-5) {
                             return;
                         }
                         
-                        const base64Audio = btoa(String.fromCharCode.apply(null, new Uint8Array(int16Data.buffer)));
-                        
                         if (window.__callState.ws.readyState === WebSocket.OPEN) {
-                            window.__callState.ws.send(JSON.stringify({
-                                type: 'audio_input',
-                                data: base64Audio,
-                                timestamp: Date.now()
-                            }));
+                            // Binary audio frame - no base64/JSON
+                            sendFrame(window.__callState.ws, FRAME.AUDIO, new Uint8Array(event.data.buffer));
                             
                             chunkCount++;
                             window.__callState.frameCount++;
                             
                             if (chunkCount === 1) {
-                                console.log('✅ FIRST AUDIO CHUNK SENT TO BACKEND!');
+                                log('✅ FIRST AUDIO CHUNK SENT TO BACKEND!');
                             }
                         }
-                    }, 128); // 128ms = ~8 chunks/sec = optimal for real-time
+                    };
                     
-                    console.log('✅ Audio polling active - streaming to HumeAI');
+                    log('✅ Audio worklet active - streaming to HumeAI');
                     return true;
                     
                 } catch (error) {
@@ -467,96 +638,108 @@ class CallToolsMonitorService:
             
             window.stopAudioCapture = () => {
                 try {
-                    if (window.__callState.audioInterval) {
-                        clearInterval(window.__callState.audioInterval);
-                        window.__callState.audioInterval = null;
-                        console.log('✅ Audio polling stopped');
+                    if (window.__callState.audioProcessor) {
+                        window.__callState.audioProcessor.port.onmessage = null;
+                        window.__callState.audioProcessor.disconnect();
+                        window.__callState.audioProcessor = null;
+                        log('✅ Audio worklet stopped');
                     }
                     
+                    if (window.__callState.aiSender && window.__callState.originalTrack) {
+                        window.__callState.aiSender.replaceTrack(window.__callState.originalTrack);
+                        log('✅ Restored original track');
+                    }
+                    window.__callState.aiDestination = null;
+                    window.__callState.aiSender = null;
+                    window.__callState.originalTrack = null;
+                    window.__callState.aiPlayhead = 0;
+                    
                     if (window.__callState.audioContext) {
                         window.__callState.audioContext.close();
                         window.__callState.audioContext = null;
                     }
                     
                     window.__callState.frameCount = 0;
-                    console.log('✅ Audio capture stopped');
+                    log('✅ Audio capture stopped');
                 } catch (error) {
                     console.error('❌ Error stopping audio:', error);
                 }
             };
             
-            window.playAIAudio = (base64Audio) => {
+            // Swap the call's outgoing mic track for an AI output track once per
+            // call - replaceTrack per response re-configures the encoder
+            window.attachAIOutput = () => {
+                if (window.__callState.aiDestination) return true;
+                
+                const activePc = window.__callState.peerConnections.find(
+                    pc => pc.connectionState === 'connected'
+                );
+                
+                if (!activePc) {
+                    console.warn('⚠️ No active PeerConnection');
+                    return false;
+                }
+                
+                const audioSender = activePc.getSenders().find(sender => 
+                    sender.track && sender.track.kind === 'audio'
+                );
+                
+                if (!audioSender || !audioSender.track) {
+                    console.warn('⚠️ No audio sender');
+                    return false;
+                }
+                
+                if (!window.__callState.audioContext) {
+                    window.__callState.audioContext = new (window.AudioContext || window.webkitAudioContext)({
+                        sampleRate: 16000
+                    });
+                }
+                
+                const destination = window.__callState.audioContext.createMediaStreamDestination();
+                window.__callState.aiDestination = destination;
+                window.__callState.aiSender = audioSender;
+                window.__callState.originalTrack = audioSender.track;
+                
+                audioSender.replaceTrack(destination.stream.getAudioTracks()[0]).then(() => {
+                    log('✅ AI audio track attached to call');
+                });
+                return true;
+            };
+            
+            window.playAIAudio = (pcmBuffer) => {
                 try {
-                    const activePc = window.__callState.peerConnections.find(
-                        pc => pc.connectionState === 'connected'
-                    );
-                    
-                    if (!activePc) {
-                        console.warn('⚠️ No active PeerConnection');
-                        return;
-                    }
-                    
-                    const audioSender = activePc.getSenders().find(sender => 
-                        sender.track && sender.track.kind === 'audio'
-                    );
-                    
-                    if (!audioSender || !audioSender.track) {
-                        console.warn('⚠️ No audio sender');
-                        return;
-                    }
+                    if (!window.attachAIOutput()) return;
                     
-                    if (!window.__callState.audioContext) {
-                        window.__callState.audioContext = new (window.AudioContext || window.webkitAudioContext)({
-                            sampleRate: 16000
-                        });
-                    }
-                    
-                    const binaryString = atob(base64Audio);
-                    const len = binaryString.length;
-                    const bytes = new Uint8Array(len);
-                    for (let i = 0; i < len; i++) {
-                        bytes[i] = binaryString.charCodeAt(i);
-                    }
-                    
-                    const int16Array = new Int16Array(bytes.buffer);
+                    const audioContext = window.__callState.audioContext;
+                    const int16Array = new Int16Array(pcmBuffer);
                     const float32Array = new Float32Array(int16Array.length);
                     for (let i = 0; i < int16Array.length; i++) {
-                        float32Array[i] = int16Array[i] / (int16Array[i] < 0 ? 0x8000 : 0x7FFF);
+                        float32Array[i] = int16Array[i] * (1 / 32768);
                     }
                     
-                    const audioBuffer = window.__callState.audioContext.createBuffer(1, float32Array.length, 16000);
+                    const audioBuffer = audioContext.createBuffer(1, float32Array.length, 16000);
                     audioBuffer.getChannelData(0).set(float32Array);
                     
-                    const source = window.__callState.audioContext.createBufferSource();
+                    const source = audioContext.createBufferSource();
                     source.buffer = audioBuffer;
+                    source.connect(window.__callState.aiDestination);
                     
-                    const destination = window.__callState.audioContext.createMediaStreamDestination();
-                    source.connect(destination);
-                    
-                    const originalTrack = audioSender.track;
-                    const aiAudioTrack = destination.stream.getAudioTracks()[0];
-                    
-                    audioSender.replaceTrack(aiAudioTrack).then(() => {
-                        console.log('✅ AI audio injected into call');
-                        source.start();
-                        
-                        source.onended = () => {
-                            audioSender.replaceTrack(originalTrack).then(() => {
-                                console.log('✅ Restored original track');
-                            });
-                        };
-                    });
+                    // Queue chunks back to back so consecutive responses don't overlap
+                    const startAt = Math.max(audioContext.currentTime, window.__callState.aiPlayhead);
+                    source.start(startAt);
+                    window.__callState.aiPlayhead = startAt + audioBuffer.duration;
                     
                 } catch (error) {
                     console.error('❌ Failed to play AI audio:', error);
                 }
             };
             
-            console.log('✅ CallTools Audio Bridge Ready!');
+            log('✅ CallTools Audio Bridge Ready!');
             window.__audioBridgeReady = true;
             
         })();
-        """.replace('%SESSION_ID%', self.session_id)
+        """.replace('%SESSION_ID%', self.session_id).replace('%BINDING%', CALL_EVENT_BINDING)
+        js_code = js_code.replace('%DEBUG%', 'true' if settings.DEBUG else 'false')
         
         self.driver.execute_script(js_code)
         logger.info("✅ Audio bridge script injected")
@@ -573,26 +756,17 @@ class CallToolsMonitorService:
             wait = WebDriverWait(self.driver, 10)
             
             # Look for disposition buttons
-            disposition_script = f"""
-                const buttons = Array.from(document.querySelectorAll('button'));
-                const targetButton = buttons.find(btn => 
-                    btn.textContent.includes('{disposition_type}')
-                );
-                if (targetButton) {{
-                    targetButton.click();
-                    return true;
-                }}
-                return false;
-            """
-            
-            result = self.driver.execute_script(disposition_script)
+            disposition_script = _SELECT_DISPOSITION_JS % json.dumps(disposition_type)
             
-            if result:
-                logger.info(f"✅ Disposition '{disposition_type}' selected")
-                return True
-            else:
+            # Retry until the dialog renders the button
+            try:
+                wait.until(lambda driver: self._evaluate(disposition_script))
+            except TimeoutException:
                 logger.warning(f"⚠️ Disposition button '{disposition_type}' not found")
                 return False
+            
+            logger.info(f"✅ Disposition '{disposition_type}' selected")
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Failed to select disposition: {e}")
@@ -603,149 +777,189 @@ class CallToolsMonitorService:
         try:
             logger.info("🟢 Setting status to Available...")
             
-            # Look for status dropdown/button
-            status_script = """
-                // Look for status selector
-                const statusElements = document.querySelectorAll('[class*="status"], [id*="status"]');
-                
-                for (let elem of statusElements) {
-                    if (elem.tagName === 'SELECT') {
-                        // Dropdown
-                        const options = Array.from(elem.options);
-                        const availOption = options.find(opt => 
-                            opt.text.includes('Available') || opt.value.includes('available')
-                        );
-                        if (availOption) {
-                            elem.value = availOption.value;
-                            elem.dispatchEvent(new Event('change'));
-                            return 'dropdown';
-                        }
-                    }
-                }
-                
-                // Look for Available button
-                const buttons = Array.from(document.querySelectorAll('button'));
-                const availButton = buttons.find(btn => 
-                    btn.textContent.includes('Available') || 
-                    btn.textContent.includes('Post Call')
-                );
-                if (availButton) {
-                    availButton.click();
-                    return 'button';
-                }
-                
-                return null;
-            """
-            
-            result = self.driver.execute_script(status_script)
-            
-            if result:
-                logger.info(f"✅ Status set to Available (via {result})")
-                return True
-            else:
+            # Retry until the status control is rendered
+            try:
+                result = WebDriverWait(self.driver, 10).until(
+                    lambda driver: self._evaluate(_SET_STATUS_AVAILABLE_JS)
+                )
+            except TimeoutException:
                 logger.warning("⚠️ Status change element not found - may need manual update")
                 return False
+            
+            logger.info(f"✅ Status set to Available (via {result})")
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Failed to set status: {e}")
             return False
     
-    async def monitor_calls(self):
-        """Monitor for call events automatically"""
-        logger.info("👁️ Monitoring started - waiting for calls...")
+    async def _connect_cdp(self):
+        """
+        Open our own DevTools websocket to the CallTools page and add the
+        call event binding - Chrome pushes Runtime.bindingCalled whenever
+        the bridge script reports a call transition
+        """
+        chrome_options = self.driver.capabilities.get('goog:chromeOptions', {})
+        debugger_address = chrome_options.get('debuggerAddress')
+        if not debugger_address:
+            raise RuntimeError("Chrome debugger address not available")
+        
+        self._cdp_session = aiohttp.ClientSession()
+        async with self._cdp_session.get(f"http://{debugger_address}/json/list") as response:
+            targets = await response.json(content_type=None)
+        
+        page = next((t for t in targets if t.get('type') == 'page'), None)
+        if not page:
+            raise RuntimeError("CallTools page target not found")
         
-        last_call_state = False
+        self._cdp_ws = await self._cdp_session.ws_connect(page['webSocketDebuggerUrl'], max_msg_size=0)
+        await self._cdp_send("Runtime.enable")
+        await self._cdp_send("Runtime.addBinding", {"name": CALL_EVENT_BINDING})
+        logger.info("✅ Subscribed to call events over CDP")
+    
+    async def _cdp_send(self, method: str, params: Optional[dict] = None):
+        """Send a CDP command (responses are not awaited)"""
+        await self._cdp_ws.send_json({
+            "id": next(self._cdp_ids),
+            "method": method,
+            "params": params or {}
+        })
+    
+    async def _close_cdp(self):
+        """Close the DevTools websocket"""
+        if self._cdp_ws is not None:
+            await self._cdp_ws.close()
+            self._cdp_ws = None
+        if self._cdp_session is not None:
+            await self._cdp_session.close()
+            self._cdp_session = None
+    
+    async def _handle_call_event(self, event: dict):
+        """React to a call transition reported by the bridge script"""
+        if event.get('type') == 'call_start':
+            logger.info("="*60)
+            logger.info("📞 CALL DETECTED - Auto-triggering HumeAI")
+            logger.info(f"   PeerConnections: {event.get('peerConnections')}")
+            logger.info(f"   Audio Tracks: {event.get('audioTracks')}")
+            logger.info("="*60)
         
-        while self.running:
+        elif event.get('type') == 'call_end':
+            logger.info("="*60)
+            logger.info("📴 CALL ENDED")
+            logger.info(f"   Total frames: {event.get('frameCount')}")
+            logger.info("="*60)
+            
+            # Send call_end event to WebSocket (over the monitor's own CDP
+            # connection - no chromedriver round-trip)
             try:
-                call_state = self.driver.execute_script("""
-                    if (window.__callState) {
-                        return {
-                            active: window.__callState.active,
-                            peerConnections: window.__callState.peerConnections.length,
-                            audioTracks: window.__callState.audioTracks.length,
-                            wsConnected: window.__callState.wsConnected,
-                            frameCount: window.__callState.frameCount
-                        };
-                    }
-                    return null;
-                """)
-                
-                if call_state:
-                    current_state = call_state['active']
+                await self._cdp_send("Runtime.evaluate", {"expression": _CALL_END_JS})
+                logger.info("✅ Call end event sent to backend")
+            except Exception as e:
+                logger.error(f"Failed to send call_end event: {e}")
+            
+            # Auto-select disposition (default: Lead) once the dialog appears
+            # You can change this based on AI analysis
+            await self._run(self.select_disposition, "Lead")
+            
+            # Then set status to Available
+            await self._run(self.set_status_available)
+    
+    async def monitor_calls(self):
+        """
+        Monitor for call events automatically
+        Waits on CDP push events - nothing runs while the line is idle
+        """
+        logger.info("👁️ Monitoring started - waiting for calls...")
+        
+        handler_task = asyncio.create_task(self._process_call_events())
+        # Last transition queued - kept across CDP reconnects
+        last_event_type = None
+        try:
+            while not self._stop.is_set():
+                try:
+                    await self._connect_cdp()
                     
-                    if current_state != last_call_state:
-                        if current_state:
-                            logger.info("="*60)
-                            logger.info("📞 CALL DETECTED - Auto-triggering HumeAI")
-                            logger.info(f"   PeerConnections: {call_state['peerConnections']}")
-                            logger.info(f"   Audio Tracks: {call_state['audioTracks']}")
-                            logger.info("="*60)
-                        else:
-                            logger.info("="*60)
-                            logger.info("📴 CALL ENDED")
-                            logger.info(f"   Total frames: {call_state['frameCount']}")
-                            logger.info("="*60)
-                            
-                            # Send call_end event to WebSocket
-                            try:
-                                self.driver.execute_script("""
-                                    if (window.__callState && window.__callState.ws && 
-                                        window.__callState.ws.readyState === WebSocket.OPEN) {
-                                        window.__callState.ws.send(JSON.stringify({
-                                            type: 'call_end',
-                                            timestamp: Date.now()
-                                        }));
-                                        console.log('📴 Call end event sent to backend');
-                                    }
-                                """)
-                                logger.info("✅ Call end event sent to backend")
-                            except Exception as e:
-                                logger.error(f"Failed to send call_end event: {e}")
-                            
-                            # Wait for disposition dialog to appear
-                            await asyncio.sleep(2)
-                            
-                            # Auto-select disposition (default: Lead)
-                            # You can change this based on AI analysis
-                            self.select_disposition("Lead")
-                            
-                            # Wait a moment then set status to Available
-                            await asyncio.sleep(1)
-                            self.set_status_available()
+                    async for message in self._cdp_ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            break
                         
-                        last_call_state = current_state
-                
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                error_msg = str(e)
+                        data = json.loads(message.data)
+                        if data.get('method') != 'Runtime.bindingCalled':
+                            continue
+                        params = data['params']
+                        if params.get('name') != CALL_EVENT_BINDING:
+                            continue
+                        
+                        event = json.loads(params['payload'])
+                        event_type = event.get('type')
+                        # A second call_start/call_end in a row (re-injected bridge,
+                        # duplicate PeerConnection events) is no transition - drop it
+                        if event_type == last_event_type:
+                            logger.debug(f"Ignoring repeated {event_type} event")
+                            continue
+                        last_event_type = event_type
+                        
+                        # Handled on its own task - the reader keeps draining CDP
+                        # while disposition/status waits run
+                        self._call_events.put_nowait(event)
+                    
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error monitoring: {e}")
+                finally:
+                    await self._close_cdp()
                 
-                # Check if browser was closed
-                if "invalid session id" in error_msg.lower() or "session deleted" in error_msg.lower():
-                    logger.warning("⚠️ Browser window was closed - stopping monitoring")
-                    self.running = False
+                if self._stop.is_set():
                     break
                 
-                logger.error(f"Error monitoring: {e}")
-                await asyncio.sleep(1)
+                # DevTools connection dropped - check if browser was closed
+                try:
+                    await self._run(lambda: self.driver.current_url)
+                except WebDriverException as e:
+                    error_msg = str(e)
+                    if "invalid session id" in error_msg.lower() or "session deleted" in error_msg.lower():
+                        logger.warning("⚠️ Browser window was closed - stopping monitoring")
+                        self._stop.set()
+                        break
+                
+                # Reconnect after a second - returns at once if stop() is called
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            handler_task.cancel()
+    
+    async def _process_call_events(self):
+        """Handle queued call transitions one at a time, in order"""
+        while True:
+            event = await self._call_events.get()
+            try:
+                await self._handle_call_event(event)
+            except Exception as e:
+                logger.error(f"Error handling call event {event.get('type')}: {e}")
     
     async def start(self):
         """Start the monitoring service"""
         try:
             logger.info("🚀 Starting CallTools Monitor Service...")
             
-            self.setup_browser()
-            
-            if not self.login():
-                raise Exception("Login failed")
+            await self._run(self.setup_browser)
             
-            time.sleep(2)
-            self.inject_audio_bridge_script()
+            # Warm start: the attached page may still be logged in with the bridge running
+            if self.attached and await self._run(self._evaluate, "return window.__audioBridgeReady === true;"):
+                logger.info("♻️ Reusing logged-in CallTools page - skipping login")
+            else:
+                if not await self._run(self.login):
+                    raise Exception("Login failed")
+                
+                await asyncio.sleep(2)
+                await self._run(self.inject_audio_bridge_script)
             
             logger.info("✅ Service started - ready for automatic call handling")
             
-            self.running = True
+            self._stop.clear()
             self.monitor_task = asyncio.create_task(self.monitor_calls())
             
         except Exception as e:
@@ -756,22 +970,34 @@ class CallToolsMonitorService:
         """Stop the monitoring service"""
         logger.info("⏹️ Stopping CallTools Monitor Service...")
         
-        self.running = False
+        self._stop.set()
         
         if self.monitor_task:
-            self.monitor_task.cancel()
+            # Closing the DevTools socket ends the event loop in monitor_calls,
+            # which then exits on its own (and cleans up in its finally)
+            if self._cdp_ws is not None:
+                await self._cdp_ws.close()
             try:
-                await self.monitor_task
-            except asyncio.CancelledError:
+                # A call event still being handled gets a grace period
+                await asyncio.wait_for(self.monitor_task, timeout=15)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
                 pass
         
         if self.driver:
             try:
-                self.driver.quit()
-                logger.info("✅ Browser closed")
+                if settings.CHROME_DEBUGGER_ADDRESS:
+                    # Warm start - stop only chromedriver, Chrome stays logged in
+                    # for the next start to attach to
+                    await self._run(self.driver.service.stop)
+                    logger.info("✅ Driver stopped (browser kept for warm start)")
+                else:
+                    await self._run(self.driver.quit)
+                    logger.info("✅ Browser closed")
             except Exception as e:
                 logger.error(f"Error closing browser: {e}")
         
+        self._driver_executor.shutdown(wait=False)
+        
         logger.info("✅ Service stopped")
 
 
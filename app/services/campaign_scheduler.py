@@ -4,23 +4,121 @@ Automatically starts and stops campaigns based on schedule
 """
 import asyncio
 import logging
-from datetime import datetime, time
-from typing import List
-import pytz
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, lambda_stmt
 
 from app.models.dialer_user import DialerUser
 from app.models.call import Call
-from app.database import async_session_maker
+from app.database import async_session_maker, database_url
 from app.services.dialer_automation import dialer_automation
 from app.services.notification_service import notification_service, NotificationPriority
 
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Users share a handful of timezones - build each ZoneInfo once, not per user per tick
+_tz = lru_cache(maxsize=256)(ZoneInfo)
+
+
+@dataclass(slots=True)
+class _UserSched:
+    """Schedule fields of a DialerUser - all check_schedules needs per minute"""
+    id: int
+    username: str
+    timezone: str
+    days_of_week: Optional[str]
+    start_time: Optional[str]
+    end_time: Optional[str]
+    is_logged_in: bool
+    auto_login: bool
+    auto_unpause: bool
+    agent_id: Optional[int]
+    updated_at: Optional[datetime]
+
+
+# Column order matches _UserSched fields
+_SCHED_COLUMNS = (
+    DialerUser.id,
+    DialerUser.username,
+    DialerUser.timezone,
+    DialerUser.days_of_week,
+    DialerUser.start_time,
+    DialerUser.end_time,
+    DialerUser.is_logged_in,
+    DialerUser.auto_login,
+    DialerUser.auto_unpause,
+    DialerUser.agent_id,
+    DialerUser.updated_at,
+)
+
+# days_of_week names -> datetime.weekday() bit
+DAY_INDEX = {
+    day: i for i, day in enumerate(
+        ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+    )
+}
+ALL_DAYS_MASK = (1 << 7) - 1
+
+
+def _minute_of_day(value: str) -> int:
+    """'HH:MM' -> minutes since midnight"""
+    hour, minute = map(int, value.split(':'))
+    return hour * 60 + minute
+
+
+def _window_position(start_minute: int, end_minute: int, days_mask: int,
+                     weekday: int, current_minute: int) -> Tuple[bool, bool]:
+    """
+    (inside the window, past its end) at current_minute on weekday
+    
+    Overnight windows (start > end) wrap past midnight - the part after
+    midnight belongs to the day the window started, so it is judged by the
+    previous day's bit (Fri 22:00-02:00 still ends Saturday 02:00 even when
+    Saturday itself is not scheduled). The logout side is not gated on the day.
+    """
+    if start_minute <= end_minute:
+        in_window = (days_mask >> weekday) & 1 and start_minute <= current_minute <= end_minute
+        return bool(in_window), current_minute > end_minute
+    
+    if current_minute >= start_minute:
+        in_window = (days_mask >> weekday) & 1
+    elif current_minute <= end_minute:
+        in_window = (days_mask >> ((weekday - 1) % 7)) & 1
+    else:
+        in_window = False
+    # Overnight: anywhere outside the window is on the logout side
+    return bool(in_window), not in_window
+
+# Call statuses that block a scheduled logout
+ACTIVE_CALL_STATUSES = ('initiated', 'ringing', 'answered', 'in_progress')
+
+# Users processed in parallel per tick - one long-lived DB session each,
+# handed out round-robin so a tick doesn't open a session per user
+SCHEDULE_SESSIONS = 4
+
+# Longest sleep between scans - picks up schedule edits made outside the API
+SCHEDULE_RESCAN_SECONDS = 300
+# Same cap while LISTENing on dialer_user_changed - every edit (API, admin,
+# SQL console) wakes the loop, so the rescan is only a safety net
+SCHEDULE_LISTEN_RESCAN_SECONDS = 3600
+# NOTIFY channel fired by the dialer_users trigger (migration 008)
+DIALER_USER_CHANNEL = 'dialer_user_changed'
+# Re-check interval while a user still needs a login/logout (failed login,
+# logout delayed by an active call)
+SCHEDULE_RETRY_SECONDS = 60
+
 
 class CampaignScheduler:
     """
@@ -29,88 +127,274 @@ class CampaignScheduler:
     """
     
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
         self.running = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()  # set by wake() when a schedule changes
+        self._session_pool: Optional[asyncio.Queue] = None  # created in start()
+        self._active_agents: set[int] = set()  # agents on a call, refreshed each tick
+        # user id -> (updated_at, (start_minute, end_minute, days_mask)); start/end
+        # are None when the schedule has no times
+        self._sched_cache: Dict[int, Tuple[Optional[datetime], tuple]] = {}
+        self._listen_conn = None  # dedicated asyncpg connection for LISTEN (PostgreSQL only)
+        # Bound once - _process_user_schedule calls these for every due user
+        self._login_with_retry = dialer_automation.login_with_retry
+        self._click_unpause = dialer_automation.click_unpause
+        self._click_pause = dialer_automation.click_pause
+        self._logout_dialer = dialer_automation.logout_dialer
+        self._notify_login_failure = notification_service.notify_login_failure
     
     async def start(self):
         """Start the scheduler"""
         if not self.running:
-            # Add job to check schedules every minute
-            self.scheduler.add_job(
-                self.check_schedules,
-                'cron',
-                minute='*',  # Run every minute
-                id='check_campaign_schedules'
-            )
+            self._session_pool = asyncio.Queue()
+            for _ in range(SCHEDULE_SESSIONS):
+                self._session_pool.put_nowait(async_session_maker())
+            
+            await self._start_listener()
             
-            self.scheduler.start()
             self.running = True
-            logger.info("Campaign scheduler started - checking every minute")
+            self._wake.clear()
+            self._loop_task = asyncio.create_task(self._run_loop())
+            logger.info("Campaign scheduler started - waking on schedule transitions")
     
     async def stop(self):
         """Stop the scheduler"""
         if self.running:
-            self.scheduler.shutdown()
             self.running = False
+            if self._loop_task:
+                self._loop_task.cancel()
+                try:
+                    await self._loop_task
+                except asyncio.CancelledError:
+                    pass
+                self._loop_task = None
+            
+            await self._stop_listener()
+            
+            while not self._session_pool.empty():
+                await self._session_pool.get_nowait().close()
+            self._session_pool = None
             logger.info("Campaign scheduler stopped")
     
-    async def check_schedules(self):
+    def wake(self):
+        """Re-check schedules now (call after a dialer user's schedule changes)"""
+        self._wake.set()
+    
+    async def _start_listener(self):
+        """LISTEN for dialer_users changes - falls back to periodic rescans if unavailable"""
+        if not ASYNCPG_AVAILABLE or not database_url.startswith("postgresql"):
+            return
+        
+        try:
+            # asyncpg wants a plain postgresql:// DSN, not the SQLAlchemy dialect URL
+            dsn = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+            self._listen_conn = await asyncpg.connect(dsn)
+            await self._listen_conn.add_listener(DIALER_USER_CHANNEL, self._on_user_changed)
+            logger.info(f"Campaign scheduler listening on {DIALER_USER_CHANNEL}")
+        except Exception as e:
+            logger.warning(f"Could not LISTEN on {DIALER_USER_CHANNEL}, using periodic rescans: {e}")
+            await self._stop_listener()
+    
+    async def _stop_listener(self):
+        """Close the LISTEN connection"""
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is not None and not conn.is_closed():
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.debug(f"Error closing listener connection: {e}")
+    
+    def _on_user_changed(self, connection, pid, channel, payload):
+        """NOTIFY callback - drop the user's parsed schedule and re-check now"""
+        try:
+            self._sched_cache.pop(int(payload), None)
+        except ValueError:
+            self._sched_cache.clear()
+        self.wake()
+    
+    def _rescan_seconds(self) -> int:
+        """Longest sleep between scans - long while edits arrive via NOTIFY"""
+        if self._listen_conn is not None and not self._listen_conn.is_closed():
+            return SCHEDULE_LISTEN_RESCAN_SECONDS
+        return SCHEDULE_RESCAN_SECONDS
+    
+    async def _run_loop(self):
+        """Sleep until the next schedule transition (or wake()), then check schedules"""
+        while self.running:
+            delay = await self.check_schedules()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+    
+    async def check_schedules(self) -> float:
         """
-        Check all scheduled campaigns and start/stop them
-        Called every minute by APScheduler
+        Start/stop campaigns whose schedule needs it right now
+        
+        Returns:
+            Seconds until the next check is needed (next start/end
+            transition of any user, capped by _rescan_seconds())
         """
+        delay = self._rescan_seconds()
         try:
             async with async_session_maker() as db:
-                # Get all users with schedules enabled
-                result = await db.execute(
-                    select(DialerUser).where(
-                        DialerUser.schedule_enabled == True,
-                        DialerUser.is_active == True
-                    )
-                )
-                users = result.scalars().all()
+                # Get all users with schedules enabled - plain column rows,
+                # no ORM objects (login/logout go through dialer_automation by id)
+                # lambda_stmt: statement built and compiled once per process
+                result = await db.execute(lambda_stmt(lambda: select(*_SCHED_COLUMNS).where(
+                    DialerUser.schedule_enabled == True,
+                    DialerUser.is_active == True
+                )))
+                users = [_UserSched(*row) for row in result.all()]
                 
+                # Only users inside a transition (or still retrying one) are processed
+                # One clock read per tick - every user is judged at the same instant
+                now_utc = datetime.now(timezone.utc)
+                now_ts = now_utc.timestamp()
+                due = []
                 for user in users:
-                    await self._process_user_schedule(db, user)
-                    
+                    # A bad row (unknown timezone, unparseable time) must not stop everyone else's schedule
+                    try:
+                        needs_action, next_transition = self._schedule_position(user, now_utc)
+                    except Exception as e:
+                        logger.error(f"User {user.id}: invalid schedule, skipping: {e}")
+                        continue
+                    if needs_action:
+                        due.append(user)
+                    delay = min(delay, next_transition - now_ts)
+                if due:
+                    delay = min(delay, SCHEDULE_RETRY_SECONDS)
+                
+                # One query for every agent's active calls instead of one per user
+                agent_ids = [user.agent_id for user in due if user.agent_id]
+                self._active_agents = set()
+                if agent_ids:
+                    result = await db.execute(lambda_stmt(lambda: select(Call.agent_id).where(
+                        Call.agent_id.in_(agent_ids),
+                        Call.status.in_(ACTIVE_CALL_STATUSES)
+                    ).distinct()))
+                    self._active_agents = set(result.scalars().all())
+            
+            # A slow login for one user must not hold up everyone else's schedule
+            await asyncio.gather(
+                *(self._process_with_pooled_session(user, now_utc) for user in due),
+                return_exceptions=True
+            )
+            
         except Exception as e:
             logger.error(f"Error checking schedules: {e}")
+            delay = SCHEDULE_RETRY_SECONDS
+        
+        return max(delay, 1)
+    
+    async def _process_with_pooled_session(self, user: _UserSched, now_utc: datetime):
+        """Process one user on a session borrowed from the pool (waits for a free one)"""
+        session = await self._session_pool.get()
+        try:
+            await self._process_user_schedule(session, user, now_utc)
+        finally:
+            # Leave nothing behind for the next user of this session
+            if session.in_transaction():
+                await session.rollback()
+            session.expunge_all()
+            self._session_pool.put_nowait(session)
     
-    async def _process_user_schedule(self, db: AsyncSession, user: DialerUser):
+    def _parsed_schedule(self, user: _UserSched) -> tuple:
+        """
+        (start_minute, end_minute, days_mask) for a user, parsed once per
+        row version instead of re-splitting the strings every tick
+        """
+        cached = self._sched_cache.get(user.id)
+        if cached is not None and cached[0] == user.updated_at:
+            return cached[1]
+        
+        if user.days_of_week:
+            days_mask = 0
+            for day in user.days_of_week.split(','):
+                day_index = DAY_INDEX.get(day.strip().lower())
+                if day_index is not None:
+                    days_mask |= 1 << day_index
+        else:
+            days_mask = ALL_DAYS_MASK
+        
+        if user.start_time and user.end_time:
+            parsed = (_minute_of_day(user.start_time), _minute_of_day(user.end_time), days_mask)
+        else:
+            logger.warning(f"User {user.username}: Missing start/end time")
+            parsed = (None, None, days_mask)
+        
+        self._sched_cache[user.id] = (user.updated_at, parsed)
+        return parsed
+    
+    def _schedule_position(self, user: _UserSched, now_utc: datetime) -> Tuple[bool, float]:
+        """
+        Where a user stands in their schedule at now_utc
+        
+        Returns:
+            (login/logout needed now, epoch seconds of the next start/end transition)
+        """
+        start_minute, end_minute, days_mask = self._parsed_schedule(user)
+        if start_minute is None:
+            return False, math.inf
+        
+        now = now_utc.astimezone(_tz(user.timezone))
+        current_minute = now.hour * 60 + now.minute
+        
+        # Same decisions as _process_user_schedule
+        in_window, past_end = _window_position(
+            start_minute, end_minute, days_mask, now.weekday(), current_minute
+        )
+        if in_window:
+            needs_action = not user.is_logged_in and user.auto_login
+        else:
+            needs_action = user.is_logged_in and past_end
+        
+        # Next login (start_minute on a scheduled day) or logout (first minute
+        # after end_minute) - an overnight window ends the day after it starts,
+        # so that logout is due when the previous day is scheduled
+        overnight = start_minute > end_minute
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day_offset in range(8):
+            day = midnight + timedelta(days=day_offset)
+            weekday = day.weekday()
+            transitions = []
+            if not overnight or (days_mask >> ((weekday - 1) % 7)) & 1:
+                transitions.append(end_minute + 1)
+            if (days_mask >> weekday) & 1:
+                transitions.append(start_minute)
+            # earliest first - for overnight windows the logout comes first in a day
+            for minute in sorted(transitions):
+                transition = day + timedelta(minutes=minute)
+                if transition > now:
+                    return needs_action, transition.timestamp()
+        
+        return needs_action, math.inf
+    
+    async def _process_user_schedule(self, db: AsyncSession, user: _UserSched, now_utc: datetime):
         """
         Process schedule for a single user
         
         Args:
             db: Database session
-            user: DialerUser instance
+            user: Schedule fields of the dialer user
+            now_utc: Tick time (aware UTC datetime)
         """
         try:
-            # Get current time in user's timezone
-            tz = pytz.timezone(user.timezone)
-            now = datetime.now(tz)
-            current_time = now.time()
-            current_day = now.strftime('%A').lower()  # 'monday', 'tuesday', etc.
-            
-            # Check if today is a scheduled day
-            if user.days_of_week:
-                scheduled_days = [d.strip().lower() for d in user.days_of_week.split(',')]
-                if current_day not in scheduled_days:
-                    logger.debug(f"User {user.username}: Today ({current_day}) not scheduled")
-                    return
+            # Tick time in user's timezone
+            now = now_utc.astimezone(_tz(user.timezone))
+            start_minute, end_minute, days_mask = self._parsed_schedule(user)
             
-            # Parse start and end times
-            if not user.start_time or not user.end_time:
-                logger.warning(f"User {user.username}: Missing start/end time")
+            if start_minute is None:
                 return
             
-            start_hour, start_min = map(int, user.start_time.split(':'))
-            end_hour, end_min = map(int, user.end_time.split(':'))
-            
-            start_time = time(start_hour, start_min)
-            end_time = time(end_hour, end_min)
-            
-            # Check if we're within the scheduled time window
-            is_within_schedule = start_time <= current_time <= end_time
+            # Check if we're within the scheduled time window (minute resolution) -
+            # day bits are applied per window, so an overnight window that started
+            # on a scheduled day still ends on an unscheduled one
+            current_minute = now.hour * 60 + now.minute
+            is_within_schedule, past_end = _window_position(
+                start_minute, end_minute, days_mask, now.weekday(), current_minute
+            )
             
             if is_within_schedule:
                 # Should be running
@@ -118,7 +402,7 @@ class CampaignScheduler:
                     logger.info(f"🚀 Starting campaign for {user.username} - scheduled time reached")
                     
                     # Login to dialer with retry
-                    success, attempts, error = await dialer_automation.login_with_retry(
+                    success, attempts, error = await self._login_with_retry(
                         db, user.id, max_retries=3, headless=True
                     )
                     
@@ -127,12 +411,12 @@ class CampaignScheduler:
                         await asyncio.sleep(2)
                         
                         # Click unpause
-                        await dialer_automation.click_unpause(db, user.id)
+                        await self._click_unpause(db, user.id)
                         logger.info(f"✅ Campaign started for {user.username}")
                     elif not success:
                         # Login failed after retries, send notification
                         logger.error(f"❌ Failed to login {user.username} after {attempts} attempts")
-                        await notification_service.notify_login_failure(
+                        await self._notify_login_failure(
                             db=db,
                             dialer_user_id=user.id,
                             username=user.username,
@@ -144,9 +428,9 @@ class CampaignScheduler:
                 # Should be stopped
                 if user.is_logged_in:
                     # Check if we passed the end time
-                    if current_time > end_time:
+                    if past_end:
                         # Check for active calls before logout
-                        has_active_call = await self._check_active_call(db, user)
+                        has_active_call = self._check_active_call(user.agent_id)
                         
                         if has_active_call:
                             logger.warning(
@@ -157,73 +441,68 @@ class CampaignScheduler:
                         logger.info(f"🛑 Stopping campaign for {user.username} - scheduled end time reached")
                         
                         # Pause first
-                        await dialer_automation.click_pause(db, user.id)
+                        await self._click_pause(db, user.id)
                         
                         # Wait a moment
                         await asyncio.sleep(1)
                         
                         # Logout
-                        await dialer_automation.logout_dialer(db, user.id)
+                        await self._logout_dialer(db, user.id)
                         logger.info(f"✅ Campaign stopped for {user.username}")
                         
         except Exception as e:
             logger.error(f"Error processing schedule for user {user.id}: {e}")
     
-    async def _check_active_call(self, db: AsyncSession, user: DialerUser) -> bool:
+    def _check_active_call(self, agent_id: Optional[int]) -> bool:
         """
         Check if user/agent has any active calls
+        (against the active agent set loaded at the start of the tick)
         
         Returns:
             True if there's an active call
         """
-        try:
-            if not user.agent_id:
-                return False
-            
-            # Check for active calls for this agent
-            result = await db.execute(
-                select(Call).where(
-                    Call.agent_id == user.agent_id,
-                    Call.status.in_(['initiated', 'ringing', 'answered', 'in_progress'])
-                )
-            )
-            active_call = result.scalar_one_or_none()
-            
-            return active_call is not None
-            
-        except Exception as e:
-            logger.error(f"Error checking active call: {e}")
-            return False  # Default to allowing logout if check fails
+        return agent_id in self._active_agents
     
-    async def get_active_campaigns(self, db: AsyncSession) -> List[dict]:
+    async def get_active_campaigns(self, db: AsyncSession, include_current_time: bool = False) -> List[dict]:
         """
         Get list of currently active campaigns
         
+        Args:
+            db: Database session
+            include_current_time: Add each user's local 'HH:MM' as current_time
+        
         Returns:
             List of dicts with campaign info
         """
         try:
-            result = await db.execute(
-                select(DialerUser).where(
-                    DialerUser.is_logged_in == True
-                )
-            )
-            users = result.scalars().all()
+            result = await db.execute(lambda_stmt(lambda: select(
+                DialerUser.id,
+                DialerUser.username,
+                DialerUser.agent_id,
+                DialerUser.last_login,
+                DialerUser.end_time,
+                DialerUser.timezone
+            ).where(
+                DialerUser.is_logged_in == True
+            )))
             
-            active_campaigns = []
-            for user in users:
-                tz = pytz.timezone(user.timezone)
-                now = datetime.now(tz)
-                
-                active_campaigns.append({
-                    'user_id': user.id,
-                    'username': user.username,
-                    'agent_id': user.agent_id,
-                    'started_at': user.last_login,
-                    'scheduled_end': user.end_time,
-                    'timezone': user.timezone,
-                    'current_time': now.strftime('%H:%M')
-                })
+            active_campaigns = [
+                {
+                    'user_id': user_id,
+                    'username': username,
+                    'agent_id': agent_id,
+                    'started_at': last_login,
+                    'scheduled_end': end_time,
+                    'timezone': tz_name
+                }
+                for user_id, username, agent_id, last_login, end_time, tz_name in result.all()
+            ]
+            
+            if include_current_time:
+                now_utc = datetime.now(timezone.utc)
+                for campaign in active_campaigns:
+                    now = now_utc.astimezone(_tz(campaign['timezone']))
+                    campaign['current_time'] = now.strftime('%H:%M')
             
             return active_campaigns
             
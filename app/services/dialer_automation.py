@@ -5,27 +5,207 @@ Uses Selenium for browser automation (Python 3.13 compatible)
 """
 import asyncio
 import logging
-from typing import Optional, Dict, Tuple
-from datetime import datetime
-import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple
+from datetime import datetime, timezone
 import random
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, NoAlertPresentException, WebDriverException
+)
 from webdriver_manager.chrome import ChromeDriverManager
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from app.models.dialer_user import DialerUser
+from app.database import async_session_maker
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Threads for blocking Selenium work - logins are network-bound, so many can
+# wait on page loads at once (the default executor is min(32, cpus + 4), shared)
+DIALER_MAX_WORKERS = 32
+
+# Fill form fields and click submit in one round-trip instead of a
+# find/clear/send_keys (one CDP message per key) chain per field.
+# arguments[0] = [[css, value], ...], arguments[1] = submit css. Uses the
+# native value setter + input/change events so framework-bound inputs see
+# the value. Returns the clicked submit element, or null (nothing touched)
+# if any selector doesn't match yet
+FILL_AND_SUBMIT_JS = """
+    const fields = arguments[0].map(([css, value]) => [document.querySelector(css), value]);
+    const submit = document.querySelector(arguments[1]);
+    if (!submit || fields.some(([el]) => !el)) return null;
+    const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+    for (const [el, value] of fields) {
+        el.focus();
+        setValue.call(el, value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    submit.click();
+    return submit;
+"""
+
+# CallTools login form (CSS for FILL_AND_SUBMIT_JS - SELECTORS["calltools"] is the fallback)
+CALLTOOLS_USERNAME_CSS = 'input[name="username"], input#username'
+CALLTOOLS_PASSWORD_CSS = 'input[name="password"], input#password, input[type="password"]'
+CALLTOOLS_SUBMIT_CSS = 'button[type="submit"], input[type="submit"]'
+
+# Chrome flags for every dialer browser - built once, _create_driver only
+# adds the per-driver profile dir
+CHROME_ARGS = (
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--window-size=1920,1080',
+    '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    
+    # Auto-allow microphone and disable password prompts
+    '--use-fake-ui-for-media-stream',
+    '--use-fake-device-for-media-stream',
+    '--disable-save-password-bubble',
+    '--password-store=basic',
+    
+    # Chrome background services compete with the dialer for CPU/network.
+    # Only the last --disable-features switch counts - keep them in one
+    '--disable-features=PasswordManager,PasswordLeakDetection,AutofillServerCommunication,'
+    'InterestFeedContentSuggestions,CalculateNativeWinOcclusion,OptimizationHints,MediaRouter',
+    '--disable-background-networking',
+    '--disable-client-side-phishing-detection',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-domain-reliability',
+    '--disable-sync',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--no-default-browser-check',
+    
+    # Dialers in background tabs (shared Chrome) keep their timers and
+    # softphone JS running at full speed
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+)
+# Nobody looks at a headless dialer - no sound, no image downloads. CSS stays
+# (visibility checks need it), media_stream stays (softphone mic)
+HEADLESS_CHROME_ARGS = ('--headless=new', '--mute-audio', '--blink-settings=imagesEnabled=false') + CHROME_ARGS
+
+# Comprehensive password manager disable preferences
+CHROME_PREFS = {
+    "credentials_enable_service": False,
+    "profile.password_manager_enabled": False,
+    "profile.password_manager_leak_detection": False,
+    "profile.default_content_setting_values.notifications": 2,
+    "autofill.profile_enabled": False
+}
+HEADLESS_CHROME_PREFS = {**CHROME_PREFS, "profile.managed_default_content_settings.images": 2}
+
+# TM Dialer agent screen shows this while the agent is paused
+PAUSED_XPATH = "//*[contains(text(), 'YOU ARE PAUSED')]"
+
+# Find the visible pause element and click it in one round-trip - 'YOU ARE
+# PAUSED' text first, then an 'ENTER A PAUSE CODE' link. Returns what was
+# clicked, or null (arguments[0] = PAUSED_XPATH)
+CLICK_PAUSE_ELEMENT_JS = """
+    const visible = e => e.getClientRects().length > 0;
+    const snap = document.evaluate(arguments[0], document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    let target = null;
+    for (let i = 0; i < snap.snapshotLength && !target; i++) {
+        const e = snap.snapshotItem(i);
+        if (visible(e) && e.textContent.includes('YOU ARE PAUSED')) target = e;
+    }
+    if (!target) {
+        target = Array.from(document.links).find(a => visible(a) &&
+            /YOU ARE PAUSED|ENTER A PAUSE CODE/.test(a.innerText)) || null;
+    }
+    if (!target) return null;
+    target.click();
+    return target.tagName.toLowerCase() + " '" + (target.innerText || '').trim().slice(0, 40) + "'";
+"""
+
+# Any 'YOU ARE PAUSED' element still visible (arguments[0] = PAUSED_XPATH)
+PAUSED_VISIBLE_JS = """
+    const snap = document.evaluate(arguments[0], document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < snap.snapshotLength; i++) {
+        if (snap.snapshotItem(i).getClientRects().length > 0) return true;
+    }
+    return false;
+"""
+
+
+@dataclass(slots=True)
+class _LoggedInUser:
+    """DialerUser fields the pause/unpause clicks need, kept while the user is logged in"""
+    id: int
+    username: str
+    dialer_type: str
+
+
+def _compile(locators) -> tuple:
+    """(By, value) locators -> presence_of_element_located conditions"""
+    return tuple(EC.presence_of_element_located(locator) for locator in locators)
+
+
+# Popups on the TM Dialer agent screen after login - (condition, name),
+# watched by a single wait
+POST_LOGIN_POPUPS = (
+    # "Another live agent session was open" message
+    (EC.element_to_be_clickable((By.LINK_TEXT, "OK")), "duplicate session warning"),
+    (EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "OK")), "duplicate session warning"),
+    (EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Allow this time')]")), "microphone permission"),
+    (EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'OK')]")), "browser popup"),
+)
+
+
+# Login success markers, checked in the page - only a bool crosses the wire
+# instead of the whole page_source
+LOGIN_SUCCESS_JS = """
+    const u = location.href.toLowerCase();
+    if (u.includes('dashboard') || u.includes('agent')) return true;
+    const t = document.documentElement.outerHTML.toLowerCase();
+    return t.includes('campaign') || t.includes('logout') || t.includes('pause') || t.includes('ready');
+"""
+
+
+def _login_succeeded(driver) -> bool:
+    """WebDriverWait condition - dialer shows a logged-in page"""
+    return bool(driver.execute_script(LOGIN_SUCCESS_JS))
+
+
+def _first_match(conditions: tuple):
+    """
+    Like EC.any_of, but returns (condition, element) so the caller can
+    remember which selector matched
+    """
+    def _predicate(driver):
+        for condition in conditions:
+            try:
+                element = condition(driver)
+            except WebDriverException:
+                continue
+            if element:
+                return condition, element
+        return False
+    return _predicate
+
+
+def _page_loaded(driver) -> bool:
+    """WebDriverWait condition - DOM parsed (matches the eager page load strategy)"""
+    return driver.execute_script("return document.readyState") != "loading"
+
 
 class DialerAutomationService:
     """
@@ -33,179 +213,213 @@ class DialerAutomationService:
     Supports multiple dialer types with configurable selectors
     """
     
+    # Dialer-specific selectors (can be configured per dialer type)
+    # Each selector is a tuple of (By.TYPE, "value") locators - any match wins
+    SELECTORS = {
+        "generic": {
+            "username_field": (
+                (By.NAME, "username"),
+                (By.ID, "username"),
+                (By.ID, "user"),
+                (By.XPATH, "//input[@type='text']"),
+            ),
+            "password_field": (
+                (By.NAME, "password"),
+                (By.ID, "password"),
+                (By.ID, "pass"),
+                (By.XPATH, "//input[@type='password']"),
+            ),
+            "login_button": (
+                (By.XPATH, "//button[@type='submit']"),
+                (By.XPATH, "//input[@type='submit']"),
+                (By.XPATH, "//button[contains(text(), 'Login')]"),
+                (By.XPATH, "//button[contains(text(), 'Sign in')]"),
+            ),
+            "unpause_button": (
+                (By.XPATH, "//button[contains(text(), 'Unpause')]"),
+                (By.XPATH, "//button[contains(text(), 'Resume')]"),
+                (By.XPATH, "//button[contains(text(), 'Start')]"),
+                (By.ID, "unpause"),
+                (By.CLASS_NAME, "unpause-btn"),
+            ),
+            "pause_button": (
+                (By.XPATH, "//button[contains(text(), 'Pause')]"),
+                (By.ID, "pause"),
+                (By.CLASS_NAME, "pause-btn"),
+            ),
+        },
+        "vicidial": {
+            "username_field": ((By.ID, "AgentUserID"),),
+            "password_field": ((By.ID, "AgentPassword"),),
+            "login_button": ((By.ID, "AgentLoginButton"),),
+            "unpause_button": ((By.XPATH, "//option[@value='RESUME']"),),
+            "pause_button": ((By.ID, "PauseCodeSelectBox"),),
+        },
+        "goautodial": {
+            "username_field": ((By.NAME, "user"),),
+            "password_field": ((By.NAME, "pass"),),
+            "login_button": ((By.XPATH, "//button[@type='submit']"),),
+            "unpause_button": ((By.CLASS_NAME, "resume-btn"),),
+            "pause_button": ((By.CLASS_NAME, "pause-btn"),),
+        },
+        "calltools": {
+            # CallTools (east-1.calltools.io)
+            "username_field": (
+                (By.NAME, "username"),
+                (By.ID, "username"),
+                (By.XPATH, "//input[@name='username']"),
+                (By.XPATH, "//input[@type='text']"),
+            ),
+            "password_field": (
+                (By.NAME, "password"),
+                (By.ID, "password"),
+                (By.XPATH, "//input[@name='password']"),
+                (By.XPATH, "//input[@type='password']"),
+            ),
+            "login_button": (
+                (By.XPATH, "//button[@type='submit']"),
+                (By.XPATH, "//button[contains(text(), 'Login')]"),
+                (By.XPATH, "//button[contains(text(), 'Sign In')]"),
+                (By.XPATH, "//input[@type='submit']"),
+            ),
+            "unpause_button": (
+                (By.XPATH, "//button[contains(text(), 'Resume')]"),
+                (By.XPATH, "//button[contains(text(), 'Available')]"),
+                (By.ID, "unpause"),
+            ),
+            "pause_button": (
+                (By.XPATH, "//button[contains(text(), 'Pause')]"),
+                (By.ID, "pause"),
+            ),
+        },
+        "tmdialer": {
+            # TM Dialer (tmdialer.gradientconnectedai.com)
+            # Welcome screen - Agent Login link
+            "agent_login_link": (
+                (By.LINK_TEXT, "Agent Login"),
+                (By.PARTIAL_LINK_TEXT, "Agent"),
+                (By.XPATH, "//a[contains(text(), 'Agent Login')]"),
+                (By.XPATH, "//a[@href*='agc/vicidial.php']"),
+            ),
+            # Phone Login page (agc/vicidial.php)
+            "phone_login_field": (
+                (By.NAME, "phone_login"),
+                (By.XPATH, "//input[@name='phone_login']"),
+                (By.XPATH, "//td[contains(text(), 'Phone Login')]/following-sibling::td/input"),
+            ),
+            "phone_password_field": (
+                (By.NAME, "phone_pass"),
+                (By.XPATH, "//input[@name='phone_pass']"),
+                (By.XPATH, "//td[contains(text(), 'Phone Password')]/following-sibling::td/input"),
+            ),
+            "phone_submit_button": (
+                (By.XPATH, "//input[@value='SUBMIT']"),
+                (By.XPATH, "//input[@type='submit']"),
+                (By.NAME, "SUBMIT"),
+            ),
+            # Campaign Login page (second page after phone login)
+            "campaign_user_field": (
+                (By.NAME, "VD_login"),
+                (By.XPATH, "//input[@name='VD_login']"),
+                (By.XPATH, "//td[contains(text(), 'User Login')]/following-sibling::td/input"),
+            ),
+            "campaign_pass_field": (
+                (By.NAME, "VD_pass"),
+                (By.XPATH, "//input[@name='VD_pass']"),
+                (By.XPATH, "//td[contains(text(), 'User Password')]/following-sibling::td/input"),
+            ),
+            "campaign_dropdown": (
+                (By.NAME, "VD_campaign"),
+                (By.XPATH, "//select[@name='VD_campaign']"),
+                (By.XPATH, "//td[contains(text(), 'Campaign')]/following-sibling::td/select"),
+            ),
+            "campaign_submit": (
+                (By.XPATH, "//input[@value='SUBMIT']"),
+                (By.XPATH, "//input[@type='submit']"),
+                (By.NAME, "SUBMIT"),
+            ),
+            # Call control buttons (Agent interface)
+            "pause_status_button": (
+                # The "ENTER A PAUSE CODE" link - clicking this unpauses the agent
+                (By.LINK_TEXT, "ENTER A PAUSE CODE"),
+                (By.PARTIAL_LINK_TEXT, "PAUSE CODE"),
+                (By.XPATH, "//a[contains(text(), 'PAUSE CODE')]"),
+                # Fallback selectors
+                (By.XPATH, "//*[contains(text(), 'YOU ARE PAUSED')]"),
+                (By.XPATH, "//span[contains(text(), 'PAUSED')]"),
+            ),
+            "unpause_button": (
+                (By.LINK_TEXT, "ENTER A PAUSE CODE"),  # Main selector for TM Dialer
+                (By.XPATH, "//a[contains(text(), 'PAUSE CODE')]"),
+                (By.XPATH, "//span[contains(text(), 'YOU ARE PAUSED')]"),
+                (By.XPATH, "//button[contains(text(), 'Ready')]"),
+                (By.XPATH, "//button[contains(text(), 'Unpause')]"),
+                (By.ID, "PauseCodeSpan"),
+            ),
+            "pause_button": (
+                (By.XPATH, "//button[contains(text(), 'Pause')]"),
+                (By.ID, "pause"),
+            ),
+        }
+    }
+    
+    # Presence conditions per dialer/field, built once - _find_element waits on these
+    COMPILED = {
+        dialer: {field: _compile(locators) for field, locators in fields.items()}
+        for dialer, fields in SELECTORS.items()
+    }
+    
     def __init__(self):
         self.drivers: Dict[int, webdriver.Chrome] = {}  # user_id -> driver
-        
-        # Dialer-specific selectors (can be configured per dialer type)
-        # Each selector is a list of (By.TYPE, "value") tuples to try in order
-        self.selectors = {
-            "generic": {
-                "username_field": [
-                    (By.NAME, "username"),
-                    (By.ID, "username"),
-                    (By.ID, "user"),
-                    (By.XPATH, "//input[@type='text']"),
-                ],
-                "password_field": [
-                    (By.NAME, "password"),
-                    (By.ID, "password"),
-                    (By.ID, "pass"),
-                    (By.XPATH, "//input[@type='password']"),
-                ],
-                "login_button": [
-                    (By.XPATH, "//button[@type='submit']"),
-                    (By.XPATH, "//input[@type='submit']"),
-                    (By.XPATH, "//button[contains(text(), 'Login')]"),
-                    (By.XPATH, "//button[contains(text(), 'Sign in')]"),
-                ],
-                "unpause_button": [
-                    (By.XPATH, "//button[contains(text(), 'Unpause')]"),
-                    (By.XPATH, "//button[contains(text(), 'Resume')]"),
-                    (By.XPATH, "//button[contains(text(), 'Start')]"),
-                    (By.ID, "unpause"),
-                    (By.CLASS_NAME, "unpause-btn"),
-                ],
-                "pause_button": [
-                    (By.XPATH, "//button[contains(text(), 'Pause')]"),
-                    (By.ID, "pause"),
-                    (By.CLASS_NAME, "pause-btn"),
-                ],
-            },
-            "vicidial": {
-                "username_field": [(By.ID, "AgentUserID")],
-                "password_field": [(By.ID, "AgentPassword")],
-                "login_button": [(By.ID, "AgentLoginButton")],
-                "unpause_button": [(By.XPATH, "//option[@value='RESUME']")],
-                "pause_button": [(By.ID, "PauseCodeSelectBox")],
-            },
-            "goautodial": {
-                "username_field": [(By.NAME, "user")],
-                "password_field": [(By.NAME, "pass")],
-                "login_button": [(By.XPATH, "//button[@type='submit']")],
-                "unpause_button": [(By.CLASS_NAME, "resume-btn")],
-                "pause_button": [(By.CLASS_NAME, "pause-btn")],
-            },
-            "calltools": {
-                # CallTools (east-1.calltools.io)
-                "username_field": [
-                    (By.NAME, "username"),
-                    (By.ID, "username"),
-                    (By.XPATH, "//input[@name='username']"),
-                    (By.XPATH, "//input[@type='text']"),
-                ],
-                "password_field": [
-                    (By.NAME, "password"),
-                    (By.ID, "password"),
-                    (By.XPATH, "//input[@name='password']"),
-                    (By.XPATH, "//input[@type='password']"),
-                ],
-                "login_button": [
-                    (By.XPATH, "//button[@type='submit']"),
-                    (By.XPATH, "//button[contains(text(), 'Login')]"),
-                    (By.XPATH, "//button[contains(text(), 'Sign In')]"),
-                    (By.XPATH, "//input[@type='submit']"),
-                ],
-                "unpause_button": [
-                    (By.XPATH, "//button[contains(text(), 'Resume')]"),
-                    (By.XPATH, "//button[contains(text(), 'Available')]"),
-                    (By.ID, "unpause"),
-                ],
-                "pause_button": [
-                    (By.XPATH, "//button[contains(text(), 'Pause')]"),
-                    (By.ID, "pause"),
-                ],
-            },
-            "tmdialer": {
-                # TM Dialer (tmdialer.gradientconnectedai.com)
-                # Welcome screen - Agent Login link
-                "agent_login_link": [
-                    (By.LINK_TEXT, "Agent Login"),
-                    (By.PARTIAL_LINK_TEXT, "Agent"),
-                    (By.XPATH, "//a[contains(text(), 'Agent Login')]"),
-                    (By.XPATH, "//a[@href*='agc/vicidial.php']"),
-                ],
-                # Phone Login page (agc/vicidial.php)
-                "phone_login_field": [
-                    (By.NAME, "phone_login"),
-                    (By.XPATH, "//input[@name='phone_login']"),
-                    (By.XPATH, "//td[contains(text(), 'Phone Login')]/following-sibling::td/input"),
-                ],
-                "phone_password_field": [
-                    (By.NAME, "phone_pass"),
-                    (By.XPATH, "//input[@name='phone_pass']"),
-                    (By.XPATH, "//td[contains(text(), 'Phone Password')]/following-sibling::td/input"),
-                ],
-                "phone_submit_button": [
-                    (By.XPATH, "//input[@value='SUBMIT']"),
-                    (By.XPATH, "//input[@type='submit']"),
-                    (By.NAME, "SUBMIT"),
-                ],
-                # Campaign Login page (second page after phone login)
-                "campaign_user_field": [
-                    (By.NAME, "VD_login"),
-                    (By.XPATH, "//input[@name='VD_login']"),
-                    (By.XPATH, "//td[contains(text(), 'User Login')]/following-sibling::td/input"),
-                ],
-                "campaign_pass_field": [
-                    (By.NAME, "VD_pass"),
-                    (By.XPATH, "//input[@name='VD_pass']"),
-                    (By.XPATH, "//td[contains(text(), 'User Password')]/following-sibling::td/input"),
-                ],
-                "campaign_dropdown": [
-                    (By.NAME, "VD_campaign"),
-                    (By.XPATH, "//select[@name='VD_campaign']"),
-                    (By.XPATH, "//td[contains(text(), 'Campaign')]/following-sibling::td/select"),
-                ],
-                "campaign_submit": [
-                    (By.XPATH, "//input[@value='SUBMIT']"),
-                    (By.XPATH, "//input[@type='submit']"),
-                    (By.NAME, "SUBMIT"),
-                ],
-                # Call control buttons (Agent interface)
-                "pause_status_button": [
-                    # The "ENTER A PAUSE CODE" link - clicking this unpauses the agent
-                    (By.LINK_TEXT, "ENTER A PAUSE CODE"),
-                    (By.PARTIAL_LINK_TEXT, "PAUSE CODE"),
-                    (By.XPATH, "//a[contains(text(), 'PAUSE CODE')]"),
-                    # Fallback selectors
-                    (By.XPATH, "//*[contains(text(), 'YOU ARE PAUSED')]"),
-                    (By.XPATH, "//span[contains(text(), 'PAUSED')]"),
-                ],
-                "unpause_button": [
-                    (By.LINK_TEXT, "ENTER A PAUSE CODE"),  # Main selector for TM Dialer
-                    (By.XPATH, "//a[contains(text(), 'PAUSE CODE')]"),
-                    (By.XPATH, "//span[contains(text(), 'YOU ARE PAUSED')]"),
-                    (By.XPATH, "//button[contains(text(), 'Ready')]"),
-                    (By.XPATH, "//button[contains(text(), 'Unpause')]"),
-                    (By.ID, "PauseCodeSpan"),
-                ],
-                "pause_button": [
-                    (By.XPATH, "//button[contains(text(), 'Pause')]"),
-                    (By.ID, "pause"),
-                ],
-            }
-        }
+        self._executor = ThreadPoolExecutor(max_workers=DIALER_MAX_WORKERS, thread_name_prefix="dialer")
+        # Headless logins share one Chrome - each user gets its own tab in an
+        # isolated browser context (separate cookies/storage) and its own
+        # WebDriver session attached to that Chrome, so users' flows run in
+        # parallel. _shared_lock only guards starting Chrome and tab create/dispose
+        self._shared_driver: Optional[webdriver.Chrome] = None
+        self._shared_lock = threading.RLock()
+        self._user_windows: Dict[int, str] = {}  # user_id -> tab target id (shared Chrome)
+        self._user_contexts: Dict[int, str] = {}  # user_id -> CDP browserContextId
+        # (dialer_type, field) -> condition that matched last time, tried first next time
+        self._hot_locator: Dict[Tuple[str, str], object] = {}
+        # user_id -> fields of the logged-in user, so pause/unpause skip the DB
+        # (filled on login, dropped when the user's browser closes)
+        self._user_cache: Dict[int, _LoggedInUser] = {}
+        # chromedriver binary - resolved once in initialize(), not per login
+        self._chromedriver_path: Optional[str] = settings.CHROMEDRIVER_PATH or None
     
     async def initialize(self):
         """Initialize Chrome driver manager"""
         try:
-            # Pre-download ChromeDriver
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, ChromeDriverManager().install)
+            # Pre-download ChromeDriver and keep its path for every login
+            if not self._chromedriver_path:
+                loop = asyncio.get_event_loop()
+                self._chromedriver_path = await loop.run_in_executor(None, ChromeDriverManager().install)
             logger.info("Browser automation initialized successfully (Selenium)")
         except Exception as e:
             logger.error(f"Failed to initialize browser: {e}")
             raise
+        
+        # Launch the shared Chrome now - logins then only open a tab in it
+        if settings.DIALER_PREWARM_BROWSER:
+            try:
+                await asyncio.to_thread(self._prewarm_shared_driver)
+            except Exception as e:
+                logger.warning(f"Could not pre-start shared Chrome (will start on first login): {e}")
     
     async def shutdown(self):
         """Shutdown all browser instances"""
         try:
-            # Close all drivers
-            for driver in self.drivers.values():
+            # Close all user browsers/tabs, then the shared Chrome
+            for user_id in list(self.drivers):
+                await asyncio.to_thread(self._close_user_browser, user_id)
+            
+            if self._shared_driver is not None:
                 try:
-                    await asyncio.to_thread(driver.quit)
+                    await asyncio.to_thread(self._shared_driver.quit)
                 except:
                     pass
+                self._shared_driver = None
             
             self.drivers.clear()
             logger.info("Browser automation shut down successfully")
@@ -214,60 +428,226 @@ class DialerAutomationService:
     
     def _create_driver(self, headless: bool = True) -> webdriver.Chrome:
         """Create new Chrome driver instance"""
-        import tempfile
-        
         options = Options()
+        # driver.get() returns at DOMContentLoaded - dialer pages keep loading
+        # trackers for seconds, the explicit waits cover what the flow needs
+        options.page_load_strategy = "eager"
         
-        if headless:
-            options.add_argument('--headless=new')
-        
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        for argument in HEADLESS_CHROME_ARGS if headless else CHROME_ARGS:
+            options.add_argument(argument)
         
         # Use fresh Chrome profile to avoid password popups
         user_data_dir = tempfile.mkdtemp(prefix="chrome_profile_")
         options.add_argument(f'--user-data-dir={user_data_dir}')
         
-        # Auto-allow microphone and disable password prompts
-        options.add_argument('--use-fake-ui-for-media-stream')
-        options.add_argument('--use-fake-device-for-media-stream')
-        options.add_argument('--disable-save-password-bubble')
-        options.add_argument('--disable-features=PasswordManager')
-        options.add_argument('--password-store=basic')
-        
         # Disable automation detection
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        options.add_experimental_option("prefs", HEADLESS_CHROME_PREFS if headless else CHROME_PREFS)
         
-        # Comprehensive password manager disable preferences
-        prefs = {
-            "credentials_enable_service": False,
-            "profile.password_manager_enabled": False,
-            "profile.default_content_setting_values.notifications": 2,
-            "autofill.profile_enabled": False
-        }
-        options.add_experimental_option("prefs", prefs)
+        if not self._chromedriver_path:
+            self._chromedriver_path = ChromeDriverManager().install()
+        service = Service(self._chromedriver_path)
+        # Pooled keep-alive connection to chromedriver - every WebDriver command
+        # reuses one socket instead of a TCP handshake each (selenium's default,
+        # pinned here since a login issues hundreds of commands)
+        driver = webdriver.Chrome(service=service, options=options, keep_alive=True)
+        # No implicit wait - every lookup goes through an explicit WebDriverWait,
+        # and an implicit wait would stall each EC.any_of poll on a missing selector
+        driver.implicitly_wait(0)
         
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.implicitly_wait(10)
+        return driver
+    
+    def _get_shared_driver(self) -> webdriver.Chrome:
+        """The shared headless Chrome - (re)started if missing or dead"""
+        if self._shared_driver is not None:
+            try:
+                self._shared_driver.window_handles
+                return self._shared_driver
+            except Exception as e:
+                logger.warning(f"Shared Chrome not responding, restarting: {e}")
+                # Its tabs died with it - stop the users' attached sessions too
+                for user_id in list(self._user_windows):
+                    self._user_cache.pop(user_id, None)
+                    self._user_windows.pop(user_id, None)
+                    self._user_contexts.pop(user_id, None)
+                    self._detach_driver(self.drivers.pop(user_id, None))
+                try:
+                    self._shared_driver.quit()
+                except:
+                    pass
         
+        self._shared_driver = self._create_driver(headless=True)
+        logger.info("Started shared Chrome for dialer logins")
+        return self._shared_driver
+    
+    def _prewarm_shared_driver(self):
+        """Start the shared Chrome ahead of the first login"""
+        with self._shared_lock:
+            self._get_shared_driver()
+    
+    def _open_user_browser(self, user_id: int, headless: bool) -> webdriver.Chrome:
+        """
+        Browser for a user's login - a fresh isolated tab in the shared Chrome,
+        or a dedicated Chrome for visible logins (or if the tab can't be made)
+        """
+        self._close_user_browser(user_id)
+        
+        if headless:
+            context_id = None
+            try:
+                # Only the tab itself is made under the lock
+                with self._shared_lock:
+                    shared = self._get_shared_driver()
+                    debugger_address = shared.capabilities["goog:chromeOptions"]["debuggerAddress"]
+                    context_id = shared.execute_cdp_cmd(
+                        "Target.createBrowserContext", {}
+                    )["browserContextId"]
+                    target_id = shared.execute_cdp_cmd(
+                        "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+                    )["targetId"]
+                
+                driver = self._attach_driver(debugger_address, target_id)
+                self._user_contexts[user_id] = context_id
+                self._user_windows[user_id] = target_id
+                self.drivers[user_id] = driver
+                return driver
+            except Exception as e:
+                logger.warning(f"Could not open isolated tab for user {user_id}, using own Chrome: {e}")
+                if context_id is not None:
+                    self._dispose_context(context_id)
+        
+        driver = self._create_driver(headless)
+        self.drivers[user_id] = driver
+        return driver
+    
+    def _attach_driver(self, debugger_address: str, target_id: str) -> webdriver.Chrome:
+        """Own WebDriver session on the shared Chrome, focused on the user's tab"""
+        options = Options()
+        options.page_load_strategy = "eager"
+        options.debugger_address = debugger_address
+        
+        driver = webdriver.Chrome(service=Service(self._chromedriver_path), options=options, keep_alive=True)
+        try:
+            driver.implicitly_wait(0)
+            driver.switch_to.window(target_id)
+        except Exception:
+            self._detach_driver(driver)
+            raise
         return driver
     
-    def _find_element(self, driver: webdriver.Chrome, selectors: list, timeout: int = 10):
-        """Try multiple selectors to find element"""
-        for by, value in selectors:
+    def _detach_driver(self, driver: Optional[webdriver.Chrome]):
+        """Stop an attached session's chromedriver - quit() would act on the shared Chrome"""
+        if driver is None:
+            return
+        try:
+            driver.service.stop()
+        except Exception as e:
+            logger.debug(f"Error stopping attached chromedriver: {e}")
+    
+    def _dispose_context(self, context_id: str):
+        """Close a user's tab on the shared Chrome and drop its cookies"""
+        with self._shared_lock:
+            if self._shared_driver is None:
+                return
             try:
-                element = WebDriverWait(driver, timeout).until(
-                    EC.presence_of_element_located((by, value))
+                self._shared_driver.execute_cdp_cmd(
+                    "Target.disposeBrowserContext", {"browserContextId": context_id}
                 )
-                return element
-            except TimeoutException:
-                continue
-        raise NoSuchElementException(f"Could not find element with any selector")
+            except Exception as e:
+                logger.debug(f"Error disposing browser context {context_id}: {e}")
+    
+    def _on_user_tab(self, user_id: int, fn, *args):
+        """Run fn(driver, *args) on the user's browser - each user has their own session, no lock"""
+        return fn(self.drivers[user_id], *args)
+    
+    def _close_user_browser(self, user_id: int):
+        """Close the user's tab (shared Chrome) or quit their own Chrome"""
+        self._user_cache.pop(user_id, None)
+        driver = self.drivers.pop(user_id, None)
+        handle = self._user_windows.pop(user_id, None)
+        context_id = self._user_contexts.pop(user_id, None)
+        if driver is None:
+            return
+        
+        if handle is None:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.debug(f"Error closing browser for user {user_id}: {e}")
+            return
+        
+        self._detach_driver(driver)
+        self._dispose_context(context_id)
+    
+    def _find_element(
+        self,
+        driver: webdriver.Chrome,
+        conditions: tuple,
+        timeout: int = 10,
+        cache_key: Optional[Tuple[str, str]] = None
+    ):
+        """
+        Find element by any of the precompiled selector conditions (COMPILED / _compile)
+        One wait polls every selector - a missing element costs timeout, not timeout per selector
+        
+        cache_key: (dialer_type, field) - the selector that matched last time is
+        tried first, so a known page needs one lookup instead of walking the list
+        """
+        hot = self._hot_locator.get(cache_key) if cache_key else None
+        if hot is not None:
+            conditions = (hot,) + tuple(c for c in conditions if c is not hot)
+        
+        try:
+            condition, element = WebDriverWait(driver, timeout, poll_frequency=0.3).until(
+                _first_match(conditions)
+            )
+        except TimeoutException:
+            raise NoSuchElementException(
+                f"Could not find element with any of {len(conditions)} selectors within {timeout}s"
+            )
+        
+        if cache_key:
+            self._hot_locator[cache_key] = condition
+        return element
+    
+    def _fill_and_submit(
+        self,
+        driver: webdriver.Chrome,
+        field_pairs: List[Tuple[str, str]],
+        submit_selector: str,
+        timeout: int = 5
+    ):
+        """
+        Fill (css, value) fields and click submit via FILL_AND_SUBMIT_JS,
+        waiting up to timeout for the form to render
+        
+        Returns:
+            The clicked submit element, or None if the selectors never matched
+        """
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=0.3).until(
+                lambda d: d.execute_script(FILL_AND_SUBMIT_JS, field_pairs, submit_selector)
+            )
+        except TimeoutException:
+            return None
+    
+    def _wait_for(self, driver: webdriver.Chrome, by: str, value: str, timeout: int = 10):
+        """Wait until (by, value) is present and return the element"""
+        return WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((by, value))
+        )
+    
+    def _wait_until(self, driver: webdriver.Chrome, condition, timeout: int = 10) -> bool:
+        """
+        Wait for a condition instead of sleeping a fixed time - returns as
+        soon as it holds, False on timeout (callers continue either way)
+        """
+        try:
+            WebDriverWait(driver, timeout).until(condition)
+            return True
+        except TimeoutException:
+            return False
     
     async def login_dialer(
         self, 
@@ -304,7 +684,7 @@ class DialerAutomationService:
             # Run in thread pool to avoid blocking
             loop = asyncio.get_event_loop()
             success = await loop.run_in_executor(
-                None, 
+                self._executor, 
                 self._login_sync, 
                 user, 
                 user_id, 
@@ -318,11 +698,13 @@ class DialerAutomationService:
                     .where(DialerUser.id == user_id)
                     .values(
                         is_logged_in=True,
-                        last_login=datetime.utcnow(),
+                        # Naive UTC, like the column (utcnow() is deprecated)
+                        last_login=datetime.now(timezone.utc).replace(tzinfo=None),
                         session_id=f"selenium_{user_id}"
                     )
                 )
                 await db.commit()
+                self._user_cache[user_id] = _LoggedInUser(user.id, user.username, user.dialer_type)
             
             return success
                 
@@ -330,288 +712,262 @@ class DialerAutomationService:
             logger.error(f"Error during login for user {user_id}: {e}")
             return False
     
+    async def login_many(self, user_ids: List[int], headless: bool = True) -> List[bool]:
+        """
+        Log several dialer users in concurrently
+        
+        Args:
+            user_ids: Dialer user IDs
+            headless: Run browser in headless mode
+            
+        Returns:
+            List of login results, in user_ids order
+        """
+        async def _login(user_id: int) -> bool:
+            # One session per login - an AsyncSession can't be shared across tasks
+            async with async_session_maker() as db:
+                return await self.login_dialer(db, user_id, headless)
+        
+        return await asyncio.gather(*(_login(user_id) for user_id in user_ids))
+    
     def _login_sync(self, user: DialerUser, user_id: int, headless: bool) -> bool:
         """Synchronous login logic"""
         try:
-            # Create new driver
-            driver = self._create_driver(headless)
-            self.drivers[user_id] = driver
-            
-            # Navigate to dialer URL
-            logger.info(f"Navigating to dialer: {user.dialer_url}")
-            driver.get(user.dialer_url)
-            
-            # Wait for page load
-            time.sleep(2)
+            # Fresh tab (or browser) for this user
+            self._open_user_browser(user_id, headless)
+            return self._on_user_tab(user_id, self._login_steps, user, headless)
+                
+        except Exception as e:
+            logger.error(f"Login sync error: {e}")
+            # Cleanup on failure
+            self._close_user_browser(user_id)
+            return False
+    
+    def _login_steps(self, driver: webdriver.Chrome, user: DialerUser, headless: bool) -> bool:
+        """Login flow on the user's browser"""
+        # Navigate to dialer URL
+        logger.info(f"Navigating to dialer: {user.dialer_url}")
+        driver.get(user.dialer_url)
+        
+        # Wait for page load
+        self._wait_until(driver, _page_loaded, timeout=15)
+        
+        # Get selectors for this dialer type
+        selectors = self.COMPILED.get(user.dialer_type, self.COMPILED["generic"])
+        
+        # ===== CALLTOOLS: Simple username/password login =====
+        if user.dialer_type == "calltools":
+            logger.info("[CallTools Login] Starting simple login flow")
             
-            # Get selectors for this dialer type
-            selectors = self.selectors.get(user.dialer_type, self.selectors["generic"])
+            # Fill username + password and submit in one script call
+            logger.info(f"[CallTools Login] Filling credentials for {user.username} and submitting")
+            login_button = self._fill_and_submit(
+                driver,
+                [(CALLTOOLS_USERNAME_CSS, user.username), (CALLTOOLS_PASSWORD_CSS, user.password)],
+                CALLTOOLS_SUBMIT_CSS
+            )
             
-            # ===== CALLTOOLS: Simple username/password login =====
-            if user.dialer_type == "calltools":
-                logger.info("[CallTools Login] Starting simple login flow")
+            if login_button is None:
+                logger.info("[CallTools Login] Form not matched by CSS - filling field by field")
                 
                 # Find and fill username
-                logger.info(f"[CallTools Login] Filling username: {user.username}")
-                username_field = self._find_element(driver, selectors["username_field"])
+                username_field = self._find_element(driver, selectors["username_field"], cache_key=(user.dialer_type, "username_field"))
                 username_field.clear()
                 username_field.send_keys(user.username)
                 
                 # Find and fill password
-                logger.info(f"[CallTools Login] Filling password")
-                password_field = self._find_element(driver, selectors["password_field"])
+                password_field = self._find_element(driver, selectors["password_field"], cache_key=(user.dialer_type, "password_field"))
                 password_field.clear()
                 password_field.send_keys(user.password)
                 
                 # Click login button
                 logger.info("[CallTools Login] Clicking login button")
-                login_button = self._find_element(driver, selectors["login_button"])
+                login_button = self._find_element(driver, selectors["login_button"], cache_key=(user.dialer_type, "login_button"))
                 login_button.click()
+            
+            # Wait for navigation (dashboard URL or the login form going away)
+            logger.info("[CallTools Login] Waiting for dashboard to load...")
+            if not self._wait_until(driver, EC.any_of(
+                EC.url_contains("dashboard"),
+                EC.url_contains("agent"),
+                EC.staleness_of(login_button)
+            ), timeout=15):
+                logger.warning("[CallTools Login] Dashboard did not load within 15s")
+            
+            logger.info("[CallTools Login] Login complete! ✅")
+            return True
+        
+        # ===== TM DIALER: Click "Agent Login" link first =====
+        if user.dialer_type == "tmdialer":
+            logger.info("[Welcome Page] Looking for 'Agent Login' link")
+            try:
+                agent_login_link = self._find_element(driver, selectors["agent_login_link"], timeout=5, cache_key=(user.dialer_type, "agent_login_link"))
+                agent_login_link.click()
+                logger.info("[Welcome Page] Clicked 'Agent Login' link")
+                self._wait_until(driver, EC.staleness_of(agent_login_link), timeout=10)
+            except Exception as e:
+                logger.warning(f"[Welcome Page] Could not find Agent Login link: {e}")
+                # Continue anyway in case already on login page
+        
+        # ===== PHONE LOGIN PAGE (after Agent Login click) =====
+        # Find and fill Phone Login (1004)
+        logger.info(f"[Phone Login Page] Filling Phone Login: {user.username}")
+        phone_login_field = self._find_element(driver, selectors["phone_login_field"], cache_key=(user.dialer_type, "phone_login_field"))
+        phone_login_field.clear()
+        phone_login_field.send_keys(user.username)  # 1004
+        
+        # Find and fill Phone Password (tmai)
+        phone_password_field = self._find_element(driver, selectors["phone_password_field"], cache_key=(user.dialer_type, "phone_password_field"))
+        phone_password_field.clear()
+        phone_password_field.send_keys(user.password)  # tmai
+        
+        # Click SUBMIT button
+        logger.info("[Phone Login Page] Clicking SUBMIT button")
+        phone_submit_button = self._find_element(driver, selectors["phone_submit_button"], cache_key=(user.dialer_type, "phone_submit_button"))
+        phone_submit_button.click()
+        
+        # Wait for navigation - the campaign page fields are waited for below
+        self._wait_until(driver, EC.staleness_of(phone_submit_button), timeout=10)
+        
+        # ===== CAMPAIGN LOGIN PAGE (second page after phone login) =====
+        if user.dialer_type == "tmdialer":
+            logger.info("[Campaign Login Page] Looking for campaign selection page...")
+            
+            try:
+                # Find User Login field
+                campaign_user_field = self._find_element(
+                    driver, selectors.get("campaign_user_field", ()), timeout=5,
+                    cache_key=(user.dialer_type, "campaign_user_field")
+                )
+                logger.info("[Campaign Login Page] Found - filling credentials")
                 
-                # Wait for navigation
-                logger.info("[CallTools Login] Waiting for dashboard to load...")
-                time.sleep(5)
+                # Fill User Login (1004)
+                campaign_user_field.clear()
+                campaign_user_field.send_keys(user.username)  # 1004
+                logger.info(f"[Campaign Login Page] Filled User Login: {user.username}")
                 
-                logger.info("[CallTools Login] Login complete! ✅")
-                return True
-            
-            # ===== TM DIALER: Click "Agent Login" link first =====
-            if user.dialer_type == "tmdialer":
-                logger.info("[Welcome Page] Looking for 'Agent Login' link")
-                try:
-                    agent_login_link = self._find_element(driver, selectors["agent_login_link"], timeout=5)
-                    agent_login_link.click()
-                    logger.info("[Welcome Page] Clicked 'Agent Login' link")
-                    time.sleep(2)
-                except Exception as e:
-                    logger.warning(f"[Welcome Page] Could not find Agent Login link: {e}")
-                    # Continue anyway in case already on login page
-            
-            # ===== PHONE LOGIN PAGE (after Agent Login click) =====
-            # Find and fill Phone Login (1004)
-            logger.info(f"[Phone Login Page] Filling Phone Login: {user.username}")
-            phone_login_field = self._find_element(driver, selectors["phone_login_field"])
-            phone_login_field.clear()
-            phone_login_field.send_keys(user.username)  # 1004
-            
-            # Find and fill Phone Password (tmai)
-            phone_password_field = self._find_element(driver, selectors["phone_password_field"])
-            phone_password_field.clear()
-            phone_password_field.send_keys(user.password)  # tmai
-            
-            # Click SUBMIT button
-            logger.info("[Phone Login Page] Clicking SUBMIT button")
-            phone_submit_button = self._find_element(driver, selectors["phone_submit_button"])
-            phone_submit_button.click()
-            
-            # Wait for navigation
-            time.sleep(3)
-            
-            # ===== CAMPAIGN LOGIN PAGE (second page after phone login) =====
-            if user.dialer_type == "tmdialer":
-                logger.info("[Campaign Login Page] Looking for campaign selection page...")
+                # Fill User Password (1004)
+                campaign_pass_field = self._find_element(driver, selectors["campaign_pass_field"], cache_key=(user.dialer_type, "campaign_pass_field"))
+                campaign_pass_field.clear()
+                campaign_pass_field.send_keys(user.username)  # 1004 (same as username)
+                logger.info("[Campaign Login Page] Filled User Password")
                 
+                # Select Campaign from dropdown
                 try:
-                    # Find User Login field
-                    campaign_user_field = self._find_element(driver, selectors.get("campaign_user_field", []), timeout=5)
-                    logger.info("[Campaign Login Page] Found - filling credentials")
-                    
-                    # Fill User Login (1004)
-                    campaign_user_field.clear()
-                    campaign_user_field.send_keys(user.username)  # 1004
-                    logger.info(f"[Campaign Login Page] Filled User Login: {user.username}")
-                    
-                    # Fill User Password (1004)
-                    campaign_pass_field = self._find_element(driver, selectors["campaign_pass_field"])
-                    campaign_pass_field.clear()
-                    campaign_pass_field.send_keys(user.username)  # 1004 (same as username)
-                    logger.info("[Campaign Login Page] Filled User Password")
-                    
-                    # Wait before selecting campaign
-                    time.sleep(1)
-                    
-                    # Select Campaign from dropdown
-                    try:
-                        from selenium.webdriver.support.ui import Select
-                        
-                        # Find dropdown and select
-                        campaign_dropdown = self._find_element(driver, selectors["campaign_dropdown"])
-                        select = Select(campaign_dropdown)
-                        
-                        # Get all available campaigns
-                        options = select.options
-                        logger.info(f"[Campaign Login Page] Found {len(options)} options in dropdown")
-                        
-                        if len(options) > 1:
-                            # Select first actual campaign (skip "-- PLEASE SELECT A CAMPAIGN --")
-                            select.select_by_index(1)
-                            logger.info(f"[Campaign Login Page] Selected campaign: {options[1].text}")
-                            time.sleep(1)
-                        else:
-                            logger.warning("[Campaign Login Page] No campaigns available in dropdown")
-                    except Exception as e:
-                        logger.warning(f"[Campaign Login Page] Could not select campaign: {e}")
+                    # Find dropdown and wait for the campaign list to fill in
+                    campaign_dropdown = self._find_element(driver, selectors["campaign_dropdown"], cache_key=(user.dialer_type, "campaign_dropdown"))
+                    select = Select(campaign_dropdown)
+                    self._wait_until(driver, lambda d: len(select.options) > 1, timeout=5)
                     
-                    # Click SUBMIT
-                    campaign_submit = self._find_element(driver, selectors["campaign_submit"])
-                    campaign_submit.click()
-                    
-                    logger.info("[Campaign Login Page] Submitted - waiting for agent interface...")
-                    time.sleep(5)  # Wait longer for agent interface to load
+                    # Get all available campaigns
+                    options = select.options
+                    logger.info(f"[Campaign Login Page] Found {len(options)} options in dropdown")
                     
+                    if len(options) > 1:
+                        # Select first actual campaign (skip "-- PLEASE SELECT A CAMPAIGN --")
+                        select.select_by_index(1)
+                        logger.info(f"[Campaign Login Page] Selected campaign: {options[1].text}")
+                    else:
+                        logger.warning("[Campaign Login Page] No campaigns available in dropdown")
                 except Exception as e:
-                    logger.warning(f"[Campaign Login Page] Not found or failed: {e}")
-                    # Continue - might already be logged in
-            
-            # ===== HANDLE DUPLICATE SESSION POPUP (if appears) =====
-            if user.dialer_type == "tmdialer":
-                logger.info("[Agent Interface] Checking for duplicate session popup...")
+                    logger.warning(f"[Campaign Login Page] Could not select campaign: {e}")
                 
-                try:
-                    # Look for "OK" link to dismiss "Another live agent session was open" message
-                    ok_link = self._find_element(driver, [(By.LINK_TEXT, "OK"), (By.PARTIAL_LINK_TEXT, "OK")], timeout=3)
-                    
-                    if ok_link:
-                        logger.info("[Agent Interface] Found duplicate session popup - clicking OK...")
-                        ok_link.click()
-                        time.sleep(2)
-                        logger.info("✅ Dismissed duplicate session warning")
-                    
-                except Exception as e:
-                    logger.info("[Agent Interface] No duplicate session popup (continuing)")
+                # Click SUBMIT
+                campaign_submit = self._find_element(driver, selectors["campaign_submit"], cache_key=(user.dialer_type, "campaign_submit"))
+                campaign_submit.click()
                 
-                # Close password popup using PyAutoGUI (if not headless)
-                if not headless:
-                    try:
-                        import pyautogui
-                        time.sleep(2)
-                        
-                        screen_width, screen_height = pyautogui.size()
-                        center_x, center_y = screen_width // 2, screen_height // 2
-                        
-                        # Click center to close password popup
-                        pyautogui.click(center_x, center_y)
-                        logger.info("Attempted to close password popup with PyAutoGUI")
-                        time.sleep(1)
-                    except Exception as e:
-                        logger.warning(f"Could not use PyAutoGUI: {e}")
+                logger.info("[Campaign Login Page] Submitted - waiting for agent interface...")
+                self._wait_until(driver, EC.staleness_of(campaign_submit), timeout=15)
+                self._wait_until(driver, _page_loaded, timeout=15)
                 
-                # Handle browser permission popups
+            except Exception as e:
+                logger.warning(f"[Campaign Login Page] Not found or failed: {e}")
+                # Continue - might already be logged in
+        
+        # ===== HANDLE DUPLICATE SESSION POPUP (if appears) =====
+        if user.dialer_type == "tmdialer":
+            logger.info("[Agent Interface] Checking for popups...")
+            
+            # Password save/leak bubbles are switched off in _create_driver -
+            # a page-level alert would block every DOM probe, so it goes first
+            try:
+                driver.switch_to.alert.dismiss()
+                logger.info("✅ Dismissed page alert")
+            except NoAlertPresentException:
+                pass
+            
+            # One wait watches for every popup at once; each one found is
+            # clicked away and the rest are watched again (they can stack)
+            popups = dict(POST_LOGIN_POPUPS)
+            while popups:
                 try:
-                    # Microphone permission
-                    allow_btn = self._find_element(driver, [(By.XPATH, "//button[contains(text(), 'Allow this time')]")], timeout=2)
-                    if allow_btn:
-                        allow_btn.click()
-                        logger.info("✅ Allowed microphone permission")
-                        time.sleep(1)
-                except:
-                    pass
+                    condition, element = WebDriverWait(driver, 3, poll_frequency=0.3).until(
+                        _first_match(tuple(popups))
+                    )
+                except TimeoutException:
+                    break
                 
+                name = popups.pop(condition)
                 try:
-                    # Any OK button for browser popups
-                    ok_btn = self._find_element(driver, [(By.XPATH, "//button[contains(text(), 'OK')]")], timeout=2)
-                    if ok_btn:
-                        ok_btn.click()
-                        logger.info("✅ Dismissed browser popup")
-                        time.sleep(1)
-                except:
-                    pass
+                    element.click()
+                    self._wait_until(driver, EC.invisibility_of_element(element), timeout=3)
+                    logger.info(f"✅ Dismissed {name}")
+                except WebDriverException as e:
+                    logger.warning(f"[Agent Interface] Could not dismiss {name}: {e}")
             
-            # ===== AUTO-UNPAUSE (Click "YOU ARE PAUSED" button) =====
-            if user.dialer_type == "tmdialer" and user.auto_unpause:
-                logger.info("[Agent Interface] Checking for pause status...")
-                
+            if len(popups) == len(POST_LOGIN_POPUPS):
+                logger.info("[Agent Interface] No popups (continuing)")
+        
+        # ===== AUTO-UNPAUSE (Click "YOU ARE PAUSED" button) =====
+        if user.dialer_type == "tmdialer" and user.auto_unpause:
+            logger.info("[Agent Interface] Checking for pause status...")
+            
+            try:
+                # Wait for the pause status to render (agent might already be active)
                 try:
-                    # Wait a bit more for interface to fully load
-                    time.sleep(2)
-                    
-                    # Look for pause-related elements
-                    pause_button = None
-                    
-                    # Method 1: Look for "YOU ARE PAUSED" text anywhere
-                    try:
-                        all_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'YOU ARE PAUSED')]")
-                        for elem in all_elements:
-                            if elem.is_displayed() and "YOU ARE PAUSED" in elem.text:
-                                pause_button = elem
-                                logger.info(f"Found 'YOU ARE PAUSED' button (tag: {elem.tag_name})")
-                                break
-                    except:
-                        pass
-                    
-                    # Method 2: Look for "ENTER A PAUSE CODE" link
-                    if not pause_button:
-                        pause_elements = driver.find_elements(By.PARTIAL_LINK_TEXT, "PAUSE")
-                        for elem in pause_elements:
-                            if elem.is_displayed():
-                                elem_text = elem.text.strip()
-                                if "YOU ARE PAUSED" in elem_text or "ENTER A PAUSE CODE" in elem_text:
-                                    pause_button = elem
-                                    logger.info(f"Found pause element: '{elem_text}'")
-                                    break
+                    self._wait_for(driver, By.XPATH, PAUSED_XPATH, timeout=5)
+                except TimeoutException:
+                    pass
+                
+                # Find + click the visible pause element in the page (one round-trip,
+                # no stale element between finding and clicking)
+                clicked = driver.execute_script(CLICK_PAUSE_ELEMENT_JS, PAUSED_XPATH)
+                
+                if clicked:
+                    logger.info(f"✅ Clicked pause element {clicked} to unpause")
                     
-                    if pause_button:
-                        logger.info("[Agent Interface] Clicking pause button to unpause...")
-                        try:
-                            # Try normal click first
-                            pause_button.click()
-                            logger.info("✅ Clicked pause button (normal click)")
-                        except Exception as click_error:
-                            # Fallback to JavaScript click
-                            logger.info(f"Normal click failed, trying JavaScript click...")
-                            driver.execute_script("arguments[0].click();", pause_button)
-                            logger.info("✅ Clicked pause button via JavaScript")
-                        
-                        time.sleep(3)
-                        
-                        # Verify unpause worked
-                        try:
-                            paused_check = driver.find_elements(By.XPATH, "//*[contains(text(), 'YOU ARE PAUSED')]")
-                            if len(paused_check) == 0 or not any(e.is_displayed() for e in paused_check):
-                                logger.info("✅ Agent successfully unpaused - 'YOU ARE PAUSED' button disappeared")
-                            else:
-                                logger.warning("⚠ Agent may still be paused")
-                        except:
-                            logger.info("Unpause attempted (verification skipped)")
+                    # Verify unpause worked - returns as soon as the button disappears
+                    if self._wait_until(
+                        driver, lambda d: not d.execute_script(PAUSED_VISIBLE_JS, PAUSED_XPATH), timeout=5
+                    ):
+                        logger.info("✅ Agent successfully unpaused - 'YOU ARE PAUSED' button disappeared")
                     else:
-                        logger.info("[Agent Interface] No pause button found - agent might already be active")
-                        
-                except Exception as e:
-                    logger.warning(f"[Agent Interface] Could not handle pause button: {e}")
-                    # Continue - agent might already be unpaused
-            
-            # Check if login was successful
-            current_url = driver.current_url
-            page_source = driver.page_source.lower()
-            
-            # Success indicators
-            success_indicators = [
-                "dashboard" in current_url.lower(),
-                "agent" in current_url.lower(),
-                "campaign" in page_source,
-                "logout" in page_source,
-                "pause" in page_source,
-                "ready" in page_source
-            ]
-            
-            if any(success_indicators):
-                logger.info(f"✅ Login successful for user {user.username}")
-                return True
-            else:
-                logger.error(f"❌ Login failed for user {user.username}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Login sync error: {e}")
-            # Cleanup on failure
-            if user_id in self.drivers:
-                try:
-                    self.drivers[user_id].quit()
-                    del self.drivers[user_id]
-                except:
-                    pass
+                        logger.warning("⚠ Agent may still be paused")
+                else:
+                    logger.info("[Agent Interface] No pause button found - agent might already be active")
+                    
+            except Exception as e:
+                logger.warning(f"[Agent Interface] Could not handle pause button: {e}")
+                # Continue - agent might already be unpaused
+        
+        # Check if login was successful (polls until a success indicator shows up)
+        if self._wait_until(driver, _login_succeeded, timeout=10):
+            logger.info(f"✅ Login successful for user {user.username}")
+            return True
+        else:
+            logger.error(f"❌ Login failed for user {user.username}")
             return False
     
+    async def _get_user(self, db: AsyncSession, user_id: int):
+        """Cached fields of a logged-in user, else the DialerUser row (None if missing)"""
+        user = self._user_cache.get(user_id)
+        if user is None:
+            result = await db.execute(
+                select(DialerUser).where(DialerUser.id == user_id)
+            )
+            user = result.scalar_one_or_none()
+        return user
+    
     async def click_unpause(self, db: AsyncSession, user_id: int) -> bool:
         """
         Click the unpause/resume button on dialer
@@ -631,10 +987,7 @@ class DialerAutomationService:
                 return False
             
             # Get user info
-            result = await db.execute(
-                select(DialerUser).where(DialerUser.id == user_id)
-            )
-            user = result.scalar_one_or_none()
+            user = await self._get_user(db, user_id)
             
             if not user:
                 return False
@@ -642,9 +995,10 @@ class DialerAutomationService:
             # Run in executor
             loop = asyncio.get_event_loop()
             success = await loop.run_in_executor(
-                None,
+                self._executor,
+                self._on_user_tab,
+                user_id,
                 self._click_unpause_sync,
-                driver,
                 user
             )
             
@@ -657,10 +1011,20 @@ class DialerAutomationService:
     def _click_unpause_sync(self, driver: webdriver.Chrome, user: DialerUser) -> bool:
         """Synchronous unpause logic"""
         try:
-            selectors = self.selectors.get(user.dialer_type, self.selectors["generic"])
+            selectors = self.COMPILED.get(user.dialer_type, self.COMPILED["generic"])
             
             logger.info(f"Looking for unpause button for user {user.username}")
-            unpause_button = self._find_element(driver, selectors["unpause_button"])
+            
+            # TM Dialer: visible 'YOU ARE PAUSED' / 'ENTER A PAUSE CODE' element,
+            # found and clicked in the page - the selector list below matches
+            # hidden copies too and walks them one lookup at a time
+            if user.dialer_type == "tmdialer":
+                clicked = driver.execute_script(CLICK_PAUSE_ELEMENT_JS, PAUSED_XPATH)
+                if clicked:
+                    logger.info(f"Unpause clicked ({clicked}) for user {user.username}")
+                    return True
+            
+            unpause_button = self._find_element(driver, selectors["unpause_button"], cache_key=(user.dialer_type, "unpause_button"))
             unpause_button.click()
             
             logger.info(f"Unpause button clicked for user {user.username}")
@@ -687,19 +1051,17 @@ class DialerAutomationService:
                 logger.error(f"No active session for user {user_id}")
                 return False
             
-            result = await db.execute(
-                select(DialerUser).where(DialerUser.id == user_id)
-            )
-            user = result.scalar_one_or_none()
+            user = await self._get_user(db, user_id)
             
             if not user:
                 return False
             
             loop = asyncio.get_event_loop()
             success = await loop.run_in_executor(
-                None,
+                self._executor,
+                self._on_user_tab,
+                user_id,
                 self._click_pause_sync,
-                driver,
                 user
             )
             
@@ -712,10 +1074,10 @@ class DialerAutomationService:
     def _click_pause_sync(self, driver: webdriver.Chrome, user: DialerUser) -> bool:
         """Synchronous pause logic"""
         try:
-            selectors = self.selectors.get(user.dialer_type, self.selectors["generic"])
+            selectors = self.COMPILED.get(user.dialer_type, self.COMPILED["generic"])
             
             logger.info(f"Looking for pause button for user {user.username}")
-            pause_button = self._find_element(driver, selectors["pause_button"])
+            pause_button = self._find_element(driver, selectors["pause_button"], cache_key=(user.dialer_type, "pause_button"))
             pause_button.click()
             
             logger.info(f"Pause button clicked for user {user.username}")
@@ -737,11 +1099,10 @@ class DialerAutomationService:
             bool: True if logout successful
         """
         try:
-            # Close driver
-            driver = self.drivers.pop(user_id, None)
-            if driver:
+            # Close user's tab / browser
+            if user_id in self.drivers:
                 loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, driver.quit)
+                await loop.run_in_executor(self._executor, self._close_user_browser, user_id)
             
             # Update database
             await db.execute(
@@ -761,10 +1122,11 @@ class DialerAutomationService:
     async def take_screenshot(self, user_id: int, path: str) -> bool:
         """Take screenshot of current page for debugging"""
         try:
-            driver = self.drivers.get(user_id)
-            if driver:
+            if user_id in self.drivers:
                 loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, driver.save_screenshot, path)
+                await loop.run_in_executor(
+                    self._executor, self._on_user_tab, user_id, lambda d: d.save_screenshot(path)
+                )
                 return True
             return False
         except Exception as e:
@@ -811,11 +1173,7 @@ class DialerAutomationService:
                 
                 # Clean up failed driver
                 if user_id in self.drivers:
-                    try:
-                        driver = self.drivers.pop(user_id)
-                        await asyncio.to_thread(driver.quit)
-                    except:
-                        pass
+                    await asyncio.to_thread(self._close_user_browser, user_id)
             
             # Don't wait after last attempt
             if attempt < max_retries:
@@ -848,18 +1206,14 @@ class DialerAutomationService:
             
             # Check if driver is still responsive
             try:
-                current_url = await asyncio.to_thread(lambda: driver.current_url)
+                current_url = await asyncio.to_thread(self._on_user_tab, user_id, lambda d: d.current_url)
                 logger.debug(f"Driver for user {user_id} is responsive: {current_url}")
                 return True
             except Exception as e:
                 logger.warning(f"Driver unresponsive for user {user_id}: {e}")
                 
                 # Clean up dead driver
-                try:
-                    self.drivers.pop(user_id)
-                    await asyncio.to_thread(driver.quit)
-                except:
-                    pass
+                await asyncio.to_thread(self._close_user_browser, user_id)
                 
                 # Attempt reconnect
                 logger.info(f"Attempting to reconnect user {user_id}")
@@ -888,8 +1242,12 @@ class DialerAutomationService:
         
         try:
             # Test if driver is responsive
-            current_url = await asyncio.to_thread(lambda: driver.current_url)
-            window_handles = await asyncio.to_thread(lambda: len(driver.window_handles))
+            current_url = await asyncio.to_thread(self._on_user_tab, user_id, lambda d: d.current_url)
+            # A user on the shared Chrome owns exactly one tab
+            if user_id in self._user_windows:
+                window_handles = 1
+            else:
+                window_handles = await asyncio.to_thread(lambda: len(driver.window_handles))
             
             return {
                 "status": "connected",
@@ -181,6 +181,7 @@ class PostCallHandler:
         # Update agent status to available/ready
         agent.status = "available"
         agent.current_call_id = None
+        agent.active_call_count = max((agent.active_call_count or 0) - 1, 0)
         agent.last_call_at = datetime.utcnow()
         
         await db.commit()
@@ -391,19 +391,14 @@ class WebRTCAudioBridge:
                         });
                     }
                     
-                    // Decode base64 to ArrayBuffer
-                    const binaryString = atob(base64Audio);
-                    const len = binaryString.length;
-                    const bytes = new Uint8Array(len);
-                    for (let i = 0; i < len; i++) {
-                        bytes[i] = binaryString.charCodeAt(i);
-                    }
+                    // Decode base64 to ArrayBuffer (Uint8Array.from runs natively)
+                    const bytes = Uint8Array.from(atob(base64Audio), c => c.charCodeAt(0));
                     
-                    // Convert Int16 to Float32
+                    // Convert Int16 to Float32 (branchless constant scale)
                     const int16Array = new Int16Array(bytes.buffer);
                     const float32Array = new Float32Array(int16Array.length);
                     for (let i = 0; i < int16Array.length; i++) {
-                        float32Array[i] = int16Array[i] / (int16Array[i] < 0 ? 0x8000 : 0x7FFF);
+                        float32Array[i] = int16Array[i] * (1 / 32768);
                     }
                     
                     // Create AudioBuffer
@@ -0,0 +1,80 @@
+"""
+Migration: Add call statistics materialized views (PostgreSQL)
+Hourly/daily roll-ups of calls used by the analytics dashboard
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+VIEWS = {
+    "mv_hourly_call_stats": "hour",
+    "mv_daily_call_stats": "day",
+}
+
+
+async def upgrade():
+    """Create mv_hourly_call_stats and mv_daily_call_stats with unique indexes"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        for view, granularity in VIEWS.items():
+            print(f"Creating {view}...")
+            # disposition is coalesced to '' so every row is covered by the
+            # unique index required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+            await conn.execute(text(f"""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS {view} AS
+                SELECT
+                    agent_id,
+                    date_trunc('{granularity}', created_at) AS bucket,
+                    COALESCE(disposition, '') AS disposition,
+                    count(*) AS n,
+                    COALESCE(sum(duration_seconds), 0) AS dur,
+                    COALESCE(sum(quality_score), 0) AS q_sum,
+                    count(NULLIF(quality_score, 0)) AS q_n
+                FROM calls
+                GROUP BY 1, 2, 3
+            """))
+            await conn.execute(text(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_{view}
+                ON {view} (agent_id, bucket, disposition)
+            """))
+            await conn.execute(text(f"""
+                CREATE INDEX IF NOT EXISTS ix_{view}_bucket
+                ON {view} (bucket)
+            """))
+            print(f"✅ {view} created")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Drop call statistics materialized views"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Removing call statistics views...")
+        
+        for view in VIEWS:
+            await conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view}"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
@@ -0,0 +1,79 @@
+"""
+Migration: Add covering indexes on calls for analytics queries (PostgreSQL)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+INDEXES = {
+    # get_agent_performance / get_campaign_analytics / dashboard (agent_id + created_at range)
+    "ix_calls_agent_created": """
+        ON calls (agent_id, created_at)
+        INCLUDE (duration_seconds, disposition, quality_score, status)
+    """,
+    # get_customer_insights (customer_id, newest first)
+    "ix_calls_customer_created": """
+        ON calls (customer_id, created_at DESC)
+        INCLUDE (duration_seconds, disposition, agent_id)
+    """,
+    # get_transfer_queue
+    "ix_calls_status_transfer_queued": """
+        ON calls (initiated_at)
+        WHERE status = 'transfer_queued'
+    """,
+    # Cheap created_at range scans (rows are appended in created_at order)
+    "ix_calls_created_at_brin": """
+        ON calls USING brin (created_at)
+    """,
+}
+
+
+async def upgrade():
+    """Create analytics indexes on calls without blocking writes"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        
+        for name, definition in INDEXES.items():
+            print(f"Creating {name}...")
+            await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+            print(f"✅ {name} created")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Drop analytics indexes on calls"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        
+        print("Removing analytics indexes...")
+        
+        for name in INDEXES:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
@@ -0,0 +1,75 @@
+"""
+Migration: Add transfer_queue column to calls (PostgreSQL)
+Queued transfers are filtered by queue name instead of LIKE over notes
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+async def upgrade():
+    """Add calls.transfer_queue, backfill queued calls and index them"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Adding transfer_queue column...")
+        await conn.execute(text("""
+            ALTER TABLE calls
+            ADD COLUMN IF NOT EXISTS transfer_queue VARCHAR(64)
+        """))
+        print("✅ transfer_queue column added")
+        
+        # One-time backfill from the last "Queue: xxx" line in notes
+        print("Backfilling queued calls...")
+        await conn.execute(text(r"""
+            UPDATE calls
+            SET transfer_queue = COALESCE(substring(notes from '.*Queue: ([^\n]*)'), 'default')
+            WHERE status = 'transfer_queued' AND transfer_queue IS NULL
+        """))
+        print("✅ Queued calls backfilled")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        
+        print("Creating ix_calls_transfer_queue...")
+        await conn.execute(text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_calls_transfer_queue
+            ON calls (transfer_queue)
+            WHERE status = 'transfer_queued'
+        """))
+        print("✅ ix_calls_transfer_queue created")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Remove calls.transfer_queue"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Removing transfer_queue column...")
+        
+        await conn.execute(text("DROP INDEX IF EXISTS ix_calls_transfer_queue"))
+        await conn.execute(text("ALTER TABLE calls DROP COLUMN IF EXISTS transfer_queue"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
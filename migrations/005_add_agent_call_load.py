@@ -0,0 +1,72 @@
+"""
+Migration: Add call load columns to agents (PostgreSQL)
+Used by call transfers to pick the least busy available agent
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+COLUMNS = {
+    "status": "VARCHAR(20) DEFAULT 'available'",
+    "current_call_id": "INTEGER",
+    "active_call_count": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+async def upgrade():
+    """Add status, current_call_id, active_call_count to agents and index them"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        for name, definition in COLUMNS.items():
+            print(f"Adding {name} column...")
+            await conn.execute(text(f"ALTER TABLE agents ADD COLUMN IF NOT EXISTS {name} {definition}"))
+            print(f"✅ {name} column added")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        
+        print("Creating ix_agents_available_role_calls...")
+        await conn.execute(text("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agents_available_role_calls
+            ON agents (is_active, status, role, active_call_count)
+            WHERE status = 'available' AND role = 'agent'
+        """))
+        print("✅ ix_agents_available_role_calls created")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Remove call load columns from agents"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Removing agent call load columns...")
+        
+        await conn.execute(text("DROP INDEX IF EXISTS ix_agents_available_role_calls"))
+        for name in COLUMNS:
+            await conn.execute(text(f"ALTER TABLE agents DROP COLUMN IF EXISTS {name}"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
@@ -0,0 +1,176 @@
+"""
+Migration: Partition calls by created_at month (PostgreSQL)
+Analytics ranges only touch the partitions they need and each partition
+stays small. Rebuilds calls as PARTITION BY RANGE (created_at) with
+monthly children calls_YYYY_MM plus a default partition.
+
+Notes:
+- Primary key becomes (id, created_at) and call_id is unique per
+  (call_id, created_at) - partitioned tables require the partition key
+  in every unique constraint
+- call_events.call_id can no longer reference calls.call_id, the
+  foreign key is dropped
+- Runs in one transaction and locks calls while rows are copied
+- The call stats materialized views depend on calls, they are dropped
+  with the old table and recreated by migration 002 afterwards
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+# Partitions created ahead of the current month
+MONTHS_AHEAD = 3
+
+# Indexes shared by the plain and the partitioned table
+# (see app/models/call.py and migrations 003/004)
+INDEXES = {
+    "ix_calls_agent_id": "ON calls (agent_id)",
+    "ix_calls_customer_id": "ON calls (customer_id)",
+    "ix_calls_agent_created": """
+        ON calls (agent_id, created_at)
+        INCLUDE (duration_seconds, disposition, quality_score, status)
+    """,
+    "ix_calls_customer_created": """
+        ON calls (customer_id, created_at DESC)
+        INCLUDE (duration_seconds, disposition, agent_id)
+    """,
+    "ix_calls_status_transfer_queued": """
+        ON calls (initiated_at)
+        WHERE status = 'transfer_queued'
+    """,
+    "ix_calls_transfer_queue": """
+        ON calls (transfer_queue)
+        WHERE status = 'transfer_queued'
+    """,
+    "ix_calls_created_at_brin": "ON calls USING brin (created_at)",
+}
+
+
+async def recreate_call_stats_views():
+    """Run migration 002 again (views were dropped with the old calls table)"""
+    views_migration = importlib.import_module("migrations.002_add_call_stats_views")
+    await views_migration.upgrade()
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def upgrade():
+    """Rebuild calls as a monthly range-partitioned table"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        result = await conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'calls'::regclass"
+        ))
+        if result.first():
+            print("⏭️  calls is already partitioned")
+            return
+        
+        # Materialized views are recreated once the new table is in place
+        await conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_hourly_call_stats"))
+        await conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_daily_call_stats"))
+        
+        print("Preparing calls...")
+        await conn.execute(text(
+            "UPDATE calls SET created_at = COALESCE(initiated_at, now()) WHERE created_at IS NULL"
+        ))
+        await conn.execute(text("ALTER TABLE call_events DROP CONSTRAINT IF EXISTS call_events_call_id_fkey"))
+        await conn.execute(text("ALTER TABLE calls RENAME TO calls_old"))
+        
+        print("Creating partitioned calls...")
+        await conn.execute(text("""
+            CREATE TABLE calls (LIKE calls_old INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """))
+        await conn.execute(text("ALTER TABLE calls ALTER COLUMN created_at SET NOT NULL"))
+        await conn.execute(text("ALTER TABLE calls ADD CONSTRAINT calls_pkey_partitioned PRIMARY KEY (id, created_at)"))
+        await conn.execute(text("ALTER TABLE calls ADD CONSTRAINT uq_calls_call_id_created UNIQUE (call_id, created_at)"))
+        
+        # Monthly partitions from the oldest call until MONTHS_AHEAD from now
+        result = await conn.execute(text("SELECT min(created_at) FROM calls_old"))
+        oldest = result.scalar() or datetime.utcnow()
+        month = date(oldest.year, oldest.month, 1)
+        today = datetime.utcnow().date()
+        last_month = add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        
+        while month <= last_month:
+            next_month = add_months(month, 1)
+            await conn.execute(text(f"""
+                CREATE TABLE calls_{month:%Y_%m} PARTITION OF calls
+                FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')
+            """))
+            month = next_month
+        await conn.execute(text("CREATE TABLE calls_default PARTITION OF calls DEFAULT"))
+        print("✅ Partitions created")
+        
+        print("Copying calls...")
+        await conn.execute(text("INSERT INTO calls SELECT * FROM calls_old"))
+        
+        # Keep the id sequence when the old table is dropped
+        await conn.execute(text("ALTER SEQUENCE IF EXISTS calls_id_seq OWNED BY calls.id"))
+        await conn.execute(text("DROP TABLE calls_old CASCADE"))
+        print("✅ Calls copied")
+        
+        print("Recreating indexes...")
+        await conn.execute(text("CREATE INDEX ix_calls_call_id ON calls (call_id)"))
+        for name, definition in INDEXES.items():
+            await conn.execute(text(f"CREATE INDEX {name} {definition}"))
+        print("✅ Indexes created")
+    
+    await recreate_call_stats_views()
+    print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Rebuild calls as a plain table"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Rebuilding plain calls table...")
+        
+        await conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_hourly_call_stats"))
+        await conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_daily_call_stats"))
+        await conn.execute(text("ALTER TABLE calls RENAME TO calls_partitioned"))
+        await conn.execute(text("CREATE TABLE calls (LIKE calls_partitioned INCLUDING DEFAULTS)"))
+        await conn.execute(text("INSERT INTO calls SELECT * FROM calls_partitioned"))
+        await conn.execute(text("ALTER TABLE calls ADD PRIMARY KEY (id)"))
+        await conn.execute(text("ALTER SEQUENCE IF EXISTS calls_id_seq OWNED BY calls.id"))
+        await conn.execute(text("DROP TABLE calls_partitioned CASCADE"))
+        
+        await conn.execute(text("CREATE INDEX ix_calls_id ON calls (id)"))
+        await conn.execute(text("CREATE UNIQUE INDEX ix_calls_call_id ON calls (call_id)"))
+        for name, definition in INDEXES.items():
+            await conn.execute(text(f"CREATE INDEX {name} {definition}"))
+        await conn.execute(text("""
+            ALTER TABLE call_events ADD CONSTRAINT call_events_call_id_fkey
+            FOREIGN KEY (call_id) REFERENCES calls (call_id)
+        """))
+    
+    await recreate_call_stats_views()
+    print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
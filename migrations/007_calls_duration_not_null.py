@@ -0,0 +1,56 @@
+"""
+Migration: Make calls.duration_seconds NOT NULL DEFAULT 0
+Unknown durations are stored as 0 so aggregates need no NULL handling
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+async def upgrade():
+    """Backfill NULL durations with 0 and add NOT NULL DEFAULT 0"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Setting duration_seconds default...")
+        await conn.execute(text("ALTER TABLE calls ALTER COLUMN duration_seconds SET DEFAULT 0"))
+        
+        print("Backfilling NULL durations...")
+        await conn.execute(text("UPDATE calls SET duration_seconds = 0 WHERE duration_seconds IS NULL"))
+        
+        await conn.execute(text("ALTER TABLE calls ALTER COLUMN duration_seconds SET NOT NULL"))
+        print("✅ duration_seconds is NOT NULL DEFAULT 0")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Allow NULL durations again"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Dropping duration_seconds NOT NULL...")
+        
+        await conn.execute(text("ALTER TABLE calls ALTER COLUMN duration_seconds DROP NOT NULL"))
+        await conn.execute(text("ALTER TABLE calls ALTER COLUMN duration_seconds DROP DEFAULT"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
@@ -0,0 +1,75 @@
+"""
+Migration: NOTIFY dialer_user_changed on dialer_users changes
+Campaign scheduler LISTENs on this channel and re-checks only when a schedule changes
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import asyncio
+from app.config import settings
+
+
+async def upgrade():
+    """Create notify function and trigger on dialer_users"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Creating notify_dialer_user_changed function...")
+        await conn.execute(text("""
+            CREATE OR REPLACE FUNCTION notify_dialer_user_changed() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM pg_notify('dialer_user_changed', OLD.id::text);
+                    RETURN OLD;
+                END IF;
+                PERFORM pg_notify('dialer_user_changed', NEW.id::text);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        
+        print("Creating trigger on dialer_users...")
+        await conn.execute(text("DROP TRIGGER IF EXISTS dialer_user_changed ON dialer_users"))
+        # Only the columns the scheduler reads - its own is_logged_in/last_login
+        # writes on login/logout must not NOTIFY (and wake) the scheduler again
+        await conn.execute(text("""
+            CREATE TRIGGER dialer_user_changed
+            AFTER INSERT OR DELETE OR UPDATE OF
+                schedule_enabled, is_active, timezone, days_of_week,
+                start_time, end_time, auto_login, auto_unpause, agent_id
+            ON dialer_users
+            FOR EACH ROW EXECUTE FUNCTION notify_dialer_user_changed()
+        """))
+        print("✅ dialer_user_changed trigger created")
+        
+        print("\n✅ Migration completed successfully!")
+
+
+async def downgrade():
+    """Drop trigger and notify function"""
+    
+    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    
+    async with engine.begin() as conn:
+        print("Dropping dialer_user_changed trigger...")
+        
+        await conn.execute(text("DROP TRIGGER IF EXISTS dialer_user_changed ON dialer_users"))
+        await conn.execute(text("DROP FUNCTION IF EXISTS notify_dialer_user_changed()"))
+        
+        print("✅ Rollback completed!")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        print("🔽 Running downgrade...")
+        asyncio.run(downgrade())
+    else:
+        print("🔼 Running upgrade...")
+        asyncio.run(upgrade())
@@ -0,0 +1,101 @@
+"""
+Campaign scheduler - overnight windows ending on an unscheduled day, bad schedule rows
+"""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services import campaign_scheduler
+from app.services.campaign_scheduler import CampaignScheduler, _UserSched
+
+
+def _friday_night_user(is_logged_in: bool) -> _UserSched:
+    """Fri 22:00-02:00, Saturday not scheduled"""
+    return _UserSched(
+        id=1,
+        username="night_shift",
+        timezone="UTC",
+        days_of_week="friday",
+        start_time="22:00",
+        end_time="02:00",
+        is_logged_in=is_logged_in,
+        auto_login=True,
+        auto_unpause=False,
+        agent_id=None,
+        updated_at=None,
+    )
+
+
+# 2026-10-16 is a Friday, 2026-10-17 a Saturday
+FRIDAY_23 = datetime(2026, 10, 16, 23, 0, tzinfo=timezone.utc)
+SATURDAY_01 = datetime(2026, 10, 17, 1, 0, tzinfo=timezone.utc)
+SATURDAY_0201 = datetime(2026, 10, 17, 2, 1, tzinfo=timezone.utc)
+
+
+def test_overnight_window_still_open_after_midnight():
+    scheduler = CampaignScheduler()
+
+    needs_action, _ = scheduler._schedule_position(_friday_night_user(True), SATURDAY_01)
+    assert not needs_action
+
+    # Logged out mid-window -> login again even though Saturday is unscheduled
+    needs_action, _ = scheduler._schedule_position(_friday_night_user(False), SATURDAY_01)
+    assert needs_action
+
+
+def test_overnight_window_logs_out_on_unscheduled_day():
+    scheduler = CampaignScheduler()
+
+    needs_action, _ = scheduler._schedule_position(_friday_night_user(True), SATURDAY_0201)
+    assert needs_action
+
+
+def test_next_transition_is_logout_on_unscheduled_day():
+    scheduler = CampaignScheduler()
+
+    _, next_transition = scheduler._schedule_position(_friday_night_user(True), FRIDAY_23)
+    assert next_transition == SATURDAY_0201.timestamp()
+
+
+def test_process_logs_out_on_unscheduled_day(monkeypatch):
+    scheduler = CampaignScheduler()
+    scheduler._click_pause = AsyncMock()
+    scheduler._logout_dialer = AsyncMock()
+    scheduler._login_with_retry = AsyncMock()
+    monkeypatch.setattr(asyncio, "sleep", AsyncMock())
+
+    asyncio.run(scheduler._process_user_schedule(None, _friday_night_user(True), SATURDAY_0201))
+
+    scheduler._click_pause.assert_awaited_once_with(None, 1)
+    scheduler._logout_dialer.assert_awaited_once_with(None, 1)
+    scheduler._login_with_retry.assert_not_awaited()
+
+
+def _sched_row(user_id: int, tz: str, start_time: str, end_time: str) -> tuple:
+    """dialer_users row in _SCHED_COLUMNS order - logged out, auto_login on"""
+    return (user_id, f"user{user_id}", tz, None, start_time, end_time, False, True, False, None, None)
+
+
+def test_bad_row_does_not_block_other_users(monkeypatch):
+    rows = [
+        _sched_row(1, "Bad/Zone", "00:00", "23:59"),
+        _sched_row(2, "UTC", "9:00 AM", "5:00 PM"),
+        _sched_row(3, "UTC", "00:00", "23:59"),
+    ]
+    result = MagicMock()
+    result.all.return_value = rows
+    db = AsyncMock()
+    db.execute.return_value = result
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=db)
+    session.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(campaign_scheduler, "async_session_maker", lambda: session)
+
+    scheduler = CampaignScheduler()
+    scheduler._process_with_pooled_session = AsyncMock()
+
+    asyncio.run(scheduler.check_schedules())
+
+    # Valid user is still logged in; the bad rows are skipped
+    processed = [call.args[0].id for call in scheduler._process_with_pooled_session.await_args_list]
+    assert processed == [3]